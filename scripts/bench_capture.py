@@ -0,0 +1,135 @@
+import argparse, asyncio, base64, json, statistics, time
+from src.crawler_api import INJECT_HOOKS, CAPTURE_BINDING, _capture_handler
+
+# the console.debug + base64 hook this repo used before the binding capture
+LEGACY_HOOKS = r"""
+(() => {
+  const tag = (kind, url, body) => {
+    try {
+      const b64 = body ? btoa(unescape(encodeURIComponent(body))) : '';
+      console.debug('AA_HOOK|' + kind + '|' + url + '|' + b64);
+    } catch(e) {}
+  };
+  const origFetch = window.fetch;
+  window.fetch = async function(input, init={}) {
+    try {
+      const url = (typeof input === 'string') ? input : (input?.url || '');
+      const method = (init?.method || 'GET').toUpperCase();
+      if (method === 'POST') tag('fetch', url, typeof init?.body === 'string' ? init.body : '');
+    } catch(e) {}
+    return origFetch.apply(this, arguments);
+  };
+})();
+"""
+
+def _legacy_console_scrape(text, bucket):
+    if not isinstance(text, str) or not text.startswith("AA_HOOK|"): return
+    try:
+        _, kind, url, b64 = text.split("|", 3)
+        body = base64.b64decode(b64).decode("utf-8", "ignore") if b64 else ""
+        bucket.append({"url": url, "body": body, "source": f"console-{kind}"})
+    except: pass
+
+# fires POSTs the way the booking SPA does: shopping calls plus analytics noise
+FIRE_JS = r"""
+async ({n, size, noise}) => {
+  const body = JSON.stringify({slices: [{origin: 'LAX', destination: 'JFK'}], pad: 'x'.repeat(size)});
+  const jobs = [];
+  for (let i = 0; i < n; i++) jobs.push(fetch('https://www.aa.com/booking/api/search?i=' + i, {method: 'POST', body}));
+  for (let i = 0; i < noise; i++) jobs.push(fetch('https://www.aa.com/analytics/collect?i=' + i, {method: 'POST', body}));
+  await Promise.all(jobs);
+}
+"""
+
+def _ms(samples):
+    return {"median_ms": round(statistics.median(samples) * 1000, 3), "min_ms": round(min(samples) * 1000, 3)}
+
+
+"""
+PYTHON-SIDE COST ONLY: WHAT _console_scrape PAID PER SEARCH (EVERY CONSOLE
+MESSAGE INSPECTED, BASE64 DECODED) VS THE BINDING HANDLER (PAYLOAD ARRIVES
+AS A PARSED OBJECT, ALREADY FILTERED IN THE PAGE).
+"""
+def bench_python(n, size, noise, repeat):
+    body = json.dumps({"slices": [{"origin": "LAX", "destination": "JFK"}], "pad": "x" * size})
+    b64 = base64.b64encode(body.encode()).decode()
+    shop = [f"AA_HOOK|fetch|https://www.aa.com/booking/api/search?i={i}|{b64}" for i in range(n)]
+    other = [f"AA_HOOK|fetch|https://www.aa.com/analytics/collect?i={i}|{b64}" for i in range(noise)]
+    payloads = [{"kind": "fetch", "url": f"https://www.aa.com/booking/api/search?i={i}", "body": body} for i in range(n)]
+    # both arrive as protocol JSON frames that the driver decodes before our code runs
+    legacy_frames = [json.dumps({"text": m}) for m in shop + other]
+    binding_frames = [json.dumps(p) for p in payloads]
+
+    legacy, binding = [], []
+    for _ in range(repeat):
+        bucket = []
+        t0 = time.perf_counter()
+        for frame in legacy_frames:
+            _legacy_console_scrape(json.loads(frame)["text"], bucket)
+        legacy.append(time.perf_counter() - t0)
+
+        bucket = []
+        handler = _capture_handler(bucket)
+        t0 = time.perf_counter()
+        for frame in binding_frames:
+            handler(None, json.loads(frame))
+        binding.append(time.perf_counter() - t0)
+    return {"legacy": _ms(legacy), "binding": _ms(binding),
+            "ipc_bytes_legacy": sum(len(f) for f in legacy_frames),
+            "ipc_bytes_binding": sum(len(f) for f in binding_frames)}
+
+
+"""
+END-TO-END IN CHROMIUM: TIME FROM FIRING THE POSTS UNTIL PYTHON HOLDS
+ALL n CAPTURED SHOPPING BODIES, LEGACY HOOK VS BINDING HOOK. NOT YET RUN:
+THE PUBLISHED BEFORE/AFTER NUMBERS ARE FROM bench_python ONLY, SO THE
+BROWSER-SIDE OVERHEAD OF EITHER HOOK IS UNMEASURED.
+"""
+async def bench_browser(n, size, noise, repeat, channel):
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, channel=channel)
+        results = {}
+        for mode in ("legacy", "binding"):
+            samples = []
+            for _ in range(repeat):
+                ctx = await browser.new_context()
+                page = await ctx.new_page()
+                await page.route("**/*", lambda route: route.fulfill(status=200, body="<html></html>" if route.request.method == "GET" else "{}"))
+                bucket = []
+                if mode == "legacy":
+                    await page.add_init_script(LEGACY_HOOKS)
+                    page.on("console", lambda msg: _legacy_console_scrape(msg.text, bucket))
+                else:
+                    await page.add_init_script(INJECT_HOOKS)
+                    await page.expose_binding(CAPTURE_BINDING, _capture_handler(bucket))
+                await page.goto("https://www.aa.com/")
+                t0 = time.perf_counter()
+                await page.evaluate(FIRE_JS, {"n": n, "size": size, "noise": noise})
+                while sum("/booking/api/" in c["url"] for c in bucket) < n:
+                    await asyncio.sleep(0.001)
+                samples.append(time.perf_counter() - t0)
+                await ctx.close()
+            results[mode] = _ms(samples)
+        await browser.close()
+        return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=6, help="shopping POSTs per search")
+    ap.add_argument("--size", type=int, default=200_000, help="bytes per POST body")
+    ap.add_argument("--noise", type=int, default=20, help="non-shopping POSTs per search")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--browser", action="store_true", help="also measure end to end in Chromium")
+    ap.add_argument("--channel", default=None, help="e.g. chrome")
+    args = ap.parse_args()
+
+    report = {"python": bench_python(args.requests, args.size, args.noise, args.repeat)}
+    if args.browser:
+        report["browser"] = asyncio.run(bench_browser(args.requests, args.size, args.noise, args.repeat, args.channel))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
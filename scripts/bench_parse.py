@@ -0,0 +1,103 @@
+import argparse, asyncio, json, os, statistics, time
+from src import parse_pool
+from src.parse_aa import parse_from_dom
+from src.parse_bs4 import parse_titles_and_links
+
+
+def results_page(cards):
+    # a results page of the size AA serves: cards padded with the nav/markup around them
+    rows = []
+    for i in range(cards):
+        rows.append(
+            f'<li data-test-id="resultCard"><div class="card-head"><span data-test-id="flightNumber">AA {100 + i}</span>'
+            f'<span data-test-id="departTime">{6 + i % 16:02d}:{i * 7 % 60:02d}</span>'
+            f'<span data-test-id="arrivalTime">{9 + i % 14:02d}:05</span></div>'
+            f'<div class="fares">{"".join(f"<a href=/fare/{i}/{k} class=fare-link>Fare {k}</a>" for k in range(6))}'
+            f'<span data-test-id="milesAmount">{12_500 + 500 * (i % 40):,} miles</span>'
+            f'<span data-test-id="cashAmount">${189 + i % 300}</span><span data-test-id="taxesAmount">+$5.60</span></div>'
+            f'<p class="details">{"Nonstop · Main Cabin · Boeing 737 MAX 8 · " * 4}</p></li>'
+        )
+    nav = "".join(f'<a href="/i18n/page-{k}.jsp">Link {k}</a>' for k in range(400))
+    return (f'<html><head><title>Choose flights</title></head><body><nav>{nav}</nav>'
+            f'<ul data-test-id="resultsList">{"".join(rows)}</ul><footer>{nav}</footer></body></html>')
+
+
+async def _lag_probe(samples, stop, every=0.005):
+    # how late the loop wakes a 5 ms sleeper: what every other browser session waits on
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(every)
+        samples.append(time.perf_counter() - t0 - every)
+
+
+async def _search(html, pages, browser_s, mode):
+    flights = 0
+    for _ in range(pages):
+        await asyncio.sleep(browser_s)   # form fill / network waits of a real search
+        if mode == "inline":
+            flights += len(parse_from_dom(html))
+            parse_titles_and_links(html)
+        elif mode == "thread":
+            flights += len(await asyncio.to_thread(parse_from_dom, html))
+            await asyncio.to_thread(parse_titles_and_links, html)
+        else:
+            flights += len(await parse_pool.parse_dom(html))
+            await parse_pool.titles_and_links(html)
+    return flights
+
+
+async def _run(html, args, mode):
+    samples, stop = [], asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(samples, stop))
+    t0 = time.perf_counter()
+    flights = await asyncio.gather(*(_search(html, args.pages, args.browser_s, mode) for _ in range(args.searches)))
+    took = time.perf_counter() - t0
+    stop.set()
+    await probe
+    samples.sort()
+    parses = args.searches * args.pages
+    return {
+        "mode": mode,
+        "wall_s": round(took, 2),
+        "pages_per_s": round(parses / took, 1),
+        "flights": sum(flights),
+        "loop_lag_p50_ms": round(statistics.median(samples) * 1000, 1),
+        "loop_lag_p99_ms": round(samples[int(0.99 * (len(samples) - 1))] * 1000, 1),
+        "loop_lag_max_ms": round(samples[-1] * 1000, 1),
+    }
+
+
+"""
+RUNS --searches CONCURRENT SIMULATED SEARCHES ON ONE EVENT LOOP, EACH PARSING
+--pages RESULTS PAGES (parse_from_dom + parse_titles_and_links), WITH THE
+PARSE INLINE, IN THREADS, AND IN THE PARSE PROCESS POOL. REPORTS HOW LATE THE
+LOOP RAN (WHAT EVERY OTHER BROWSER SESSION FEELS) AND PAGES PARSED PER SECOND.
+python -m scripts.bench_parse --searches 8 --cards 600 --workers 4
+"""
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--searches", type=int, default=8)
+    ap.add_argument("--pages", type=int, default=4, help="results pages parsed per search")
+    ap.add_argument("--cards", type=int, default=600, help="result cards per page")
+    ap.add_argument("--browser-s", type=float, default=0.2, help="simulated browser time before each parse")
+    ap.add_argument("--workers", type=int, default=parse_pool.WORKERS or max((os.cpu_count() or 2) - 1, 1))
+    ap.add_argument("--modes", default="inline,thread,pool")
+    args = ap.parse_args()
+
+    html = results_page(args.cards)
+    parse_pool.WORKERS = args.workers
+    parse_pool.enable()
+    parse_pool.warm_up()
+    t0 = time.perf_counter()
+    cards = len(parse_from_dom(html))
+    one_ms = (time.perf_counter() - t0) * 1000
+    report = {"searches": args.searches, "pages_each": args.pages, "page_kb": len(html) // 1024, "cards": cards,
+              "one_parse_ms": round(one_ms, 1), "workers": args.workers, "cpus": os.cpu_count(), "runs": []}
+    for mode in args.modes.split(","):
+        report["runs"].append(asyncio.run(_run(html, args, mode)))
+    parse_pool.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
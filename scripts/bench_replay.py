@@ -0,0 +1,66 @@
+import argparse, asyncio, json, pathlib, statistics, time
+from datetime import date
+from src import replay
+from src.models import SearchMetadata
+
+def _summary(samples):
+    s = sorted(samples)
+    return {
+        "runs": len(s),
+        "min_ms": round(s[0] * 1000, 2),
+        "median_ms": round(statistics.median(s) * 1000, 2),
+        "p95_ms": round(s[min(int(len(s) * 0.95), len(s) - 1)] * 1000, 2),
+    }
+
+"""
+BENCHMARKS search_and_capture AND THE PARSE PIPELINE AGAINST A RECORDED
+CASSETTE SO EVERY COMMIT SEES BYTE-IDENTICAL TRAFFIC.
+
+RECORD ONCE:  python -m src --origin LAX --destination JFK --date 2025-12-15 --record lax-jfk
+THEN:         python -m scripts.bench_replay --cassette lax-jfk --origin LAX --destination JFK --date 2025-12-15
+"""
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cassette", required=True)
+    ap.add_argument("--origin", required=True)
+    ap.add_argument("--destination", required=True)
+    ap.add_argument("--date", required=True)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--parse-runs", type=int, default=50)
+    ap.add_argument("--output", default="data/processed/bench_replay.json")
+    args = ap.parse_args()
+
+    replay.configure("replay", args.cassette)
+    from src.playwright_flow import search_and_capture
+    from src.pipeline import build_result
+
+    meta = SearchMetadata(origin=args.origin, destination=args.destination, date=date.fromisoformat(args.date))
+    params = {"origin": meta.origin, "destination": meta.destination, "date": meta.date.isoformat()}
+
+    search_s, payload = [], None
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        payload = asyncio.run(search_and_capture(params))
+        search_s.append(time.perf_counter() - t0)
+
+    parse_s, flights = [], 0
+    for _ in range(args.parse_runs):
+        t0 = time.perf_counter()
+        flights = build_result(meta, payload).total_results
+        parse_s.append(time.perf_counter() - t0)
+
+    report = {
+        "cassette": args.cassette,
+        "search": _summary(search_s),
+        "parse": _summary(parse_s),
+        "flights": flights,
+        "captured_responses": len(payload["network_json"]),
+        "html_bytes": len(payload["page_html"]),
+    }
+    pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    pathlib.Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
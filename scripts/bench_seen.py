@@ -0,0 +1,90 @@
+import argparse, json, os, pathlib, tempfile, time, tracemalloc
+from src.seen_store import SeenStore, url_key
+from src.memprof import rss_bytes
+
+def _url(i, salt=""):
+    return f"https://host{i % 997}.example.com/section/{i // 997}/item-{i}{salt}?ref=nav&page={i % 50}"
+
+def _rate(n, seconds):
+    return round(n / seconds) if seconds else 0
+
+
+"""
+ESTIMATES WHAT A PLAIN PYTHON set() OF THE SAME URLS WOULD HOLD IN MEMORY
+BY MEASURING A SAMPLE AND SCALING IT UP.
+"""
+def set_bytes_estimate(n, sample=200_000):
+    sample = min(n, sample)
+    tracemalloc.start()
+    s = {_url(i) for i in range(sample)}
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del s
+    return int(size * n / sample)
+
+
+"""
+INSERTS N UNIQUE URLS, LOOKS UP A SAMPLE OF PRESENT AND ABSENT ONES,
+RE-OFFERS DUPLICATES THE WAY A CRAWL DOES, THEN TIMES A REOPEN (RESUME).
+python -m scripts.bench_seen --n 10000000 --fp-rate 0.01
+"""
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=10_000_000)
+    ap.add_argument("--fp-rate", type=float, default=0.01)
+    ap.add_argument("--lookups", type=int, default=1_000_000, help="present and absent lookups, each")
+    ap.add_argument("--dir", default=None, help="where to put the store (default: a temp dir)")
+    args = ap.parse_args()
+
+    root = pathlib.Path(args.dir or tempfile.mkdtemp(prefix="bench-seen-"))
+    path = root / "seen.db"
+    for p in (path, path.with_suffix(".bloom")):
+        if p.exists():
+            os.remove(p)
+    rss0 = rss_bytes(os.getpid())
+    report = {"n": args.n, "fp_rate": args.fp_rate}
+
+    store = SeenStore(path, capacity=args.n, fp_rate=args.fp_rate)
+    t0 = time.perf_counter()
+    for i in range(args.n):
+        store.add(_url(i))
+    store.flush()
+    took = time.perf_counter() - t0
+    report["insert_per_s"] = _rate(args.n, took)
+    report["insert_s"] = round(took, 1)
+    report["disk_lookups_during_insert"] = store.counters["disk_lookups"]
+
+    m = min(args.lookups, args.n)
+    step = max(1, args.n // m)
+    t0 = time.perf_counter()
+    hits = sum(_url(i) in store for i in range(0, args.n, step)[:m])
+    report["lookup_present_per_s"] = _rate(m, time.perf_counter() - t0)
+
+    # Bloom hits for never-seen URLs at exactly n entries: each one costs a disk lookup
+    fps = sum(url_key(_url(i, "#absent")) in store.bloom for i in range(m))
+    report["observed_fp_rate"] = round(fps / m, 5)
+    t0 = time.perf_counter()
+    new = sum(store.add(_url(i, "#absent")) for i in range(m))
+    report["add_absent_per_s"] = _rate(m, time.perf_counter() - t0)
+
+    # crawl pattern: the same nav links offered again and again
+    t0 = time.perf_counter()
+    dup = sum(not store.add(_url(i % 10_000)) for i in range(m))
+    report["add_duplicate_per_s"] = _rate(m, time.perf_counter() - t0)
+    assert hits == m and new == m and dup == m, (hits, new, dup)
+
+    report["bloom_mb"] = round(len(store.bloom.array) / 1e6, 1)
+    report["bloom_hashes"] = store.bloom.hashes
+    report["rss_growth_mb"] = round((rss_bytes(os.getpid()) - rss0) / 1e6, 1)
+    store.close()
+    report["sqlite_mb"] = round(path.stat().st_size / 1e6, 1)
+
+    t0 = time.perf_counter()
+    SeenStore(path, capacity=args.n, fp_rate=args.fp_rate).close()
+    report["reopen_s"] = round(time.perf_counter() - t0, 2)
+    report["python_set_mb_estimate"] = round(set_bytes_estimate(args.n) / 1e6, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse, json, os, random, pathlib, tempfile, time
+from datetime import date, timedelta
+from src.flightstore import FlightStore
+from src.models import FlightItem, SearchMetadata, SearchResult
+
+AIRPORTS = ["LAX", "JFK", "SFO", "ORD", "DFW", "MIA", "BOS", "SEA", "ATL", "DEN", "PHX", "CLT"]
+
+
+def _result(rng, day0, flights):
+    o, d = rng.sample(AIRPORTS, 2)
+    meta = SearchMetadata(origin=o, destination=d, date=day0 + timedelta(days=rng.randrange(330)))
+    items = []
+    for i in range(flights):
+        points = rng.randrange(7_500, 90_000, 500)
+        cash = round(rng.uniform(89, 1400), 2)
+        items.append(FlightItem(flight_number=f"AA{rng.randrange(1, 3000)}", departure_time=f"{6 + i % 16:02d}:{i * 7 % 60:02d}",
+                                arrival_time="23:59", points_required=points, cash_price_usd=cash,
+                                taxes_fees_usd=5.6, cpp=round((cash - 5.6) / points * 100, 2)))
+    return SearchResult(search_metadata=meta, flights=items, total_results=len(items))
+
+
+def _ms(fn, repeat=20):
+    fn()   # warm the page cache
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - t0) * 1000 / repeat, 2)
+
+
+"""
+FILLS A FLIGHT STORE WITH N SYNTHETIC FLIGHTS (12 AIRPORTS, ~1 YEAR OF DATES,
+REPEATED SCRAPES) AND TIMES THE QUERY SUBCOMMAND'S QUERIES.
+python -m scripts.bench_store --rows 3000000
+"""
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=3_000_000)
+    ap.add_argument("--per-search", type=int, default=40, help="flights per stored search")
+    ap.add_argument("--batch", type=int, default=500, help="searches per add_many() transaction")
+    ap.add_argument("--dir", default=None, help="where to put the store (default: a temp dir)")
+    args = ap.parse_args()
+
+    path = pathlib.Path(args.dir or tempfile.mkdtemp(prefix="bench-store-")) / "flights.db"
+    for p in (path, path.with_suffix(".db-wal"), path.with_suffix(".db-shm")):
+        if p.exists():
+            os.remove(p)
+    rng = random.Random(7)
+    day0 = date(2026, 1, 1)
+    store = FlightStore(path)
+    report = {"rows": args.rows}
+
+    # build the results up front so only the inserts are timed
+    searches = args.rows // args.per_search
+    template = [_result(rng, day0, args.per_search) for _ in range(min(searches, 2_000))]
+    t0 = time.perf_counter()
+    scraped = time.time() - 30 * 86400
+    for start in range(0, searches, args.batch):
+        batch = [template[i % len(template)] for i in range(start, min(start + args.batch, searches))]
+        store.add_many(batch, scraped + start * 5)
+    took = time.perf_counter() - t0
+    report["insert_rows_per_s"] = round(args.rows / took)
+    report["insert_s"] = round(took, 1)
+    report["db_mb"] = store.stats()["db_mb"]
+
+    route = dict(origin="LAX", destination="JFK", date_from="2026-03-01", date_to="2026-05-31")
+    report["best_route_range_ms"] = _ms(lambda: store.best(limit=10, **route))
+    report["best_per_date_ms"] = _ms(lambda: store.best(limit=100, per_date=True, **route))
+    report["best_latest_ms"] = _ms(lambda: store.best(limit=10, latest=True, **route))
+    report["best_overall_ms"] = _ms(lambda: store.best(limit=10))
+    report["best_last_hour_ms"] = _ms(lambda: store.best(limit=10, since=scraped + searches * 5 - 3600))
+    report["plan_route"] = store.explain(**route)
+    store.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
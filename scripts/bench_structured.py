@@ -0,0 +1,91 @@
+import argparse, glob, json, random, statistics, time
+import extruct
+from src import structured, blobstore
+
+SNAPSHOT_KINDS = ("results.html", "last.html", "home.html", "page.html", "crawl.html")
+DEFAULT_HTML = ["data/debug/*.html"]   # real aa.com pages captured by the flows
+
+# stand-in for a booking results page when no snapshots have been captured yet
+def _synthetic_page(cards, seed=0):
+    rnd = random.Random(seed)
+    head = (
+        '<html prefix="og: http://ogp.me/ns#"><head><title>Flights</title>'
+        '<meta property="og:title" content="LAX to JFK &amp; more"><meta property="og:type" content="website">'
+        '<meta property="og:image" content="https://www.aa.com/og.png"><meta name="viewport" content="width=device-width">'
+        + "".join(f'<link rel="preload" href="/static/chunk{i}.js" as="script">' for i in range(40))
+        + '<script type="application/ld+json">{"@context":"https://schema.org","@type":"Organization","name":"American Airlines","url":"https://www.aa.com"}</script>'
+        + "<script>" + "var x=1;" * 2000 + "</script></head><body>"
+    )
+    body = []
+    for i in range(cards):
+        dep = f"{rnd.randint(5, 22):02d}:{rnd.choice(['00', '15', '30', '45'])}"
+        body.append(
+            f'<li class="card" data-test-id="resultCard"><div class="row"><span data-test-id="flightNumber">AA {rnd.randint(10, 2999)}</span>'
+            f'<span data-test-id="departTime">{dep}</span><span data-test-id="arrivalTime">23:59</span>'
+            + "".join(f'<div class="fare f{j}"><span>{rnd.randint(5, 90)},000 miles</span><span>${rnd.randint(99, 999)}</span>'
+                      f'<button aria-label="Select fare {j}">Select</button></div>' for j in range(5))
+            + "</div></li>"
+        )
+    product = ('<div itemscope itemtype="https://schema.org/Product"><span itemprop="name">Main Cabin</span>'
+               '<div itemprop="offers" itemscope itemtype="https://schema.org/Offer"><span itemprop="price">289.00</span>'
+               '<meta itemprop="priceCurrency" content="USD"></div></div>')
+    ld = ('<script type="application/ld+json">[{"@context":"https://schema.org","@type":"Flight","flightNumber":"AA100"},'
+          '{"@context":"https://schema.org","@type":"Flight","flightNumber":"AA200"}]</script>')
+    return head + "<ul>" + "".join(body) + "</ul>" + product + ld + "</body></html>"
+
+
+def _snapshots(paths, limit):
+    docs = []
+    for pattern in paths:
+        for p in sorted(glob.glob(pattern)):
+            docs.append((p, open(p, encoding="utf-8", errors="replace").read()))
+    if not docs:
+        store = blobstore.default()
+        for kind in SNAPSHOT_KINDS:
+            for ref in store.refs(kind=kind, limit=limit):
+                docs.append((f"blob:{kind}:{ref['sha256'][:12]}", store.get_text(ref["sha256"])))
+    return docs[:limit]
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - t0)
+    return out, statistics.median(samples) * 1000
+
+
+"""
+TIMES extruct.extract AGAINST src.structured.extract ON SAVED SNAPSHOTS
+(--html GLOBS, DEFAULT data/debug/*.html; THEN THE BLOB STORE; SYNTHETIC
+PAGES ONLY IF THERE ARE NONE) AND CHECKS BOTH RETURN THE SAME ITEMS.
+python -m scripts.bench_structured [--html 'data/debug/*.html'] [--syntaxes json-ld opengraph]
+"""
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--html", nargs="*", default=DEFAULT_HTML, help="glob(s) of saved pages (default: data/debug/*.html)")
+    ap.add_argument("--syntaxes", nargs="+", default=list(structured.SYNTAXES), choices=structured.SYNTAXES)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    docs = _snapshots(args.html, args.limit)
+    if not docs:
+        docs = [(f"synthetic-{n}-cards", _synthetic_page(n, seed=n)) for n in (20, 100, 400)]
+
+    rows, base_total, fast_total = [], 0.0, 0.0
+    for name, html in docs:
+        base, base_ms = _time(lambda: extruct.extract(html, base_url="https://www.aa.com/", syntaxes=args.syntaxes, uniform=False), args.repeat)
+        fast, fast_ms = _time(lambda: structured.extract(html, base_url="https://www.aa.com/", syntaxes=args.syntaxes), args.repeat)
+        same = json.loads(json.dumps(base)) == json.loads(json.dumps(fast))
+        base_total += base_ms; fast_total += fast_ms
+        rows.append({"doc": name, "kb": len(html) // 1024, "extruct_ms": round(base_ms, 2), "structured_ms": round(fast_ms, 2),
+                     "speedup": round(base_ms / fast_ms, 1) if fast_ms else None, "same_items": same,
+                     "items": {k: len(v) for k, v in fast.items()}})
+    print(json.dumps({"syntaxes": args.syntaxes, "docs": rows,
+                      "total_speedup": round(base_total / fast_total, 1) if fast_total else None}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse, os, subprocess, sys
+
+# modules that must stay out of CLI startup; they load when a command needs them
+HEAVY = ("playwright", "pydantic", "bs4", "lxml", "httpx", "extruct", "parsel")
+
+CASES = {
+    "import": ["-c", "import src.__main__"],
+    "--help": ["-m", "src", "--help"],
+    "parse-only --help": ["-m", "src", "parse-only", "--help"],
+}
+
+def _importtime(args):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    mods = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            mods[name.strip()] = (int(cumulative), name.startswith("  "))
+        except ValueError:
+            continue  # header line
+    return mods
+
+def _total_ms(mods):
+    """Cumulative time of top-level imports (nested ones are already counted)."""
+    return sum(us for us, nested in mods.values() if not nested) / 1000
+
+
+"""
+IMPORT-TIME REGRESSION CHECK FOR THE CLI: FAILS WHEN A HEAVY DEPENDENCY
+LEAKS INTO STARTUP OR CLI IMPORTS GET SLOWER THAN THE BUDGET.
+python -m scripts.check_importtime [--budget-ms 60]
+"""
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=60.0, help="max import time on top of bare interpreter startup")
+    args = ap.parse_args()
+
+    # interpreter startup (site, encodings, ...) is not ours to budget
+    baseline = _importtime(["-c", "pass"])
+    failed = False
+    for label, cmd in CASES.items():
+        mods = _importtime(cmd)
+        leaked = sorted({m.split(".")[0] for m in mods} & set(HEAVY))
+        took_ms = _total_ms(mods) - _total_ms(baseline)
+        status = "ok"
+        if leaked:
+            status, failed = f"FAIL: imports {', '.join(leaked)}", True
+        elif took_ms > args.budget_ms:
+            status, failed = f"FAIL: over {args.budget_ms:.0f} ms budget", True
+        print(f"{label:<20} {took_ms:8.1f} ms  {len(mods):4d} modules  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import json, pathlib, os
 from src.fetch import fetch_text
 from src.parse_bs4 import parse_titles_and_links
+from src import blobstore
 
 URL = os.environ.get("SCRAPE_URL", "https://example.org")
 
@@ -9,11 +10,10 @@ TESTING SCRIPT TO CHECK INCREMENTAL PROGRESS
 """
 def main():
     html = fetch_text(URL) # get textual html content
-    pathlib.Path("data/raw").mkdir(parents=True, exist_ok=True)
     pathlib.Path("data/processed").mkdir(parents=True, exist_ok=True)
 
-    # save raw html data
-    (pathlib.Path("data/raw") / "page.html").write_text(html, encoding="utf-8")
+    # save raw html data (compressed, stored once per distinct page)
+    sha = blobstore.default().put(html, url=URL, kind="page.html")
 
     # parse and save JSON
     res = parse_titles_and_links(html)
@@ -21,7 +21,7 @@ def main():
         json.dumps(res, ensure_ascii=False, indent=2), encoding="utf-8"
     )
 
-    print("Scrape Complete: Information available in data/processed/out.json")
+    print(f"Scrape Complete: Information available in data/processed/out.json (raw page: blob {sha[:12]})")
 
 
 if __name__ == "__main__":
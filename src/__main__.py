@@ -1,28 +1,32 @@
-import argparse, json, pathlib, asyncio
-from datetime import date
-from .models import SearchMetadata, FlightItem, SearchResult
-from .cpp import cpp_cents_per_point
-from .playwright_flow import search_and_capture
-from .parse_aa import parse_from_network, parse_from_dom
+import argparse, sys
 
+# Heavy modules (playwright, pydantic models, bs4/lxml, the flow) are imported
+# inside the command that needs them so `--help` and parse-only start fast.
 
 """
-CLI to test web scraper application
+Subcommands dispatched on the first argument; anything else is the
+default search command, so `python -m src --origin ...` keeps working
 """
-def main():
-    """
-    Required arguments
-    """
-    ap = argparse.ArgumentParser()
+COMMANDS = ("search", "serve", "parse-only", "crawl", "watch", "query")
+
+
+def _add_search_args(ap):
     ap.add_argument("--origin", required=True)
     ap.add_argument("--destination", required=True)
     ap.add_argument("--date", required=True)      # YYYY-MM-DD
     ap.add_argument("--passengers", type=int, default=1)
     ap.add_argument("--cabin", default="economy")
     ap.add_argument("--output", default="out.json")
-    args = ap.parse_args()
+    ap.add_argument("--incremental", action="store_true",
+                    help="write only what changed since the last snapshot of this search")
+    ap.add_argument("--store", action="store_true",
+                    help="also add the flights to the queryable store (data/state/flights.db, see `query`)")
+
 
-    meta = SearchMetadata(
+def _metadata(args):
+    from datetime import date
+    from .models import SearchMetadata
+    return SearchMetadata(
         origin=args.origin,
         destination=args.destination,
         date=date.fromisoformat(args.date),
@@ -30,31 +34,121 @@ def main():
         cabin_class=args.cabin,
     )
 
-    payload = asyncio.run(search_and_capture({
-        "origin": meta.origin, "destination": meta.destination, "date": meta.date.isoformat()
-    }))
-    flights = parse_from_network(payload["network_json"])
-    if not flights:
-        flights = parse_from_dom(payload["page_html"])
-
-    items = []
-    for f in flights:
-        cpp = cpp_cents_per_point(f["cash_price_usd"], f["taxes_fees_usd"], f["points_required"])
-        items.append(FlightItem(
-            flight_number=f["flight_number"],
-            departure_time=f["departure_time"],
-            arrival_time=f["arrival_time"],
-            points_required=f["points_required"],
-            cash_price_usd=f["cash_price_usd"],
-            taxes_fees_usd=f["taxes_fees_usd"],
-            cpp=cpp,
-        ))
-
-    result = SearchResult(search_metadata=meta, flights=items, total_results=len(items))
-    pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
-    with open(args.output, "w", encoding="utf-8") as f:
+
+def _write_result(result, output, incremental=False, store=False):
+    import pathlib
+    pathlib.Path(output).parent.mkdir(parents=True, exist_ok=True)
+    if store:
+        from . import flightstore
+        flightstore.default().add(result)
+    if incremental:
+        from . import snapshots
+        delta = snapshots.default().update(result)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(delta.model_dump_json(indent=2))
+        if delta.no_flights:
+            print(f"⚠️ Wrote {output}: search returned no flights, previous snapshot kept")
+            return
+        print(f"✅ Wrote {output}: +{len(delta.added)} -{len(delta.removed)} ~{len(delta.changed)} "
+              f"({delta.unchanged} unchanged{', first snapshot' if delta.first_snapshot else ''})")
+        return
+    with open(output, "w", encoding="utf-8") as f:
         f.write(result.model_dump_json(indent=2))
-    print(f"✅ Wrote {args.output} with {len(items)} flights")
+    print(f"✅ Wrote {output} with {result.total_results} flights")
+
+
+"""
+CLI to test web scraper application
+"""
+def search_main(argv):
+    """
+    Required arguments
+    """
+    ap = argparse.ArgumentParser(prog="python -m src [search]")
+    _add_search_args(ap)
+    ap.add_argument("--record", metavar="CASSETTE", help="record all traffic into data/cassettes/CASSETTE")
+    ap.add_argument("--replay", metavar="CASSETTE", help="serve traffic offline from a recorded cassette")
+    ap.add_argument("--memprofile", action="store_true", help="print a per-stage memory profile")
+    ap.add_argument("--paired", action="store_true", help="cash and award searches together (direct API), joined for real cpp")
+    ap.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                    help="overall time budget; past it the search is cancelled and partial artifacts kept")
+    args = ap.parse_args(argv)
+    if args.memprofile:
+        from . import memprof
+        memprof.ENABLED = True
+    if args.record or args.replay:
+        from . import replay
+        replay.configure("record" if args.record else "replay", args.record or args.replay)
+
+    import asyncio
+    from . import metrics
+    metrics.start_from_env()
+    from .pipeline import run_search, run_paired_search
+    meta = _metadata(args)
+    from .deadline import DeadlineExceeded
+    try:
+        result = asyncio.run((run_paired_search if args.paired else run_search)(meta, deadline_s=args.deadline))
+    except DeadlineExceeded as e:
+        sys.exit(f"⏰ {e} (partial artifacts are in the blob store)")
+    _write_result(result, args.output, args.incremental, args.store)
+    if result.unmatched:
+        print(f"⚠️ {len(result.unmatched)} offer(s) had no cash/award counterpart (see 'unmatched')")
+
+
+"""
+Re-parse the newest stored results page and captured network JSON for
+a search (or explicit files) without starting Playwright
+"""
+def parse_only_main(argv):
+    ap = argparse.ArgumentParser(prog="python -m src parse-only")
+    _add_search_args(ap)
+    ap.add_argument("--html", help="saved results page (default: newest stored for this search)")
+    ap.add_argument("--network", help="captured network JSON dump (default: newest stored for this search)")
+    args = ap.parse_args(argv)
+
+    import json, pathlib
+    from . import blobstore
+    from .pipeline import build_result
+    store = blobstore.default()
+    key = blobstore.search_key({"origin": args.origin, "destination": args.destination, "date": args.date})
+
+    def _load(path, kind, read):
+        if path:
+            p = pathlib.Path(path)
+            return read(p.read_text(encoding="utf-8")) if p.exists() else None
+        sha = store.latest(key=key, kind=kind)
+        return read(store.get_text(sha)) if sha else None
+
+    payload = {
+        "network_json": _load(args.network, "network.json", json.loads) or [],
+        "page_html": _load(args.html, "results.html", str) or "",
+    }
+    if not payload["network_json"] and not payload["page_html"]:
+        ap.error(f"nothing to parse: no stored results for {key} and no --html/--network files")
+    _write_result(build_result(_metadata(args), payload), args.output, args.incremental, args.store)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if argv and argv[0] in COMMANDS else None
+    rest = argv[1:] if cmd else argv
+    if cmd == "serve":
+        from .serve import main as serve_main
+        return serve_main(rest)
+    if cmd == "parse-only":
+        return parse_only_main(rest)
+    if cmd == "crawl":
+        from .crawl import main as crawl_main
+        return crawl_main(rest)
+    if cmd == "watch":
+        from .watch import main as watch_main
+        return watch_main(rest)
+    if cmd == "query":
+        from .flightstore import main as query_main
+        return query_main(rest)
+    if not cmd and argv[:1] in (["-h"], ["--help"]):
+        print(f"commands: {', '.join(COMMANDS)} (default: search)\n")
+    return search_main(rest)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,186 @@
+# src/blobstore.py
+import os, json, time, sqlite3, hashlib, pathlib, threading
+from typing import Any, Dict, List, Optional, Union
+
+import zstandard
+
+ROOT = pathlib.Path(os.getenv("AA_BLOB_DIR", "data/blobs"))
+LEVEL = int(os.getenv("AA_BLOB_LEVEL", "6"))                 # zstd level: HTML compresses ~10x at 3-6
+MAX_AGE_DAYS = float(os.getenv("AA_BLOB_MAX_AGE_DAYS", "30"))  # default for gc
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+  sha256      TEXT PRIMARY KEY,
+  size        INTEGER NOT NULL,       -- uncompressed bytes
+  stored      INTEGER NOT NULL,       -- compressed bytes on disk
+  created     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+  id          INTEGER PRIMARY KEY,
+  sha256      TEXT NOT NULL REFERENCES blobs(sha256),
+  url         TEXT,
+  search_key  TEXT,
+  kind        TEXT,                   -- results.html | network.json | page.html | ...
+  created     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_key ON refs(search_key, kind, created);
+CREATE INDEX IF NOT EXISTS refs_url ON refs(url, created);
+CREATE INDEX IF NOT EXISTS refs_sha ON refs(sha256);
+CREATE INDEX IF NOT EXISTS refs_created ON refs(created);
+"""
+
+
+def search_key(params: Dict[str, Any]) -> str:
+    """LAX-JFK-2025-12-15 style key shared by every artifact of one search."""
+    return f"{params['origin']}-{params['destination']}-{params['date']}".upper()
+
+
+"""
+Content-addressed store for raw evidence: every payload is zstd
+compressed under objects/<sha256[:2]>/<sha256>.zst, so identical pages
+are kept once, and an SQLite index maps (url, search key, kind, time)
+to the blob. Old references are dropped by gc(), and blobs nobody
+refers to any more are deleted with them.
+"""
+class BlobStore:
+    def __init__(self, root: pathlib.Path = ROOT, level: int = LEVEL):
+        self.root = pathlib.Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self._lock = threading.Lock()   # crawl parse threads share one connection
+        self.db = sqlite3.connect(str(self.root / "index.db"), timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def path(self, sha: str) -> pathlib.Path:
+        return self.objects / sha[:2] / f"{sha}.zst"
+
+    # ---------- write ----------
+    def put(self, data: Union[bytes, str], url: Optional[str] = None, key: Optional[str] = None,
+            kind: Optional[str] = None) -> str:
+        """Stores data (once per content) and records a reference; returns its sha256."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        sha = hashlib.sha256(raw).hexdigest()
+        path = self.path(sha)
+        stored = path.stat().st_size if path.exists() else self._write(path, raw)
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute("BEGIN")
+            self.db.execute(
+                "INSERT OR IGNORE INTO blobs(sha256, size, stored, created) VALUES (?, ?, ?, ?)",
+                (sha, len(raw), stored, now),
+            )
+            self.db.execute(
+                "INSERT INTO refs(sha256, url, search_key, kind, created) VALUES (?, ?, ?, ?, ?)",
+                (sha, url, key, kind, now),
+            )
+        if not path.exists():   # a concurrent gc() removed it between the check and the insert
+            self._write(path, raw)
+        return sha
+
+    def _write(self, path: pathlib.Path, raw: bytes) -> int:
+        blob = zstandard.ZstdCompressor(level=self.level).compress(raw)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, path)   # same bytes whoever wins the race
+        return len(blob)
+
+    def put_json(self, obj: Any, **meta) -> str:
+        return self.put(json.dumps(obj, ensure_ascii=False, separators=(",", ":")), **meta)
+
+    # ---------- read ----------
+    def get(self, sha: str) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(self.path(sha).read_bytes())
+
+    def get_text(self, sha: str) -> str:
+        return self.get(sha).decode("utf-8")
+
+    def get_json(self, sha: str) -> Any:
+        return json.loads(self.get(sha))
+
+    def latest(self, key: Optional[str] = None, kind: Optional[str] = None, url: Optional[str] = None) -> Optional[str]:
+        """sha256 of the newest reference matching the given fields."""
+        refs = self.refs(key=key, kind=kind, url=url, limit=1)
+        return refs[0]["sha256"] if refs else None
+
+    def refs(self, key: Optional[str] = None, kind: Optional[str] = None, url: Optional[str] = None,
+             since: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        where, args = [], []
+        for col, val in (("search_key", key), ("kind", kind), ("url", url)):
+            if val is not None:
+                where.append(f"{col} = ?"); args.append(val)
+        if since is not None:
+            where.append("created >= ?"); args.append(since)
+        sql = "SELECT id, sha256, url, search_key, kind, created FROM refs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self.db.execute(sql + " ORDER BY created DESC, id DESC LIMIT ?", (*args, limit)).fetchall()
+        cols = ("id", "sha256", "url", "search_key", "kind", "created")
+        return [dict(zip(cols, r)) for r in rows]
+
+    # ---------- maintenance ----------
+    def gc(self, max_age_days: float = MAX_AGE_DAYS) -> Dict[str, int]:
+        """Drops references older than max_age_days, then blobs (and stray files) nothing points at."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            refs = self.db.execute("DELETE FROM refs WHERE created < ?", (cutoff,)).rowcount
+            dead = [r[0] for r in self.db.execute(
+                "SELECT sha256 FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM refs)")]
+            self.db.executemany("DELETE FROM blobs WHERE sha256 = ?", ((s,) for s in dead))
+            known = {r[0] for r in self.db.execute("SELECT sha256 FROM blobs")}
+        freed = 0
+        for sha in dead:
+            try:
+                p = self.path(sha); freed += p.stat().st_size; p.unlink()
+            except Exception:
+                pass
+        # files from a crashed put(), older than the cutoff and never indexed
+        for p in self.objects.glob("*/*"):
+            try:
+                if p.name.split(".")[0] not in known and p.stat().st_mtime < cutoff:
+                    freed += p.stat().st_size; p.unlink()
+            except Exception:
+                pass
+        for d in self.objects.iterdir():
+            try: d.rmdir()   # only succeeds for emptied shard dirs
+            except OSError: pass
+        return {"refs": refs, "blobs": len(dead), "bytes_freed": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            blobs, size, stored = self.db.execute("SELECT count(*), coalesce(sum(size),0), coalesce(sum(stored),0) FROM blobs").fetchone()
+            refs = self.db.execute("SELECT count(*) FROM refs").fetchone()[0]
+            logical = self.db.execute("SELECT coalesce(sum(b.size),0) FROM refs r JOIN blobs b USING(sha256)").fetchone()[0]
+        return {"blobs": blobs, "refs": refs, "raw_mb": round(size / 1e6, 2), "stored_mb": round(stored / 1e6, 2),
+                "referenced_mb": round(logical / 1e6, 2),
+                "ratio": round(logical / stored, 1) if stored else 0.0}
+
+
+_default: Optional[BlobStore] = None
+
+def default() -> BlobStore:
+    """Process-wide store under AA_BLOB_DIR, opened on first use."""
+    global _default
+    if _default is None:
+        _default = BlobStore()
+    return _default
+
+
+# -------- CLI: python -m src.blobstore {stats,gc} --------
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("action", choices=["stats", "gc"])
+    ap.add_argument("--max-age-days", type=float, default=MAX_AGE_DAYS)
+    args = ap.parse_args()
+    if args.action == "gc":
+        print(f"🧹 {default().gc(args.max_age_days)}")
+    print(f"📦 {default().stats()}")
@@ -0,0 +1,299 @@
+# src/crawl.py
+import os, sys, json, time, asyncio, pathlib, argparse, contextlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from w3lib.url import canonicalize_url
+from robotexclusionrulesparser import RobotExclusionRulesParser
+
+from .config import SETTINGS
+from .fetch import get_async_client
+from .seen_store import SeenStore, CAPACITY, FP_RATE
+from . import replay, blobstore, parse_pool
+
+CONCURRENCY = int(os.getenv("AA_CRAWL_CONCURRENCY", "16"))   # fetches in flight across all hosts
+PER_HOST = int(os.getenv("AA_CRAWL_PER_HOST", "2"))          # fetches in flight per host
+DELAY_S = float(os.getenv("AA_CRAWL_DELAY", "1.0"))          # min gap between request starts per host
+MAX_PAGES = int(os.getenv("AA_CRAWL_MAX_PAGES", "1000"))
+MAX_DEPTH = int(os.getenv("AA_CRAWL_MAX_DEPTH", "3"))
+OUTPUT = pathlib.Path("data/processed/crawl.jsonl")
+STATE_PATH = pathlib.Path(os.getenv("AA_CRAWL_STATE", "data/state/crawl.db"))
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def canonical(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Absolute, canonical form used for dedup (fragment dropped, query sorted); None for non-http links."""
+    try:
+        url = urljoin(base, url.strip()) if base else url.strip()
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    return canonicalize_url(url)
+
+
+"""
+Politeness state for one host: a concurrency cap, a minimum gap between
+request starts (raised to robots.txt Crawl-delay) and the parsed rules.
+"""
+class Host:
+    def __init__(self, per_host: int, delay: float):
+        self.sem = asyncio.Semaphore(per_host)
+        self.delay = delay
+        self.next_at = 0.0
+        self.robots: Optional[RobotExclusionRulesParser] = None
+        self.robots_lock = asyncio.Lock()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        async with self.sem:
+            loop = asyncio.get_running_loop()
+            # reserve the start time before sleeping so waiters line up delay apart
+            start = max(loop.time(), self.next_at)
+            self.next_at = start + self.delay
+            if start > loop.time():
+                await asyncio.sleep(start - loop.time())
+            yield
+
+
+"""
+Asyncio crawl frontier. Pages stream fetch -> parse -> sink through
+bounded queues: fetch workers hand HTML to parse workers (bs4 runs off
+the event loop), parse workers schedule the canonical links and emit a
+record, the sink appends JSONL. A frontier item is only marked done
+after its links are scheduled, so frontier.join() means the crawl is over.
+Seen URLs and the pending frontier live in a SeenStore, so a crawl
+restarted on the same state path resumes instead of starting over.
+"""
+class Crawler:
+    def __init__(self, seeds: Iterable[str], max_pages: int = MAX_PAGES, max_depth: int = MAX_DEPTH,
+                 concurrency: int = CONCURRENCY, per_host: int = PER_HOST, delay: float = DELAY_S,
+                 same_host: bool = True, output: pathlib.Path = OUTPUT, progress_s: float = 2.0,
+                 state: pathlib.Path = STATE_PATH, fresh: bool = False,
+                 capacity: int = CAPACITY, fp_rate: float = FP_RATE, keep_raw: bool = False):
+        self.seeds = [u for u in (canonical(s) for s in seeds) if u]
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.allowed = {urlsplit(u).hostname for u in self.seeds} if same_host else None
+        self.output = pathlib.Path(output)
+        self.progress_s = progress_s
+        self.state_path = pathlib.Path(state)
+        self.fresh = fresh
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.blobs = blobstore.default() if keep_raw else None
+
+        self.frontier: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+        self.to_parse: "asyncio.Queue[Tuple[str, int, str, Dict[str, Any]]]" = asyncio.Queue(maxsize=concurrency * 2)
+        self.to_sink: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=concurrency * 4)
+        self.seen: Optional[SeenStore] = None
+        self.hosts: Dict[str, Host] = {}
+        self.scheduled = 0
+        self.stats = {"pages": 0, "errors": 0, "disallowed": 0, "bytes": 0, "inflight": 0}
+        self.client = None
+
+    # ---------- frontier ----------
+    def schedule(self, url: str, depth: int) -> bool:
+        if self.scheduled >= self.max_pages or depth > self.max_depth:
+            return False
+        if self.allowed is not None and urlsplit(url).hostname not in self.allowed:
+            return False
+        if not self.seen.add(url):
+            return False
+        self.scheduled += 1
+        self.seen.stage_meta("scheduled", self.scheduled)   # persisted with this URL's seen/pending rows
+        self.seen.push_pending(url, depth)
+        self.frontier.put_nowait((url, depth))
+        return True
+
+    def _finish(self, url: str):
+        self.seen.done_pending(url)
+        self.frontier.task_done()
+
+    def _host(self, url: str) -> Host:
+        key = urlsplit(url).netloc
+        if key not in self.hosts:
+            self.hosts[key] = Host(self.per_host, self.delay)
+        return self.hosts[key]
+
+    # ---------- robots.txt ----------
+    async def _allowed(self, url: str, host: Host) -> bool:
+        async with host.robots_lock:
+            if host.robots is None:
+                parts = urlsplit(url)
+                rules = RobotExclusionRulesParser()
+                try:
+                    r = await self.client.get(f"{parts.scheme}://{parts.netloc}/robots.txt")
+                    if r.status_code >= 500:
+                        rules.parse("User-agent: *\nDisallow: /")  # RFC 9309: unreachable means disallow
+                    elif r.status_code < 400:
+                        rules.parse(r.text)
+                except Exception:
+                    rules.parse("User-agent: *\nDisallow: /")
+                delay = rules.get_crawl_delay(SETTINGS.user_agent)
+                if delay:
+                    host.delay = max(host.delay, float(delay))
+                host.robots = rules
+        return host.robots.is_allowed(SETTINGS.user_agent, url)
+
+    # ---------- pipeline stages ----------
+    # A cancelled item is deliberately not finished: it stays pending in the
+    # SeenStore and a resumed crawl fetches it again.
+    async def _fetch_worker(self):
+        while True:
+            url, depth = await self.frontier.get()
+            try:
+                host = self._host(url)
+                if not await self._allowed(url, host):
+                    self.stats["disallowed"] += 1
+                    self._finish(url)
+                    continue
+                async with host.slot():
+                    self.stats["inflight"] += 1
+                    t0 = time.monotonic()
+                    try:
+                        r = await self.client.get(url)
+                    finally:
+                        self.stats["inflight"] -= 1
+                rec = {"url": url, "final_url": str(r.url), "depth": depth, "status": r.status_code,
+                       "content_type": r.headers.get("content-type", ""),
+                       "elapsed_ms": round((time.monotonic() - t0) * 1000), "fetched_at": time.time()}
+                self.stats["pages"] += 1
+                self.stats["bytes"] += len(r.content)
+                if r.status_code < 400 and rec["content_type"].split(";")[0].strip() in HTML_TYPES:
+                    await self.to_parse.put((url, depth, r.text, rec))
+                    continue   # the parse worker finishes it
+                await self.to_sink.put(rec)
+            except Exception as e:
+                self.stats["errors"] += 1
+                await self.to_sink.put({"url": url, "depth": depth, "error": repr(e), "fetched_at": time.time()})
+            self._finish(url)
+
+    async def _parse_worker(self):
+        while True:
+            url, depth, html, rec = await self.to_parse.get()
+            try:
+                if self.blobs is not None:
+                    rec["blob"] = await asyncio.to_thread(self.blobs.put, html, url=url, kind="crawl.html")
+                parsed = await parse_pool.titles_and_links(html)
+                base = rec.get("final_url") or url
+                links = []
+                for href in parsed["links"]:
+                    link = canonical(href, base) if href else None
+                    if link:
+                        links.append(link)
+                if depth < self.max_depth:
+                    for link in links:
+                        self.schedule(link, depth + 1)
+                rec.update(title=parsed["title"], links=links)
+            except Exception as e:
+                self.stats["errors"] += 1
+                rec["error"] = repr(e)
+            await self.to_sink.put(rec)
+            self.to_parse.task_done()
+            self._finish(url)
+
+    async def _sink(self, fh):
+        while True:
+            rec = await self.to_sink.get()
+            try:
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                if self.to_sink.empty():
+                    fh.flush()
+            finally:
+                self.to_sink.task_done()
+
+    def _status_line(self, rate: float) -> str:
+        s = self.stats
+        return (f"🕷️ {s['pages']} pages  {rate:5.1f} pages/s  frontier {self.frontier.qsize()}  "
+                f"parsing {self.to_parse.qsize()}  in-flight {s['inflight']}  hosts {len(self.hosts)}  "
+                f"errors {s['errors']}  robots-skipped {s['disallowed']}")
+
+    async def _reporter(self):
+        last_t, last_pages = time.monotonic(), 0
+        while True:
+            await asyncio.sleep(self.progress_s)
+            now, pages = time.monotonic(), self.stats["pages"]
+            print(self._status_line((pages - last_pages) / (now - last_t)), file=sys.stderr)
+            last_t, last_pages = now, pages
+
+    def _open_state(self):
+        self.seen = SeenStore(self.state_path, capacity=self.capacity, fp_rate=self.fp_rate)
+        if self.fresh:
+            self.seen.reset()
+        self.scheduled = int(self.seen.get_meta("scheduled", "0"))
+        resumed = self.seen.pending()
+        for url, depth in resumed:
+            self.frontier.put_nowait((url, depth))
+        if resumed:
+            print(f"🔁 Resuming crawl: {len(resumed)} pending, {len(self.seen)} seen, {self.scheduled} scheduled", file=sys.stderr)
+
+    async def run(self) -> Dict[str, Any]:
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        t0 = time.monotonic()
+        self._open_state()
+        parse_pool.enable()
+        with self.output.open("a", encoding="utf-8") as fh, replay.httpx_cassette():
+            async with get_async_client(self.concurrency) as client:
+                self.client = client
+                for url in self.seeds:
+                    self.schedule(url, 0)
+                tasks = [asyncio.create_task(self._fetch_worker()) for _ in range(self.concurrency)]
+                tasks += [asyncio.create_task(self._parse_worker()) for _ in range(max(1, os.cpu_count() or 1))]
+                tasks += [asyncio.create_task(self._sink(fh))]
+                if self.progress_s > 0:
+                    tasks.append(asyncio.create_task(self._reporter()))
+                try:
+                    await self.frontier.join()
+                    await self.to_sink.join()
+                finally:
+                    for t in tasks:
+                        t.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    self.seen.close()
+        took = time.monotonic() - t0
+        return {**self.stats, **self.seen.counters, "seen": len(self.seen), "seconds": round(took, 2), "pages_per_s": round(self.stats["pages"] / took, 2) if took else 0.0}
+
+
+"""
+python -m src crawl https://example.org [--max-pages 200 --max-depth 2 ...]
+"""
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m src crawl")
+    ap.add_argument("seeds", nargs="*", default=[SETTINGS.base_url], help="start URLs")
+    ap.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    ap.add_argument("--max-depth", type=int, default=MAX_DEPTH)
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    ap.add_argument("--per-host", type=int, default=PER_HOST)
+    ap.add_argument("--delay", type=float, default=DELAY_S, help="seconds between requests to one host")
+    ap.add_argument("--all-hosts", action="store_true", help="follow links off the seed hosts")
+    ap.add_argument("--output", default=str(OUTPUT))
+    ap.add_argument("--progress", type=float, default=2.0, help="seconds between status lines (0 = quiet)")
+    ap.add_argument("--state", default=str(STATE_PATH), help="seen-URL store; rerun with the same path to resume")
+    ap.add_argument("--fresh", action="store_true", help="discard the state at --state and start over")
+    ap.add_argument("--capacity", type=int, default=CAPACITY, help="URLs the Bloom filter is sized for")
+    ap.add_argument("--fp-rate", type=float, default=FP_RATE, help="Bloom false-positive rate at --capacity")
+    ap.add_argument("--keep-raw", action="store_true", help="keep every page in the blob store (record gets its sha256)")
+    args = ap.parse_args(argv)
+
+    crawler = Crawler(args.seeds, max_pages=args.max_pages, max_depth=args.max_depth,
+                      concurrency=args.concurrency, per_host=args.per_host, delay=args.delay,
+                      same_host=not args.all_hosts, output=pathlib.Path(args.output), progress_s=args.progress,
+                      state=pathlib.Path(args.state), fresh=args.fresh, capacity=args.capacity, fp_rate=args.fp_rate,
+                      keep_raw=args.keep_raw)
+    try:
+        summary = asyncio.run(crawler.run())
+    except KeyboardInterrupt:
+        print("\n🛑 Crawl interrupted", file=sys.stderr)
+        return 130
+    print(f"✅ Crawled {summary['pages']} pages in {summary['seconds']}s "
+          f"({summary['pages_per_s']} pages/s, {summary['errors']} errors) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
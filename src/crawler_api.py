@@ -1,4 +1,4 @@
-import os, re, json, asyncio, pathlib, sys, base64
+import os, re, json, time, asyncio, pathlib, sys
 from typing import Any, Dict, Optional, List, Callable
 
 from playwright.async_api import (
@@ -8,6 +8,13 @@ from playwright.async_api import (
     TimeoutError as PWTimeout,
 )
 
+from .proxy_pool import POOL, proxy_from_env
+from .profile_pool import profile_slot
+from .strategies import STRATEGIES
+from .deadline import clamp, clamp_s
+from .utils import file_lock
+from . import storage_state, replay, memprof, blobstore, deadline, metrics
+
 # -------- settings / env -------
 OUT = pathlib.Path("data/debug"); OUT.mkdir(parents=True, exist_ok=True)
 PROFILE_DIR = os.getenv("AA_PROFILE_DIR", ".pw-user")
@@ -15,17 +22,29 @@ UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like
 ACCEPT_LANG = "en-US,en;q=0.9"
 TZ = "America/Los_Angeles"
 
-def proxy_from_env():
-    p = os.getenv("AA_HTTP_PROXY") or os.getenv("HTTP_PROXY")
-    return {"server": p} if p else None
+# direct API candidates are raced; the last winner per route gets a head start
+DIRECT_URLS = (
+    "https://www.aa.com/booking/api/search",
+    "https://www.aa.com/booking/api/1/shopping/flightSearch",
+)
+DIRECT_MODES = ("cash", "award")
+DIRECT_TIMEOUT_S = float(os.getenv("AA_DIRECT_TIMEOUT", "8"))
+DIRECT_HEADSTART_S = float(os.getenv("AA_DIRECT_HEADSTART", "1.5"))
+WINNERS_PATH = pathlib.Path(os.getenv("AA_DIRECT_WINNERS", "data/state/direct_api.json"))
 
 # --- JS hooks to capture API calls ---
+# Wraps fetch/XHR, keeps only aa.com shopping POSTs in the page, and hands
+# them to Python as a structured object through an exposed binding.
+CAPTURE_BINDING = "__aaCapture"
 INJECT_HOOKS = r"""
 (() => {
-  const tag = (kind, url, body) => {
+  const SHOP = /\/booking\/api|\/shopping|\/bff\//i;
+  const send = (kind, url, body) => {
     try {
-      const b64 = body ? btoa(unescape(encodeURIComponent(body))) : '';
-      console.debug('AA_HOOK|' + kind + '|' + url + '|' + b64);
+      const abs = new URL(url, location.href);
+      if (!/(^|\.)aa\.com$/i.test(abs.hostname) || !SHOP.test(abs.pathname)) return;
+      const cb = window.__aaCapture;
+      if (typeof cb === 'function') cb({kind, url: abs.href, body: body || ''});
     } catch(e) {}
   };
 
@@ -37,7 +56,7 @@ INJECT_HOOKS = r"""
       let body = '';
       if (typeof init?.body === 'string') body = init.body;
       else if (init?.body instanceof URLSearchParams) body = init.body.toString();
-      if (method === 'POST') tag('fetch', url, body || '');
+      if (method === 'POST') send('fetch', url, body);
     } catch(e) {}
     return origFetch.apply(this, arguments);
   };
@@ -54,7 +73,7 @@ INJECT_HOOKS = r"""
         let b = '';
         if (typeof body === 'string') b = body;
         else if (body instanceof URLSearchParams) b = body.toString();
-        tag('xhr', this.__aa_url||'', b || '');
+        send('xhr', this.__aa_url||'', b);
       }
     } catch(e) {}
     return origSend.apply(this, arguments);
@@ -63,8 +82,8 @@ INJECT_HOOKS = r"""
 """
 
 # -------- helpers --------------
-def _dump(obj, name):
-    try: (OUT / f"{name}.json").write_text(json.dumps(obj, indent=2), encoding="utf-8")
+def _dump(obj, name, params=None):
+    try: blobstore.default().put_json(obj, key=blobstore.search_key(params) if params else None, kind=name)
     except Exception: pass
 
 def looks_like_flights(js):
@@ -84,17 +103,16 @@ def mmddyyyy(date_iso):
     y, m, d = date_iso.split("-")
     return f"{int(m):02d}/{int(d):02d}/{y}"
 
-def _console_scrape(text, bucket):
-    if not isinstance(text, str) or not text.startswith("AA_HOOK|"): return
-    try:
-        _, kind, url, b64 = text.split("|", 3)
-        body = base64.b64decode(b64).decode("utf-8", "ignore") if b64 else ""
-        bucket.append({"url": url, "body": body, "source": f"console-{kind}"})
-    except: pass
-
-def _looks_like_shopping(url, headers):
-    u = (url or "").lower()
-    return "aa.com" in u and any(s in u for s in ["/booking/api", "/shopping", "/bff/"])
+def _capture_handler(bucket):
+    def on_capture(source, payload):
+        try:
+            body = payload.get("body") or ""
+            bucket.append({"url": payload.get("url", ""), "body": body,
+                           "source": f"binding-{payload.get('kind', '')}"})
+            metrics.CAPTURED.inc(flow=metrics.current_flow())
+            metrics.CAPTURED_BYTES.inc(len(body.encode("utf-8")) if isinstance(body, str) else len(body), flow=metrics.current_flow())
+        except Exception: pass
+    return on_capture
 
 # -------- wait helpers ----------
 async def wait_not_busy(page, timeout = 4000):
@@ -102,90 +120,148 @@ async def wait_not_busy(page, timeout = 4000):
         await page.wait_for_function("""() => {
             const busy = document.querySelector('.aa-busy-module, .aa-busy-bg, [class*="spinner"], [class*="loading"]');
             return !busy || getComputedStyle(busy).opacity === '0';
-        }""", timeout=timeout)
+        }""", timeout=clamp(timeout))
     except:
         await asyncio.sleep(0.3)
 
 async def safe_click(loc, page):
     await wait_not_busy(page)
     try:
-        await loc.wait_for(state="visible", timeout=5000)
+        await loc.wait_for(state="visible", timeout=clamp(5000))
         await loc.scroll_into_view_if_needed()
         await asyncio.sleep(0.1)
-        await loc.click(timeout=3000)
+        await loc.click(timeout=clamp(3000))
     except:
         try:
             await asyncio.sleep(0.3)
-            await loc.click(force=True, timeout=2000)
+            await loc.click(force=True, timeout=clamp(2000))
         except:
             await page.evaluate("el => el.click()", await loc.element_handle())
 
 # -------- launch -----
-async def launch_context():
+async def launch_context(proxy=None, profile_dir=PROFILE_DIR):
+    metrics.LAUNCHES.inc(flow=metrics.current_flow())
     p = await async_playwright().start()
     ctx = await p.chromium.launch_persistent_context(
-        PROFILE_DIR,
+        profile_dir,
         channel="chrome",
         headless=False,
         viewport={"width": 1366, "height": 900},
         user_agent=UA,
         locale=ACCEPT_LANG,
         timezone_id=TZ,
-        proxy=proxy_from_env(),
+        proxy=proxy,
         args=["--disable-blink-features=AutomationControlled"],
     )
     await ctx.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined})")
+    await replay.attach(ctx)
     return p, ctx
 
 # -------- step 0: load home ---
-async def seed_home(ctx):
+async def seed_home(ctx, key=None):
     page = await ctx.new_page()
     await page.add_init_script(INJECT_HOOKS)
     print("🌐 Loading AA.com...")
     await page.goto("https://www.aa.com/", wait_until="domcontentloaded")
-    await asyncio.sleep(2)
+    await asyncio.sleep(clamp_s(2))
     
     # Close popups
     for sel in ["button:has-text('Accept')", "button:has-text('Close')", "button[aria-label*='close' i]"]:
         try:
-            await page.locator(sel).first.click(timeout=1000)
+            await page.locator(sel).first.click(timeout=clamp(1000))
         except: pass
     
     try:
-        await page.screenshot(path=str(OUT / "home.png"))
-        (OUT / "home.html").write_text(await page.content(), encoding="utf-8")
+        store = blobstore.default()
+        store.put(await page.screenshot(), url=page.url, key=key, kind="home.png")
+        store.put(await page.content(), url=page.url, key=key, kind="home.html")
         print("✓ Homepage loaded")
     except: pass
     return page
 
 # -------- strategy A: direct API ----------
-async def try_direct_api(ctx, params):
-    print("\n🔬 Trying direct API...")
-    o, d, dt = params["origin"], params["destination"], params["date"]
-    
-    urls = [
-        "https://www.aa.com/booking/api/search",
-        "https://www.aa.com/booking/api/1/shopping/flightSearch"
-    ]
-    
-    for url in urls:
-        for mode in ("cash", "award"):
-            body = {
-                "tripType": "ONE_WAY",
-                "redeemMiles": (mode == "award"),
-                "slices": [{"origin": o, "destination": d, "date": dt}],
-                "passengers": {"adult": 1},
-            }
-            try:
-                r = await ctx.request.post(url, headers=build_headers(), data=json.dumps(body))
-                if r.ok:
-                    js = await r.json()
-                    if looks_like_flights(js):
-                        print(f"✅ Direct API worked! ({mode})")
-                        _dump(js, f"direct_{mode}")
-                        return {"mode": mode, "json": js, "url": url}
-            except: pass
-    return None
+# keyed "ROUTE|mode": paired cash and award searches each keep their own winner
+def _winners() -> Dict[str, str]:
+    try: return json.loads(WINNERS_PATH.read_text(encoding="utf-8"))
+    except Exception: return {}
+
+def _remember_winner(route: str, url: str, mode: str):
+    """Merge under the inter-process lock (concurrent searches and fleet workers share the file)."""
+    try:
+        with file_lock(WINNERS_PATH.with_suffix(".lock")):
+            winners = _winners()
+            winners[f"{route}|{mode}"] = winners[f"*|{mode}"] = url   # "*" seeds routes never searched before
+            tmp = WINNERS_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(winners, indent=2), encoding="utf-8")
+            os.replace(tmp, WINNERS_PATH)
+    except Exception: pass
+
+async def _direct_candidate(ctx, params, url, mode):
+    body = {
+        "tripType": "ONE_WAY",
+        "redeemMiles": (mode == "award"),
+        "slices": [{"origin": params["origin"], "destination": params["destination"], "date": params["date"]}],
+        "passengers": {"adult": 1},
+    }
+    async def attempt():
+        r = await replay.api_post(ctx, url, headers=build_headers(), data=json.dumps(body))
+        if not r.ok:
+            return None
+        js = await r.json()
+        return {"mode": mode, "json": js, "url": url} if looks_like_flights(js) else None
+    try:
+        return await asyncio.wait_for(attempt(), clamp_s(DIRECT_TIMEOUT_S))
+    except Exception:
+        return None
+
+async def try_direct_api(ctx, params, modes=DIRECT_MODES):
+    """
+    Race every endpoint x mode, each capped at DIRECT_TIMEOUT_S; the first
+    response that looks like flights wins and the rest are cancelled. The
+    route's previous winner runs alone for DIRECT_HEADSTART_S first, so
+    the usual case costs one request. `modes` limits the race to cash or
+    award (paired search); the remembered endpoint still goes first.
+    """
+    print(f"\n🔬 Trying direct API ({'/'.join(modes)})...")
+    route = f"{params['origin']}-{params['destination']}".upper()
+    candidates = [(url, mode) for url in DIRECT_URLS for mode in modes]
+    winners = _winners()
+    best = next(((winners[f"{r}|{m}"], m) for r in (route, "*") for m in modes if f"{r}|{m}" in winners), ())
+    pending = set()
+
+    def launch(cand):
+        pending.add(asyncio.create_task(_direct_candidate(ctx, params, *cand)))
+
+    async def first_hit(timeout=None):
+        nonlocal pending
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                return None   # head start over
+            for t in done:
+                if t.result():
+                    return t.result()
+        return None
+
+    try:
+        hit = None
+        if best in candidates:
+            candidates.remove(best)
+            launch(best)
+            hit = await first_hit(timeout=DIRECT_HEADSTART_S)
+        if not hit:
+            for cand in candidates:
+                launch(cand)
+            hit = await first_hit()
+    finally:
+        for t in pending:
+            t.cancel()
+    if not hit:
+        return None
+    print(f"✅ Direct API worked! ({hit['mode']} via {hit['url'].rsplit('/', 1)[-1]})")
+    await asyncio.to_thread(_remember_winner, route, hit["url"], hit["mode"])
+    _dump(hit["json"], f"direct_{hit['mode']}", params)
+    return hit
 
 # -------- strategy B: form interaction ----------
 async def setup_oneway(page):
@@ -231,10 +307,13 @@ async def fill_airport(page, field_name, code):
     await asyncio.sleep(0.6)
     
     # Select from autocomplete
-    try:
-        await page.get_by_role("option", name=re.compile(rf"\b{re.escape(code)}\b", re.I)).first.click(timeout=1500)
+    pat = re.compile(rf"\b{re.escape(code)}\b", re.I)
+    if await STRATEGIES.run("airport_option_api", [
+        ("role=option", lambda: page.get_by_role("option", name=pat).first.click(timeout=clamp(1500))),
+        ("ui-autocomplete", lambda: page.locator("ul.ui-autocomplete li a", has_text=pat).first.click(timeout=clamp(1500))),
+    ]):
         print(f"✓ Selected {code}")
-    except:
+    else:
         await page.keyboard.press("ArrowDown")
         await page.keyboard.press("Enter")
 
@@ -252,16 +331,9 @@ async def fill_date(page, date_iso):
     }""", val)
 
 async def discover_via_form(page, params):
-    ctx = page.context
     candidates: List[dict] = []
-    
-    def on_req(req):
-        try:
-            if req.method.upper() == "POST" and _looks_like_shopping(req.url, req.headers):
-                candidates.append({"url": req.url, "body": req.post_data or ""})
-        except: pass
-    ctx.on("request", on_req)
-    page.on("console", lambda msg: _console_scrape(msg.text, candidates))
+    # the page hook is the only capture source: a context request listener as well saw every POST twice
+    await page.expose_binding(CAPTURE_BINDING, _capture_handler(candidates))
     
     print("\n📝 Filling form...")
     await setup_oneway(page)
@@ -283,9 +355,9 @@ async def discover_via_form(page, params):
     """)
     
     try:
-        await page.wait_for_load_state("networkidle", timeout=10000)
+        await page.wait_for_load_state("networkidle", timeout=clamp(10000))
     except:
-        await asyncio.sleep(5)
+        await asyncio.sleep(clamp_s(5))
     
     if not candidates:
         raise RuntimeError("No API calls captured")
@@ -302,52 +374,54 @@ async def discover_via_form(page, params):
     print(f"✓ Captured {len(candidates)} calls, using: {best['url'][:60]}...")
     
     for i, c in enumerate(candidates[:3]):
-        (OUT / f"req_{i}.txt").write_text(f"{c['url']}\n\n{c.get('body','')}", encoding="utf-8")
+        try: blobstore.default().put(f"{c['url']}\n\n{c.get('body','')}", url=c["url"], key=blobstore.search_key(params), kind=f"req_{i}.txt")
+        except Exception: pass
     
     return best
 
 # -------- master function ----
-async def fetch_shopping_json(params):
-    p, ctx = await launch_context()
+async def fetch_shopping_json(params, deadline_s=None):
+    with memprof.session(f"fetch_shopping_json {params['origin']}->{params['destination']} {params['date']}"), \
+            metrics.search("api"), deadline.scope(deadline_s):
+        async with profile_slot() as profile_dir:
+            return await deadline.enforce(_fetch_with_profile(params, profile_dir), "fetch_shopping_json")
+
+async def _fetch_with_profile(params, profile_dir):
+    proxy = proxy_from_env(profile_dir)
+    started = time.monotonic()
+    p, ctx = await launch_context(proxy, profile_dir)
+    memprof.stage("launched")
+    ok = False
     try:
-        page = await seed_home(ctx)
+        # Restored cookies are usually enough for the direct API: skip the home page
+        state = storage_state.load()
+        if state:
+            await storage_state.apply(ctx, state)
+            direct = await try_direct_api(ctx, params)
+            if direct:
+                ok = True
+                await storage_state.save(ctx)
+                return {"template": None, "result": direct}
+
+        page = await seed_home(ctx, blobstore.search_key(params))
+        memprof.stage("home")
         
         # Try direct first
-        direct = await try_direct_api(ctx, params)
+        direct = None if state else await try_direct_api(ctx, params)
         if direct:
+            ok = True
+            await storage_state.save(ctx)
             return {"template": None, "result": direct}
         
         # Fall back to form
         template = await discover_via_form(page, params)
+        memprof.stage("form_capture")
         
         # Replay with real params
-        print("\n🔄 Replaying API call...")
-        try:
-            body_obj = json.loads(template["body"]) if template["body"] else {}
-            # Patch body (simplified)
-            if "slices" in body_obj and body_obj["slices"]:
-                body_obj["slices"][0].update({
-                    "origin": params["origin"],
-                    "destination": params["destination"],
-                    "date": params["date"]
-                })
-        except:
-            body_obj = {}
-        
-        r = await ctx.request.post(template["url"], 
-                                   headers=build_headers(), 
-                                   data=json.dumps(body_obj))
-        
-        if not r.ok:
-            raise RuntimeError(f"Replay failed: {r.status}")
-        
-        js = await r.json()
-        if not looks_like_flights(js):
-            _dump(js, "replay_bad")
-            raise RuntimeError("Replay didn't return flights")
-        
-        _dump(js, "replay_success")
-        print("✅ Replay successful!")
+        body_obj, js = await _replay_template(ctx, template, params)
+        memprof.stage("replay")
+        ok = True
+        await storage_state.save(ctx)
         
         return {
             "template": {"url": template["url"], "body": body_obj},
@@ -355,7 +429,105 @@ async def fetch_shopping_json(params):
         }
         
     finally:
-        await asyncio.sleep(2)  # Let you see the result
+        if ok or not deadline.expired():   # running out of budget is not the proxy's fault
+            POOL.report(proxy, ok, latency_ms=(time.monotonic() - started) * 1000 if ok else None)
+            metrics.attempt(metrics.current_flow(), proxy, profile_dir, "ok" if ok else "failed")
+        await asyncio.sleep(clamp_s(2))  # Let you see the result
+        try: await ctx.close()
+        except: pass
+        try: await p.stop()
+        except: pass
+
+async def _replay_template(ctx, template, params, mode=None):
+    """Replays a form-captured request with this search's slice (and cash/award mode when given)."""
+    print(f"\n🔄 Replaying API call{f' ({mode})' if mode else ''}...")
+    try:
+        body_obj = json.loads(template["body"]) if template["body"] else {}
+        # Patch body (simplified)
+        if "slices" in body_obj and body_obj["slices"]:
+            body_obj["slices"][0].update({
+                "origin": params["origin"],
+                "destination": params["destination"],
+                "date": params["date"]
+            })
+        if mode:
+            body_obj["redeemMiles"] = (mode == "award")
+    except:
+        body_obj = {}
+
+    r = await replay.api_post(ctx, template["url"],
+                              headers=build_headers(),
+                              data=json.dumps(body_obj))
+
+    if not r.ok:
+        raise RuntimeError(f"Replay failed: {r.status}")
+
+    js = await r.json()
+    if not looks_like_flights(js):
+        _dump(js, "replay_bad", params)
+        raise RuntimeError("Replay didn't return flights")
+
+    _dump(js, f"replay_{mode}" if mode else "replay_success", params)
+    print("✅ Replay successful!")
+    return body_obj, js
+
+# -------- paired cash + award ----
+async def fetch_paired_json(params, profile_dir=None, deadline_s=None):
+    """
+    Cash and award shopping responses for one search, fetched at the same
+    time from one warmed-up context: {"cash": json|None, "award": json|None}.
+    """
+    with memprof.session(f"fetch_paired_json {params['origin']}->{params['destination']} {params['date']}"), \
+            metrics.search("api_paired"), deadline.scope(deadline_s):
+        if profile_dir:
+            return await deadline.enforce(_fetch_paired_with_profile(params, profile_dir), "fetch_paired_json")
+        async with profile_slot() as profile_dir:
+            return await deadline.enforce(_fetch_paired_with_profile(params, profile_dir), "fetch_paired_json")
+
+async def _fetch_paired_with_profile(params, profile_dir):
+    proxy = proxy_from_env(profile_dir)
+    started = time.monotonic()
+    p, ctx = await launch_context(proxy, profile_dir)
+    memprof.stage("launched")
+    ok = False
+    try:
+        page = None
+        state = storage_state.load()
+        if state:
+            await storage_state.apply(ctx, state)
+        else:
+            page = await seed_home(ctx, blobstore.search_key(params))
+            memprof.stage("home")
+
+        cash, award = await asyncio.gather(try_direct_api(ctx, params, ("cash",)),
+                                           try_direct_api(ctx, params, ("award",)))
+        found = {"cash": cash and cash["json"], "award": award and award["json"]}
+        memprof.stage("direct")
+
+        missing = [mode for mode, js in found.items() if js is None]
+        if missing:
+            # one form submission gives a template; replay it once per missing mode
+            page = page or await seed_home(ctx, blobstore.search_key(params))
+            template = await discover_via_form(page, params)
+            memprof.stage("form_capture")
+            replies = await asyncio.gather(*(_replay_template(ctx, template, params, mode) for mode in missing),
+                                           return_exceptions=True)
+            for mode, reply in zip(missing, replies):
+                if isinstance(reply, Exception):
+                    print(f"⚠️ {mode} replay failed: {reply}")
+                else:
+                    found[mode] = reply[1]
+            memprof.stage("replay")
+
+        ok = any(js is not None for js in found.values())
+        if ok:
+            await storage_state.save(ctx)
+        return found
+
+    finally:
+        if ok or not deadline.expired():   # running out of budget is not the proxy's fault
+            POOL.report(proxy, ok, latency_ms=(time.monotonic() - started) * 1000 if ok else None)
+            metrics.attempt(metrics.current_flow(), proxy, profile_dir, "ok" if ok else "failed")
         try: await ctx.close()
         except: pass
         try: await p.stop()
@@ -370,15 +542,30 @@ def _cli_parse(argv):
     ap.add_argument("--date", required=True, help="YYYY-MM-DD")
     ap.add_argument("--passengers", type=int, default=1)
     ap.add_argument("--cabin", default="ECONOMY")
+    ap.add_argument("--record", metavar="CASSETTE", help="record all traffic into data/cassettes/CASSETTE")
+    ap.add_argument("--replay", metavar="CASSETTE", help="serve traffic offline from a recorded cassette")
+    ap.add_argument("--memprofile", action="store_true", help="print a per-stage memory profile")
+    ap.add_argument("--paired", action="store_true", help="fetch cash and award fares together and join them")
+    ap.add_argument("--deadline", type=float, default=None, metavar="SECONDS", help="overall time budget")
     args = ap.parse_args(argv)
+    if args.record or args.replay:
+        replay.configure("record" if args.record else "replay", args.record or args.replay)
+    if args.memprofile:
+        memprof.ENABLED = True
     return {
         "origin": args.origin.upper(),
         "destination": args.destination.upper(),
         "date": args.date,
         "passengers": args.passengers,
         "cabin": args.cabin,
+        "paired": args.paired,
+        "deadline_s": args.deadline,
     }
 
+def _output_path(params):
+    # one file per search, so runs for different routes/dates don't overwrite each other
+    return OUT / f"crawler_output-{blobstore.search_key(params)}.json"
+
 async def _main(argv):
     params = _cli_parse(argv)
     print(f"\n{'='*60}")
@@ -386,7 +573,10 @@ async def _main(argv):
     print(f"{params['origin']} → {params['destination']} on {params['date']}")
     print(f"{'='*60}\n")
     
-    res = await fetch_shopping_json(params)
+    if params["paired"]:
+        return await _main_paired(params)
+
+    res = await fetch_shopping_json(params, deadline_s=params["deadline_s"])
     
     out = {
         "search_metadata": {
@@ -401,8 +591,24 @@ async def _main(argv):
         "template_used": res["template"],
     }
     
-    (OUT / "crawler_output.json").write_text(json.dumps(out, indent=2), encoding="utf-8")
-    print(f"\n✅ Output: {OUT}/crawler_output.json ({len(json.dumps(out))} bytes)")
+    path = _output_path(params)
+    path.write_text(json.dumps(out, indent=2), encoding="utf-8")
+    print(f"\n✅ Output: {path} ({len(json.dumps(out))} bytes)")
+
+async def _main_paired(params):
+    from datetime import date
+    from .models import SearchMetadata
+    from .pipeline import build_paired_result
+    meta = SearchMetadata(origin=params["origin"], destination=params["destination"],
+                          date=date.fromisoformat(params["date"]), passengers=params["passengers"],
+                          cabin_class=params["cabin"].lower())
+    res = await fetch_paired_json(params, deadline_s=params["deadline_s"])
+    result = build_paired_result(meta, res["cash"], res["award"])
+    out = {**result.model_dump(mode="json"), "raw": res}
+    path = _output_path(params)
+    path.write_text(json.dumps(out, indent=2), encoding="utf-8")
+    print(f"\n✅ Output: {path} ({result.total_results} paired flights, {len(result.unmatched)} unmatched offers)")
 
 if __name__ == "__main__":
+    metrics.start_from_env()
     asyncio.run(_main(sys.argv[1:]))
\ No newline at end of file
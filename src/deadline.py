@@ -0,0 +1,101 @@
+# src/deadline.py
+import time, asyncio, contextlib, contextvars
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+MIN_MS = 1.0   # playwright treats timeout=0 as "no timeout", so an expired budget clamps to this
+
+
+# a TimeoutError, so existing timeout / 504 handling applies unchanged
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+"""
+Overall time budget of one search. Set once at the entry point and read
+through the `clamp` helpers by every wait below it, so hard-coded
+timeouts (1200, 6000, 25000 ms ...) never outlive the caller.
+"""
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget_s = float(seconds)
+        self.expires = time.monotonic() + self.budget_s
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self, what: str = "search"):
+        if self.expired():
+            raise DeadlineExceeded(f"{what}: {self.budget_s:.1f}s budget exhausted")
+
+    def __repr__(self) -> str:
+        return f"Deadline({self.remaining():.1f}s of {self.budget_s:.1f}s left)"
+
+
+_CURRENT: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("aa_deadline", default=None)
+
+def current() -> Optional[Deadline]:
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Budget for the enclosed work. A nested scope never extends its
+    parent's; seconds=None just keeps whatever is already in force.
+    Tasks created inside inherit it (asyncio copies the context).
+    """
+    parent = _CURRENT.get()
+    if seconds is None:
+        yield parent
+        return
+    dl = Deadline(min(seconds, parent.remaining()) if parent else seconds)
+    token = _CURRENT.set(dl)
+    try:
+        yield dl
+    finally:
+        _CURRENT.reset(token)
+
+
+def clamp(timeout_ms: float) -> float:
+    """A Playwright timeout (ms) cut down to what is left of the budget."""
+    dl = _CURRENT.get()
+    if dl is None:
+        return timeout_ms
+    return max(min(timeout_ms, dl.remaining() * 1000), MIN_MS)
+
+def clamp_s(timeout_s: float) -> float:
+    """Same for asyncio waits and sleeps (seconds)."""
+    dl = _CURRENT.get()
+    if dl is None:
+        return timeout_s
+    return max(min(timeout_s, dl.remaining()), 0.0)
+
+def expired() -> bool:
+    dl = _CURRENT.get()
+    return dl is not None and dl.expired()
+
+def check(what: str = "search"):
+    dl = _CURRENT.get()
+    if dl is not None:
+        dl.check(what)
+
+
+async def enforce(aw: Awaitable[T], what: str = "search") -> T:
+    """
+    Awaits `aw` but cancels it when the budget runs out, so its finally
+    blocks close pages/contexts and keep partial artifacts; raises
+    DeadlineExceeded instead of a bare TimeoutError.
+    """
+    dl = _CURRENT.get()
+    if dl is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, timeout=max(dl.remaining(), 0.001))
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded) or not dl.expired():
+            raise
+        raise DeadlineExceeded(f"{what}: {dl.budget_s:.1f}s budget exhausted") from None
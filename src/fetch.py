@@ -1,5 +1,6 @@
 import httpx
 from .config import SETTINGS
+from . import replay
 
 """
 DEFINES AND RETURNS AN HTTPX CLIENT USING THE
@@ -14,12 +15,26 @@ def get_client():
     )
 
 
+"""
+ASYNC TWIN OF GET_CLIENT FOR THE CRAWLER; LIMITS ARE
+SIZED BY THE CALLER TO MATCH ITS WORKER COUNT
+"""
+def get_async_client(max_connections=100):
+    return httpx.AsyncClient(
+        headers={"User-Agent": SETTINGS.user_agent},
+        timeout=httpx.Timeout(SETTINGS.read_timeout, connect=SETTINGS.connection_timeout),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        http2=True,
+        follow_redirects=True
+    )
+
+
 """
 USES THE HTTPX CLIENT IN ORDER TO FETCH WEB PAGES
 AND RETRIEVE TEXT INFORMATION FROM SPECIFIED PAGES
 """
 def fetch_text(url):
-    with get_client() as client:
+    with replay.httpx_cassette(), get_client() as client:
         r = client.get(url)
         r.raise_for_status()
         return r.text
@@ -0,0 +1,354 @@
+# src/fleet.py
+import os, sys, json, time, signal, sqlite3, asyncio, pathlib, traceback
+import multiprocessing as mp
+from typing import Any, Dict, List, Optional
+
+DB_PATH = pathlib.Path(os.getenv("AA_FLEET_DB", "data/state/fleet.db"))
+HEARTBEAT_S = 5.0              # workers touch their row at least this often, idle or busy
+HEARTBEAT_TIMEOUT_S = float(os.getenv("AA_FLEET_HEARTBEAT_TIMEOUT", "600"))  # a single search can be slow
+MAX_JOB_ATTEMPTS = int(os.getenv("AA_FLEET_MAX_ATTEMPTS", "3"))
+# per-search budget, kept under the heartbeat timeout so a stuck search fails instead of getting its worker killed
+JOB_DEADLINE_S = float(os.getenv("AA_FLEET_JOB_DEADLINE", str(HEARTBEAT_TIMEOUT_S * 0.8)))
+MAX_RESTARTS = int(os.getenv("AA_FLEET_MAX_RESTARTS", "5"))  # per worker slot
+RECYCLE_EXIT = 75  # worker exits with this to be replaced after crossing AA_RSS_LIMIT_MB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+  id        INTEGER PRIMARY KEY,
+  payload   TEXT NOT NULL,
+  status    TEXT NOT NULL DEFAULT 'pending',   -- pending | running | done | failed
+  worker    INTEGER,
+  attempts  INTEGER NOT NULL DEFAULT 0,
+  result    TEXT,
+  error     TEXT,
+  collected INTEGER NOT NULL DEFAULT 0,
+  updated   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);
+CREATE TABLE IF NOT EXISTS workers (
+  id        INTEGER PRIMARY KEY,
+  pid       INTEGER,
+  state     TEXT,                              -- starting | idle | busy | recycling | exited
+  heartbeat REAL,
+  done      INTEGER NOT NULL DEFAULT 0,
+  failed    INTEGER NOT NULL DEFAULT 0,
+  restarts  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+"""
+SQLite-backed job queue shared by the fleet processes. Claims run in a
+BEGIN IMMEDIATE transaction so two workers never take the same job.
+"""
+class JobQueue:
+    def __init__(self, path: pathlib.Path = DB_PATH):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------- producer side ----------
+    def put_many(self, payloads: List[Dict[str, Any]]) -> int:
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT INTO jobs(payload, updated) VALUES (?, ?)",
+                [(json.dumps(p), now) for p in payloads],
+            )
+        return len(payloads)
+
+    def pending(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending','running')").fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    # ---------- worker side ----------
+    def claim(self, worker: int) -> Optional[Dict[str, Any]]:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute(
+                "SELECT id, payload, attempts FROM jobs WHERE status='pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row:
+                self.db.execute(
+                    "UPDATE jobs SET status='running', worker=?, attempts=attempts+1, updated=? WHERE id=?",
+                    (worker, time.time(), row[0]),
+                )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        return {"id": row[0], "payload": json.loads(row[1]), "attempts": row[2] + 1}
+
+    def complete(self, job_id: int, result_json: str):
+        self.db.execute(
+            "UPDATE jobs SET status='done', result=?, error=NULL, updated=? WHERE id=?",
+            (result_json, time.time(), job_id),
+        )
+
+    def fail(self, job_id: int, error: str, attempts: int):
+        status = "failed" if attempts >= MAX_JOB_ATTEMPTS else "pending"
+        self.db.execute(
+            "UPDATE jobs SET status=?, worker=NULL, error=?, updated=? WHERE id=?",
+            (status, error[-2000:], time.time(), job_id),
+        )
+
+    def reset(self):
+        """Forget workers from an earlier run and put back anything they left running."""
+        self.db.execute("DELETE FROM workers")
+        self.db.execute("UPDATE jobs SET status='pending', worker=NULL WHERE status='running'")
+
+    def requeue_worker(self, worker: int, reason: str = "worker died") -> int:
+        """Put back jobs a crashed worker was holding; a job that keeps killing workers ends up failed."""
+        cur = self.db.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker=NULL, error=?, updated=? WHERE status='running' AND worker=?",
+            (MAX_JOB_ATTEMPTS, reason, time.time(), worker),
+        )
+        return cur.rowcount
+
+    # ---------- health ----------
+    def heartbeat(self, worker: int, state: str, done: int = 0, failed: int = 0):
+        self.db.execute(
+            "INSERT INTO workers(id, pid, state, heartbeat, done, failed) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET pid=excluded.pid, state=excluded.state, heartbeat=excluded.heartbeat, "
+            "done=workers.done+excluded.done, failed=workers.failed+excluded.failed",
+            (worker, os.getpid(), state, time.time(), done, failed),
+        )
+
+    def worker_rows(self) -> List[Dict[str, Any]]:
+        cols = ("id", "pid", "state", "heartbeat", "done", "failed", "restarts")
+        return [dict(zip(cols, r)) for r in self.db.execute(f"SELECT {', '.join(cols)} FROM workers ORDER BY id")]
+
+    def note_restart(self, worker: int):
+        self.db.execute("UPDATE workers SET restarts=restarts+1 WHERE id=?", (worker,))
+
+    # ---------- aggregator side ----------
+    def collect(self) -> List[Dict[str, Any]]:
+        """Return finished jobs not yet handed to the aggregator, and mark them collected."""
+        rows = self.db.execute(
+            "SELECT id, payload, status, result, error FROM jobs "
+            "WHERE status IN ('done','failed') AND collected=0 ORDER BY id"
+        ).fetchall()
+        if rows:
+            self.db.executemany("UPDATE jobs SET collected=1 WHERE id=?", [(r[0],) for r in rows])
+        return [
+            {"id": r[0], "search": json.loads(r[1]), "status": r[2],
+             "result": json.loads(r[3]) if r[3] else None, "error": r[4]}
+            for r in rows
+        ]
+
+
+# -------- worker process --------
+async def _busy_heartbeat(q: "JobQueue", worker: int):
+    # a live search keeps its worker fresh; only a wedged event loop goes stale
+    while True:
+        await asyncio.sleep(HEARTBEAT_S)
+        try:
+            q.heartbeat(worker, "busy")
+        except Exception:
+            pass
+
+async def _worker_loop(db_path: str, worker: int, stop, exit_when_empty: bool):
+    from .models import SearchMetadata
+    from .pipeline import run_search
+    from .profile_pool import PROFILES
+    from . import memprof
+
+    q = JobQueue(pathlib.Path(db_path))
+    # one profile (and so one sticky proxy) for the worker's whole life
+    async with PROFILES.acheckout() as profile_dir:
+        q.heartbeat(worker, "idle")
+        while not stop.is_set():
+            job = q.claim(worker)
+            if not job:
+                if exit_when_empty and q.pending() == 0:
+                    break
+                q.heartbeat(worker, "idle")
+                await asyncio.sleep(min(HEARTBEAT_S, 1.0))
+                continue
+            q.heartbeat(worker, "busy")
+            beat = asyncio.create_task(_busy_heartbeat(q, worker))
+            try:
+                meta = SearchMetadata(**job["payload"])
+                result = await run_search(meta, profile_dir=profile_dir, deadline_s=JOB_DEADLINE_S)
+                q.complete(job["id"], result.model_dump_json())
+                q.heartbeat(worker, "idle", done=1)
+            except Exception:
+                q.fail(job["id"], traceback.format_exc(), job["attempts"])
+                q.heartbeat(worker, "idle", failed=1)
+            finally:
+                beat.cancel()
+            if memprof.should_recycle():
+                q.heartbeat(worker, "recycling")
+                q.close()
+                return RECYCLE_EXIT
+    q.heartbeat(worker, "exited")
+    q.close()
+    return 0
+
+
+def _worker_main(db_path: str, worker: int, stop, exit_when_empty: bool):
+    # the parent owns Ctrl-C / SIGTERM and asks workers to drain through `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    from . import metrics
+    metrics.start_from_env(http=False)   # one port cannot serve N workers; use AA_METRICS_TEXTFILE with {pid}
+    code = asyncio.run(_worker_loop(db_path, worker, stop, exit_when_empty))
+    from .proxy_pool import POOL
+    from .strategies import STRATEGIES
+    POOL.flush()         # multiprocessing children skip atexit: write the batched outcomes now
+    STRATEGIES.save()
+    if code:
+        sys.exit(code)
+
+
+"""
+Supervisor + aggregator. Starts N worker processes on a shared SQLite
+queue, restarts any that die or stop heart-beating (their running job
+goes back to pending), streams finished results to one JSONL file, and
+drains gracefully on SIGINT/SIGTERM: workers finish their current
+search and exit.
+"""
+class Fleet:
+    def __init__(self, workers: int, db_path: pathlib.Path = DB_PATH, output: Optional[pathlib.Path] = None,
+                 exit_when_empty: bool = True, store: bool = False):
+        self.n = max(int(workers), 1)
+        self.db_path = pathlib.Path(db_path)
+        self.output = pathlib.Path(output) if output else None
+        self.exit_when_empty = exit_when_empty
+        self.store = store
+        self.ctx = mp.get_context("spawn")
+        self.stop = self.ctx.Event()
+        self.procs: Dict[int, Any] = {}
+        self.restarts: Dict[int, int] = {}
+        self.q = JobQueue(self.db_path)
+        self.q.reset()
+
+    def _spawn(self, worker: int):
+        proc = self.ctx.Process(
+            target=_worker_main, args=(str(self.db_path), worker, self.stop, self.exit_when_empty),
+            name=f"fleet-worker-{worker}", daemon=False,
+        )
+        self.q.heartbeat(worker, "starting")
+        proc.start()
+        self.procs[worker] = proc
+
+    def _check_health(self):
+        now = time.time()
+        beats = {r["id"]: r for r in self.q.worker_rows()}
+        for worker, proc in list(self.procs.items()):
+            row = beats.get(worker)
+            stale = row and row["state"] != "exited" and now - (row["heartbeat"] or now) > HEARTBEAT_TIMEOUT_S
+            if proc.is_alive() and not stale:
+                continue
+            if stale:
+                print(f"💀 Worker {worker} missed heartbeats, killing pid {proc.pid}")
+                proc.kill()
+            proc.join(timeout=5)
+            reason = "missed heartbeats" if stale else f"worker exited with code {proc.exitcode}"
+            requeued = self.q.requeue_worker(worker, reason)
+            clean_exit = proc.exitcode == 0 and not stale
+            if clean_exit or self.stop.is_set():
+                del self.procs[worker]
+                continue
+            if proc.exitcode == RECYCLE_EXIT and not stale:
+                print(f"♻️ Worker {worker} recycled after crossing the RSS limit")
+                self._spawn(worker)
+                continue
+            self.restarts[worker] = self.restarts.get(worker, 0) + 1
+            if self.restarts[worker] > MAX_RESTARTS:
+                print(f"⛔ Worker {worker} crashed {self.restarts[worker]} times, giving up on it")
+                del self.procs[worker]
+                continue
+            print(f"🔁 Restarting worker {worker} (exit {proc.exitcode}, {requeued} job(s) requeued)")
+            self.q.note_restart(worker)
+            self._spawn(worker)
+
+    def _aggregate(self, sink) -> int:
+        rows = self.q.collect()
+        for r in rows:
+            sink.write(json.dumps(r, ensure_ascii=False) + "\n")
+        if rows:
+            sink.flush()
+        if rows and self.store:
+            from .models import SearchResult
+            from . import flightstore
+            flightstore.default().add_many(SearchResult.model_validate(r["result"]) for r in rows if r.get("result"))
+        return len(rows)
+
+    def _status_line(self) -> str:
+        c = self.q.counts()
+        return (f"📊 pending={c.get('pending', 0)} running={c.get('running', 0)} "
+                f"done={c.get('done', 0)} failed={c.get('failed', 0)} workers={len(self.procs)}")
+
+    def run(self):
+        def _drain(*_):
+            if not self.stop.is_set():
+                print("\n🛑 Draining: workers will finish their current search")
+            self.stop.set()
+        signal.signal(signal.SIGINT, _drain)
+        signal.signal(signal.SIGTERM, _drain)
+
+        for worker in range(self.n):
+            self._spawn(worker)
+
+        sink = open(self.output, "a", encoding="utf-8") if self.output else sys.stdout
+        last_status = 0.0
+        try:
+            while self.procs:
+                self._check_health()
+                self._aggregate(sink)
+                if time.monotonic() - last_status > 10:
+                    print(self._status_line(), file=sys.stderr)
+                    last_status = time.monotonic()
+                time.sleep(1.0)
+            self._aggregate(sink)
+        finally:
+            if sink is not sys.stdout:
+                sink.close()
+        print(self._status_line(), file=sys.stderr)
+
+
+# -------- CLI: python -m src.fleet --jobs searches.jsonl --workers 4 --------
+def _load_jobs(path: str) -> List[Dict[str, Any]]:
+    jobs = []
+    for line in pathlib.Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line:
+            jobs.append(json.loads(line))  # SearchMetadata fields
+    return jobs
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Run searches on a pool of worker processes")
+    ap.add_argument("--jobs", help="JSONL of SearchMetadata objects to enqueue")
+    ap.add_argument("--workers", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    ap.add_argument("--db", default=str(DB_PATH))
+    ap.add_argument("--output", default="data/processed/fleet.jsonl")
+    ap.add_argument("--keep-running", action="store_true", help="keep workers alive when the queue is empty")
+    ap.add_argument("--store", action="store_true", help="also add finished results to the flight store (see `python -m src query`)")
+    args = ap.parse_args(argv)
+
+    if args.jobs:
+        q = JobQueue(pathlib.Path(args.db))
+        print(f"📥 Enqueued {q.put_many(_load_jobs(args.jobs))} search(es)")
+        q.close()
+
+    pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Fleet(args.workers, pathlib.Path(args.db), pathlib.Path(args.output),
+          exit_when_empty=not args.keep_running, store=args.store).run()
+    print(f"✅ Results in {args.output}")
+
+if __name__ == "__main__":
+    main()
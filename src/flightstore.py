@@ -0,0 +1,221 @@
+# src/flightstore.py
+import os, json, time, sqlite3, pathlib, threading
+from typing import Any, Dict, Iterable, List, Optional
+
+PATH = pathlib.Path(os.getenv("AA_FLIGHT_DB", "data/state/flights.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+  id           INTEGER PRIMARY KEY,
+  origin       TEXT NOT NULL,
+  destination  TEXT NOT NULL,
+  date         TEXT NOT NULL,            -- YYYY-MM-DD, sorts as a date
+  cabin_class  TEXT NOT NULL,
+  passengers   INTEGER NOT NULL,
+  scraped      REAL NOT NULL,
+  flights_n    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS searches_route ON searches(origin, destination, date, cabin_class, id);
+
+-- route/date/scrape time repeated on every row so queries never join
+CREATE TABLE IF NOT EXISTS flights (
+  search_id       INTEGER NOT NULL REFERENCES searches(id),
+  origin          TEXT NOT NULL,
+  destination     TEXT NOT NULL,
+  date            TEXT NOT NULL,
+  cabin_class     TEXT NOT NULL,
+  scraped         REAL NOT NULL,
+  flight_number   TEXT NOT NULL,
+  departure_time  TEXT NOT NULL,
+  arrival_time    TEXT NOT NULL,
+  points_required INTEGER NOT NULL,
+  cash_price_usd  REAL NOT NULL,
+  taxes_fees_usd  REAL NOT NULL,
+  cpp             REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flights_route ON flights(origin, destination, date, cpp);
+CREATE INDEX IF NOT EXISTS flights_cpp ON flights(cpp);
+CREATE INDEX IF NOT EXISTS flights_scraped ON flights(scraped);
+"""
+
+COLUMNS = ("flight_number", "departure_time", "arrival_time", "points_required", "cash_price_usd", "taxes_fees_usd", "cpp")
+
+
+"""
+Every scraped flight with its search metadata, in one SQLite file.
+Results are bulk-inserted one search per transaction; WAL lets the CLI,
+the fleet aggregator and queries use the file at the same time. Route,
+cpp and scrape-time indexes keep the queries below in milliseconds at
+millions of rows.
+"""
+class FlightStore:
+    def __init__(self, path: pathlib.Path = PATH):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA temp_store=MEMORY")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------- writes ----------
+    def add(self, result, scraped: Optional[float] = None) -> int:
+        """Store one SearchResult; returns its search id."""
+        return self.add_many([result], scraped)[0]
+
+    def add_many(self, results: Iterable, scraped: Optional[float] = None) -> List[int]:
+        """Bulk insert in a single transaction (much faster than one commit per search)."""
+        ids = []
+        with self._lock, self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            for result in results:
+                m = result.search_metadata
+                route = (m.origin.upper(), m.destination.upper(), m.date.isoformat(), m.cabin_class)
+                ts = scraped if scraped is not None else time.time()
+                cur = self.db.execute(
+                    "INSERT INTO searches(origin, destination, date, cabin_class, passengers, scraped, flights_n) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", (*route, m.passengers, ts, len(result.flights)))
+                sid = cur.lastrowid
+                self.db.executemany(
+                    f"INSERT INTO flights(search_id, origin, destination, date, cabin_class, scraped, {', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * (6 + len(COLUMNS)))})",
+                    [(sid, *route, ts, *(getattr(f, c) for c in COLUMNS)) for f in result.flights])
+                ids.append(sid)
+        return ids
+
+    # ---------- queries ----------
+    def _where(self, origin=None, destination=None, date_from=None, date_to=None, cabin=None,
+               since=None, min_cpp=None, latest=False):
+        clauses, args = [], []
+        for col, val in (("origin", origin), ("destination", destination), ("cabin_class", cabin)):
+            if val:
+                clauses.append(f"f.{col} = ?")
+                args.append(val.upper() if col != "cabin_class" else val)
+        if date_from:
+            clauses.append("f.date >= ?")
+            args.append(str(date_from))
+        if date_to:
+            clauses.append("f.date <= ?")
+            args.append(str(date_to))
+        if since:
+            clauses.append("f.scraped >= ?")
+            args.append(since)
+        if min_cpp is not None:
+            clauses.append("f.cpp >= ?")
+            args.append(min_cpp)
+        if latest:
+            # newest scrape of each search identity (snapshot_key: route/date/cabin/passengers) only, so fares
+            # that have since gone are left out; a search that came back empty proves nothing and never hides one
+            clauses.append("f.search_id = (SELECT max(s.id) FROM searches mine JOIN searches s ON s.origin = mine.origin AND "
+                           "s.destination = mine.destination AND s.date = mine.date AND s.cabin_class = mine.cabin_class AND "
+                           "s.passengers = mine.passengers WHERE mine.id = f.search_id AND s.flights_n > 0)")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def best(self, limit: int = 10, per_date: bool = False, **filters) -> List[Dict[str, Any]]:
+        """
+        Highest-cpp flights matching the filters (origin, destination,
+        date_from, date_to, cabin, since, min_cpp, latest); per_date keeps
+        the best one per departure date, ordered by date.
+        """
+        where, args = self._where(**filters)
+        cols = f"f.origin, f.destination, f.date, f.cabin_class, f.scraped, {', '.join('f.' + c for c in COLUMNS)}"
+        if per_date:
+            # SQLite fills the bare columns from the row holding max(cpp)
+            sql = f"SELECT {cols}, max(f.cpp) FROM flights f{where} GROUP BY f.origin, f.destination, f.date ORDER BY f.date LIMIT ?"
+        else:
+            sql = f"SELECT {cols} FROM flights f{where} ORDER BY f.cpp DESC LIMIT ?"
+        with self._lock:
+            cur = self.db.execute(sql, (*args, limit))
+            names = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        return [dict(zip(names, r[:len(COLUMNS) + 5])) for r in rows]
+
+    def explain(self, per_date: bool = False, **filters) -> List[str]:
+        """Query plan of best(), to check an index is used."""
+        where, args = self._where(**filters)
+        sql = (f"SELECT f.date, max(f.cpp) FROM flights f{where} GROUP BY f.origin, f.destination, f.date" if per_date
+               else f"SELECT * FROM flights f{where} ORDER BY f.cpp DESC LIMIT 10")
+        with self._lock:
+            return [r[-1] for r in self.db.execute("EXPLAIN QUERY PLAN " + sql, args)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            searches, = self.db.execute("SELECT count(*) FROM searches").fetchone()
+            flights, first, last = self.db.execute("SELECT count(*), min(scraped), max(scraped) FROM flights").fetchone()
+        return {"searches": searches, "flights": flights, "first_scrape": first, "last_scrape": last,
+                "db_mb": round(self.path.stat().st_size / 1e6, 2)}
+
+
+_default: Optional[FlightStore] = None
+
+def default() -> FlightStore:
+    """Process-wide store under AA_FLIGHT_DB, opened on first use."""
+    global _default
+    if _default is None:
+        _default = FlightStore()
+    return _default
+
+
+# -------- CLI: python -m src query --origin LAX --destination JFK --from 2025-12-01 --to 2025-12-31 --------
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m src query", description="Query stored flights")
+    ap.add_argument("--origin")
+    ap.add_argument("--destination")
+    ap.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD")
+    ap.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD")
+    ap.add_argument("--cabin")
+    ap.add_argument("--min-cpp", type=float, default=None)
+    ap.add_argument("--since-hours", type=float, default=None, help="only flights scraped in the last N hours")
+    ap.add_argument("--latest", action="store_true", help="only the newest non-empty scrape of each search (route/date/cabin/passengers)")
+    ap.add_argument("--per-date", action="store_true", help="best flight per departure date instead of overall")
+    ap.add_argument("--limit", type=int, default=10)
+    ap.add_argument("--json", action="store_true", help="one JSON object per line")
+    ap.add_argument("--import", dest="imports", nargs="+", default=[], metavar="FILE",
+                    help="load SearchResult JSON files (out.json) or JSONL (fleet output) first")
+    ap.add_argument("--stats", action="store_true")
+    ap.add_argument("--explain", action="store_true", help="print the query plan")
+    ap.add_argument("--db", default=str(PATH))
+    args = ap.parse_args(argv)
+
+    store = FlightStore(pathlib.Path(args.db))
+    if args.imports:
+        from .models import SearchResult
+        results = []
+        for path in args.imports:
+            text = pathlib.Path(path).read_text(encoding="utf-8")
+            scraped = pathlib.Path(path).stat().st_mtime
+            if path.endswith(".jsonl"):
+                for line in text.splitlines():
+                    row = json.loads(line) if line.strip() else {}
+                    if row.get("result"):   # fleet rows wrap the result
+                        results.append(SearchResult.model_validate(row["result"]))
+            else:
+                results.append(SearchResult.model_validate_json(text))
+        store.add_many(results, scraped)
+        print(f"📥 Imported {len(results)} search(es), {sum(len(r.flights) for r in results)} flights")
+    if args.stats:
+        print(json.dumps(store.stats(), indent=2))
+        return
+
+    filters = dict(origin=args.origin, destination=args.destination, date_from=args.date_from, date_to=args.date_to,
+                   cabin=args.cabin, min_cpp=args.min_cpp, latest=args.latest,
+                   since=time.time() - args.since_hours * 3600 if args.since_hours else None)
+    if args.explain:
+        for line in store.explain(per_date=args.per_date, **filters):
+            print(f"   {line}")
+    t0 = time.perf_counter()
+    rows = store.best(limit=args.limit, per_date=args.per_date, **filters)
+    ms = (time.perf_counter() - t0) * 1000
+    for r in rows:
+        if args.json:
+            print(json.dumps(r))
+        else:
+            print(f"   {r['date']} {r['origin']}-{r['destination']} {r['flight_number']:<7} {r['departure_time']}-{r['arrival_time']} "
+                  f"{r['points_required']:>7,} pts  ${r['cash_price_usd']:>8.2f}  {r['cpp']:5.2f} cpp")
+    if not args.json:
+        print(f"🔎 {len(rows)} row(s) in {ms:.1f} ms")
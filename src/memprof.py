@@ -0,0 +1,163 @@
+# src/memprof.py
+import os, sys, time, pathlib, tracemalloc, contextlib, contextvars
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics
+
+ENABLED = os.getenv("AA_MEMPROFILE", "0").lower() in ("1", "true", "yes")
+FRAMES = int(os.getenv("AA_MEMPROFILE_FRAMES", "5"))
+TOP_N = int(os.getenv("AA_MEMPROFILE_TOP", "10"))
+RSS_LIMIT_MB = float(os.getenv("AA_RSS_LIMIT_MB", "0"))  # per browser; 0 disables recycling
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, __file__),
+)
+
+_current: contextvars.ContextVar[Optional["MemProfiler"]] = contextvars.ContextVar("memprof", default=None)
+
+
+# -------- RSS sampling (Linux /proc; peak RSS elsewhere) --------
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except Exception:
+        if pid != os.getpid():
+            return 0
+        try:
+            import resource   # POSIX only
+        except ImportError:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB elsewhere
+
+def descendant_pids(root: int) -> List[int]:
+    """Playwright driver + every Chrome process it spawned."""
+    children: Dict[int, List[int]] = {}
+    for entry in pathlib.Path("/proc").glob("[0-9]*"):
+        try:
+            stat = (entry / "stat").read_text()
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        except Exception:
+            continue
+        children.setdefault(ppid, []).append(int(entry.name))
+    out, stack = [], [root]
+    while stack:
+        for c in children.get(stack.pop(), []):
+            out.append(c); stack.append(c)
+    return out
+
+def process_tree_rss() -> Tuple[int, int]:
+    """(python RSS, RSS summed over all child processes) in bytes."""
+    me = os.getpid()
+    return rss_bytes(me), sum(rss_bytes(p) for p in descendant_pids(me))
+
+def browser_pids(profile_dir: str) -> List[int]:
+    """The Chrome browser process running on `profile_dir` plus its renderers/GPU/utility children."""
+    flags = {f"--user-data-dir={d}" for d in (profile_dir, os.path.abspath(profile_dir), os.path.realpath(profile_dir))}
+    roots = []
+    for entry in pathlib.Path("/proc").glob("[0-9]*"):
+        try:
+            argv = (entry / "cmdline").read_bytes().decode("utf-8", "replace").split("\0")
+        except Exception:
+            continue
+        if flags.intersection(argv) and not any(a.startswith("--type=") for a in argv):
+            roots.append(int(entry.name))
+    return roots + [p for r in roots for p in descendant_pids(r)]
+
+def browser_rss(profile_dir: str) -> int:
+    """RSS in bytes of one browser's own process tree."""
+    return sum(rss_bytes(p) for p in browser_pids(profile_dir))
+
+"""
+True once a browser passes AA_RSS_LIMIT_MB (never when the limit is 0).
+With `profile_dir` only that browser's process tree is measured, so one
+warm browser in serve is recycled without touching the others; without
+it, python + all children, for processes that drive a single browser
+(fleet workers).
+"""
+def should_recycle(limit_mb: Optional[float] = None, profile_dir: Optional[str] = None) -> bool:
+    limit = RSS_LIMIT_MB if limit_mb is None else limit_mb
+    if limit <= 0:
+        return False
+    if profile_dir:
+        return browser_rss(profile_dir) / 1e6 > limit
+    own, kids = process_tree_rss()
+    return (own + kids) / 1e6 > limit
+
+
+"""
+Per-search memory profile: a tracemalloc snapshot and an RSS sample
+(python process and Chrome children) at every stage, reported as a
+stage table plus the top allocations grown between the first stage
+and the stage with the highest traced memory.
+"""
+class MemProfiler:
+    def __init__(self, label: str, top: int = TOP_N):
+        self.label = label
+        self.top = top
+        self.rows: List[Dict] = []
+        self._base: Optional[tracemalloc.Snapshot] = None
+        self._peak: Optional[Tuple[str, tracemalloc.Snapshot]] = None
+        self._peak_bytes = -1
+        self._t0 = time.monotonic()
+
+    def stage(self, name: str):
+        traced, _ = tracemalloc.get_traced_memory()
+        own, kids = process_tree_rss()
+        self.rows.append({"stage": name, "t": time.monotonic() - self._t0, "traced": traced, "rss": own, "children": kids})
+        if self._base is None:
+            self._base = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+        elif traced > self._peak_bytes:
+            self._peak_bytes = traced
+            self._peak = (name, tracemalloc.take_snapshot().filter_traces(_IGNORE))
+
+    def report(self) -> str:
+        mb = lambda b: f"{b / 1e6:8.1f}"
+        lines = [f"🧠 Memory profile: {self.label}",
+                 f"   {'stage':<18}{'t(s)':>7}{'traced MB':>11}{'rss MB':>9}{'chrome MB':>11}"]
+        for r in self.rows:
+            lines.append(f"   {r['stage']:<18}{r['t']:7.1f}{mb(r['traced']):>11}{mb(r['rss']):>9}{mb(r['children']):>11}")
+        if self._base is not None and self._peak is not None:
+            name, snap = self._peak
+            lines.append(f"   top allocations grown by '{name}':")
+            for st in snap.compare_to(self._base, "lineno")[: self.top]:
+                if st.size_diff <= 0:
+                    continue
+                frame = st.traceback[0]
+                lines.append(f"   {st.size_diff / 1024:10.1f} KiB  {st.count_diff:+7d} blocks  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
+
+
+"""
+Wrap one search (sync `with`, also fine inside coroutines). No-op
+unless AA_MEMPROFILE / --memprofile is on.
+"""
+@contextlib.contextmanager
+def session(label: str):
+    if not ENABLED:
+        yield None
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(FRAMES)
+    prof = MemProfiler(label)
+    token = _current.set(prof)
+    prof.stage("start")
+    try:
+        yield prof
+    finally:
+        prof.stage("end")
+        _current.reset(token)
+        print(prof.report())
+
+def stage(name: str):
+    """Mark a stage on the profiler of the current search, if any (always timed into metrics)."""
+    metrics.stage(name)
+    prof = _current.get()
+    if prof is not None:
+        prof.stage(name)
@@ -0,0 +1,247 @@
+# src/metrics.py
+import os, time, atexit, bisect, pathlib, threading, contextlib, contextvars
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+TEXTFILE = os.getenv("AA_METRICS_TEXTFILE", "")   # e.g. /var/lib/node_exporter/textfile/aa-{pid}.prom
+PORT = int(os.getenv("AA_METRICS_PORT", "0"))      # 0 = no HTTP endpoint
+HOST = os.getenv("AA_METRICS_HOST", "127.0.0.1")   # 0.0.0.0 to let a remote Prometheus scrape
+STEP_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+"""
+Counter / gauge: one float per label combination. Updating is a dict
+lookup and an add under a lock, so these stay on in every run.
+"""
+class Metric:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+"""
+Cumulative-bucket histogram in the Prometheus exposition layout
+(_bucket{le=...}, _sum, _count), per label combination.
+"""
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Iterable[float] = STEP_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._hist: Dict[LabelKey, List[float]] = {}   # per-bucket counts (+Inf last), sum, count
+
+    def observe(self, value: float, **labels):
+        k = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._hist.get(k)
+            if row is None:
+                row = self._hist[k] = [0.0] * (len(self.buckets) + 3)
+            row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, **labels) -> float:
+        row = self._hist.get(self._key(labels))
+        return row[-1] if row else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._hist.items())
+        out = []
+        for k, row in items:
+            cum = 0.0
+            for le, n in zip([*map(_num, self.buckets), "+Inf"], row):
+                cum += n
+                le_label = 'le="' + le + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le_label)} {_num(cum)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(round(row[-2], 6))}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {_num(row[-1])}")
+        return out
+
+
+"""
+Process-wide set of metrics, rendered together for /metrics or a
+textfile. Registering the same name twice returns the first metric.
+"""
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _add(self, m: Metric) -> Metric:
+        return self.metrics.setdefault(m.name, m)
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Metric:
+        return self._add(Metric(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Iterable[float] = STEP_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for m in self.metrics.values():
+            lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}", *m.samples()]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Optional[str] = None):
+        """Atomic write for node_exporter's textfile collector; {pid} keeps fleet workers apart."""
+        path = pathlib.Path((path or TEXTFILE).format(pid=os.getpid()))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(self.render(), encoding="utf-8")
+            os.replace(tmp, path)
+        except Exception:
+            pass
+
+
+METRICS = MetricsRegistry()
+
+# ---- scraping operations ----
+SEARCHES_STARTED = METRICS.counter("aa_searches_started_total", "Searches started", ["flow"])
+SEARCHES_SUCCEEDED = METRICS.counter("aa_searches_succeeded_total", "Searches that returned a payload", ["flow"])
+SEARCHES_FAILED = METRICS.counter("aa_searches_failed_total", "Searches that raised", ["flow", "reason"])
+ATTEMPTS = METRICS.counter("aa_attempts_total", "Browser attempts by outcome (ok|blocked|failed); block rate = blocked / all",
+                           ["flow", "proxy", "profile", "outcome"])
+RETRIES = METRICS.counter("aa_retries_total", "Attempts after the first within one search", ["flow"])
+LAUNCHES = METRICS.counter("aa_browser_launches_total", "Browser contexts launched", ["flow"])
+CAPTURED = METRICS.counter("aa_captured_responses_total", "JSON responses captured from the page", ["flow"])
+CAPTURED_BYTES = METRICS.counter("aa_captured_bytes_total", "Bytes of captured JSON responses", ["flow"])
+FLIGHTS = METRICS.counter("aa_flights_parsed_total", "Flights parsed, by source (network|dom|paired)", ["source"])
+PARSE_EMPTY = METRICS.counter("aa_parse_empty_total", "Searches where no source yielded flights")
+STEP_SECONDS = METRICS.histogram("aa_step_seconds", "Time from the previous stage mark to this one", ["flow", "step"])
+
+
+# ---- helpers for call sites ----
+def proxy_label(proxy: Optional[Dict[str, str]]) -> str:
+    return (proxy or {}).get("server") or "direct"
+
+def profile_label(profile_dir: Optional[str]) -> str:
+    return pathlib.Path(profile_dir).name if profile_dir else "-"
+
+def attempt(flow: str, proxy: Optional[Dict[str, str]], profile_dir: Optional[str], outcome: str):
+    ATTEMPTS.inc(flow=flow, proxy=proxy_label(proxy), profile=profile_label(profile_dir), outcome=outcome)
+
+def failure_reason(exc: BaseException) -> str:
+    name = type(exc).__name__
+    return {"AkamaiBlocked": "blocked", "DeadlineExceeded": "deadline", "CancelledError": "cancelled"}.get(name, "error")
+
+
+_steps: contextvars.ContextVar[Optional[List]] = contextvars.ContextVar("aa_metric_steps", default=None)
+
+"""
+Wrap one search of a flow: counts it as started, then succeeded or
+failed (by reason), and times the memprof.stage() marks inside it.
+"""
+@contextlib.contextmanager
+def search(flow: str):
+    token = _steps.set([flow, time.monotonic()])
+    SEARCHES_STARTED.inc(flow=flow)
+    try:
+        yield
+    except BaseException as e:
+        SEARCHES_FAILED.inc(flow=flow, reason=failure_reason(e))
+        raise
+    else:
+        SEARCHES_SUCCEEDED.inc(flow=flow)
+    finally:
+        _steps.reset(token)
+        flush()
+
+def current_flow() -> str:
+    cur = _steps.get()
+    return cur[0] if cur else "-"
+
+def stage(step: str):
+    """Observe the time since the previous stage (memprof.stage calls this)."""
+    cur = _steps.get()
+    if cur is None:
+        return
+    now = time.monotonic()
+    STEP_SECONDS.observe(now - cur[1], flow=cur[0], step=step.split("#")[0])   # "launched#2" -> "launched"
+    cur[1] = now
+
+
+# ---- export ----
+_http: Optional[threading.Thread] = None
+
+def serve_http(port: int = PORT, host: str = HOST):
+    """GET /metrics on a daemon thread, for processes that run no server of their own."""
+    global _http
+    if _http is not None or not port:
+        return
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            found = self.path.split("?")[0] == "/metrics"
+            body = METRICS.render().encode("utf-8") if found else b""
+            self.send_response(200 if found else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    _http = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    _http.start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+
+def start_from_env(http: bool = True):
+    """AA_METRICS_PORT starts the endpoint (on AA_METRICS_HOST); AA_METRICS_TEXTFILE is written at exit (and after each search)."""
+    if PORT and http:
+        serve_http(PORT)
+    if TEXTFILE:
+        atexit.register(METRICS.write_textfile)
+
+def flush():
+    if TEXTFILE:
+        METRICS.write_textfile()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date
 
 """
@@ -39,9 +39,38 @@ class SearchResult(BaseModel):
     search_metadata: SearchMetadata
     flights: List[FlightItem] = Field(default_factory=list)
     total_results: int = 0
+    unmatched: List[dict] = Field(default_factory=list)  # paired search: offers found in only one mode
 
     @field_validator("total_results")
     @classmethod
     def check_count(cls, v, info):
         # keep in sync with flights
         return v
+
+
+"""
+FareChange Class: one flight whose price moved, with [old, new] per
+changed field
+"""
+class FareChange(BaseModel):
+    flight_number: str
+    departure_time: str
+    changes: Dict[str, List[float]]   # e.g. {"points_required": [12500, 15000]}
+    cpp: float                        # cpp at the new price
+
+
+"""
+FareDelta Class: what changed for a search since its previous snapshot
+(incremental mode emits this instead of the full SearchResult)
+"""
+class FareDelta(BaseModel):
+    search_metadata: SearchMetadata
+    first_snapshot: bool = False
+    no_flights: bool = False          # search came back empty: nothing diffed, previous snapshot kept
+    added: List[FlightItem] = Field(default_factory=list)
+    removed: List[FlightItem] = Field(default_factory=list)
+    changed: List[FareChange] = Field(default_factory=list)
+    unchanged: int = 0
+
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
@@ -1,30 +1,115 @@
 from __future__ import annotations
+import re
 from typing import Any, Dict, List
-from bs4 import BeautifulSoup
+
+def _hhmm(ts):
+    m = re.search(r"T(\d{2}:\d{2})", ts or "")
+    return m.group(1) if m else None
+
+def _amount(v):
+    if isinstance(v, dict):
+        v = v.get("amount")
+    try:
+        return float(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _slices(node):
+    # itinerary slices anywhere in the response (the shape differs between endpoints)
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == "slices" and isinstance(v, list) and any(isinstance(x, dict) and x.get("segments") for x in v):
+                yield from (x for x in v if isinstance(x, dict))
+            else:
+                yield from _slices(v)
+    elif isinstance(node, list):
+        for v in node:
+            yield from _slices(v)
+
+def parse_offers(js):
+    """
+    One offer per itinerary slice of a shopping response: flight number(s),
+    HH:MM times, and the cheapest fare -- cash total, or award miles with
+    their taxes. Fields the response does not carry are None.
+    """
+    offers: List[dict] = []
+    for sl in _slices(js):
+        segs = [s for s in sl.get("segments") or [] if isinstance(s, dict)]
+        flights = [s.get("flight") or {} for s in segs]
+        number = "/".join(f"{f.get('carrierCode', 'AA')}{f.get('flightNumber', '')}" for f in flights if f.get("flightNumber"))
+        prices = [p for p in sl.get("pricingDetail") or [] if isinstance(p, dict) and p.get("productAvailable", True)]
+        award = [p for p in prices if (p.get("perPassengerAwardPoints") or 0) > 0]
+        cash = [p for p in prices if _amount(p.get("perPassengerDisplayTotal")) is not None]
+        best_award = min(award, key=lambda p: p["perPassengerAwardPoints"]) if award else None
+        best_cash = min(cash, key=lambda p: _amount(p.get("perPassengerDisplayTotal"))) if cash else None
+        offers.append({
+            "flight_number": number or None,
+            "departure_time": _hhmm(segs[0].get("departureDateTime")) if segs else None,
+            "arrival_time": _hhmm(segs[-1].get("arrivalDateTime")) if segs else None,
+            "points": int(best_award["perPassengerAwardPoints"]) if best_award else None,
+            "taxes": _amount(best_award.get("perPassengerTaxesAndFees")) if best_award else None,
+            "cash": _amount(best_cash.get("perPassengerDisplayTotal")) if best_cash else None,
+        })
+    return offers
 
 def parse_from_network(blobs):
-    flights: List[dict] = []
-    # Inspect one captured JSON to learn the exact shape, then adapt below:
+    """
+    Flights from captured JSON responses ({"url", "json"} entries) in the
+    shape to_items() takes. Offers are read with parse_offers; a cash-only
+    and an award-only response for the same flight (one per search mode)
+    are merged on (flight number, departure time). Offers still missing
+    miles or a cash price are dropped.
+    """
+    merged: Dict[tuple, dict] = {}
     for item in blobs:
-        j = item.get("json") or {}
-        # Pseudocode: navigate to itineraries/offers, extract
-        # for offer in j["data"]["offers"]:
-        #   flights.append({...})
+        j = item.get("json") if isinstance(item, dict) else None
+        if not j:
+            continue
+        for o in parse_offers(j):
+            if not (o["flight_number"] and o["departure_time"]):
+                continue
+            if o["points"] is not None and o["cash"] == o["taxes"]:
+                o["cash"] = None   # an award fare's display total is just its taxes
+            have = merged.setdefault((o["flight_number"], o["departure_time"]), dict(o))
+            for k, v in o.items():
+                if have[k] is None:
+                    have[k] = v
+    flights: List[dict] = []
+    for o in merged.values():
+        flight = {
+            "flight_number": o["flight_number"],
+            "departure_time": o["departure_time"],
+            "arrival_time": o["arrival_time"],
+            "points_required": o["points"],
+            "cash_price_usd": o["cash"],
+            "taxes_fees_usd": o["taxes"] if o["taxes"] is not None else 0.0,
+        }
+        if all(v is not None for v in flight.values()):
+            flights.append(flight)
     return flights
 
-def parse_from_dom(html):
+def _int(text):
+    digits = re.sub(r"[^\d]", "", text or "")
+    return int(digits) if digits else None
+
+def _money(text):
+    m = re.search(r"\d[\d,]*(?:\.\d+)?", text or "")
+    return float(m.group().replace(",", "")) if m else None
+
+def parse_from_dom(html, version=None):
+    from .parse_selectors import get  # lazy: keeps CLI startup free of lxml/parsel
     flights: List[dict] = []
-    soup = BeautifulSoup(html, "lxml")
-    cards = soup.select("[data-test-id='resultCard']") or soup.select("article, li")
-    for c in cards:
-        # Heuristics—replace with exact selectors after inspecting the HTML:
-        flight_no = (c.select_one("[data-test-id='flightNumber']") or c.find(text=lambda t: "AA" in t)).get_text(strip=True)
-        depart = (c.select_one("[data-test-id='departTime']") or c.select_one(".depart-time")).get_text(strip=True)
-        arrive = (c.select_one("[data-test-id='arrivalTime']") or c.select_one(".arrive-time")).get_text(strip=True)
-        # Points, cash, taxes: AA often shows as “12,500 miles” and “$289” + “$5.60”
-        # You’ll need regex cleanups:
-        # points = int(re.sub(r"[^\d]", "", points_text))
-        # cash = float(re.sub(r"[^0-9.]", "", cash_text))
-        # taxes = float(re.sub(r"[^0-9.]", "", taxes_text))
-        # flights.append({...})
+    # field selectors and their fallbacks live in parse_selectors (per site version)
+    for card in get("aa.com", version).extract(html):
+        number = re.search(r"AA\s*\d{1,4}", card["flight_number"] or "")
+        flight = {
+            "flight_number": number.group().replace(" ", "") if number else None,
+            "departure_time": card["departure_time"],
+            "arrival_time": card["arrival_time"],
+            "points_required": _int(card["points"]),
+            "cash_price_usd": _money(card["cash"]),
+            "taxes_fees_usd": _money(card["taxes"]) or 0.0,
+        }
+        if all(v is not None for v in flight.values()):
+            flights.append(flight)
     return flights
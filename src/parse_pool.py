@@ -0,0 +1,101 @@
+# src/parse_pool.py
+import os, time, atexit, asyncio, threading
+from typing import Any, Callable, Dict, List, Optional
+
+from . import metrics
+
+# pool size once enabled; 0 always parses inline on the event loop
+WORKERS = int(os.getenv("AA_PARSE_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+
+# opt-in per process: serve, crawl and result streams run many parses on one loop and call enable();
+# one-shot CLI searches and fleet workers (one browser per process already) parse inline
+_enabled = False
+
+PARSE_SECONDS = metrics.METRICS.histogram(
+    "aa_parse_seconds", "HTML parse time as awaited by the caller (queueing + transfer + parse)", ["fn", "where"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _warm():
+    # pay lxml / parsel / bs4 imports once per worker, not on the first page
+    from . import parse_aa, parse_bs4, parse_selectors  # noqa: F401
+
+def pool():
+    """Process pool shared by every caller in this process, started on first use (spawn, like the fleet)."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            import multiprocessing as mp
+            from concurrent.futures import ProcessPoolExecutor
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=mp.get_context("spawn"), initializer=_warm)
+            atexit.register(shutdown)
+        return _pool
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def enable():
+    """Send parses through the pool from now on (unless WORKERS is 0)."""
+    global _enabled
+    _enabled = True
+
+def pooled() -> bool:
+    return _enabled and WORKERS > 0
+
+def warm_up():
+    """Start every worker now (spawn + imports take ~0.5 s) instead of on the first parse."""
+    if pooled():
+        list(pool().map(_noop, range(WORKERS)))
+
+def _noop(_):
+    return None
+
+def _call(fn: Callable, args: tuple):
+    # selector hit counts live in the worker's registry: send them back with the result
+    from . import parse_selectors
+    return fn(*args), parse_selectors.take_counts()
+
+
+"""
+Runs a CPU-bound parse off the event loop: `fn` and its arguments are
+pickled to a worker process (a results page is a few MB at most, copied
+once each way), so other in-flight searches keep running while lxml /
+BeautifulSoup works, and the worker's selector hit counts come back with
+the result. fn must be a module-level function. Inline unless enable()d.
+"""
+async def run(fn: Callable, *args, name: Optional[str] = None) -> Any:
+    from concurrent.futures.process import BrokenProcessPool
+    t0 = time.monotonic()
+    where = "pool" if pooled() else "inline"
+    try:
+        if where == "inline":
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            result, counts = await loop.run_in_executor(pool(), _call, fn, args)
+        except BrokenProcessPool:
+            # a worker died (OOM-killed on a huge page...): start a fresh pool and try once more
+            shutdown()
+            result, counts = await loop.run_in_executor(pool(), _call, fn, args)
+        if counts:
+            from . import parse_selectors
+            parse_selectors.add_counts(counts)
+        return result
+    finally:
+        PARSE_SECONDS.observe(time.monotonic() - t0, fn=name or fn.__name__, where=where)
+
+
+async def parse_dom(html: str, version: Optional[str] = None) -> List[Dict[str, Any]]:
+    from .parse_aa import parse_from_dom
+    return await run(parse_from_dom, html, version)
+
+async def titles_and_links(html: str) -> Dict[str, Any]:
+    from .parse_bs4 import parse_titles_and_links
+    return await run(parse_titles_and_links, html)
@@ -0,0 +1,194 @@
+# src/parse_selectors.py
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import lxml.html
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+_CSS = HTMLTranslator()
+# lxml refuses str input that still carries its byte encoding declaration
+_XML_DECL = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+def _compile(sel: str) -> etree.XPath:
+    """CSS (parsel flavour, ::text / ::attr() allowed) or 'xpath:...' into a compiled XPath."""
+    if sel.startswith("xpath:"):
+        return etree.XPath(sel[len("xpath:"):])
+    return etree.XPath(_CSS.css_to_xpath(sel))
+
+def _text(node) -> str:
+    if isinstance(node, str):                   # text() / @attr results
+        return " ".join(node.split())
+    return " ".join(node.text_content().split())
+
+
+"""
+One named thing to find, as an ordered list of fallback selectors
+compiled once. Every lookup records which fallback matched, so the
+hit table shows the ones that never do.
+"""
+class Rule:
+    def __init__(self, name: str, selectors: Sequence[str]):
+        self.name = name
+        self.selectors = list(selectors)
+        self.xpaths = [_compile(s) for s in self.selectors]
+        self.hits = [0] * len(self.selectors)
+        self.misses = 0
+
+    def all(self, root) -> List[Any]:
+        """Nodes of the first fallback that matches anything."""
+        for i, xp in enumerate(self.xpaths):
+            found = xp(root)
+            if found:
+                self.hits[i] += 1
+                return found
+        self.misses += 1
+        return []
+
+    def first(self, node) -> Optional[str]:
+        """Cleaned text of the first fallback that yields non-empty text."""
+        for i, xp in enumerate(self.xpaths):
+            for found in xp(node):
+                text = _text(found)
+                if text:
+                    self.hits[i] += 1
+                    return text
+        self.misses += 1
+        return None
+
+    def reset(self):
+        self.hits = [0] * len(self.selectors)
+        self.misses = 0
+
+
+"""
+Selectors for one version of one site's results page: a card rule, the
+fields read from every card, and plain CSS the browser flows wait on.
+"""
+class SelectorSet:
+    def __init__(self, site: str, version: str, card: Sequence[str], fields: Dict[str, Sequence[str]],
+                 page: Optional[Dict[str, Sequence[str]]] = None):
+        self.site = site
+        self.version = version
+        self.card = Rule("card", card)
+        self.fields = {name: Rule(name, sels) for name, sels in fields.items()}
+        self.page = {name: list(sels) for name, sels in (page or {}).items()}
+
+    def css(self, name: str) -> str:
+        """Comma-joined CSS for Playwright waits (page selectors are never compiled)."""
+        return ", ".join(self.page[name])
+
+    def extract(self, html: Union[str, bytes, Any]) -> List[Dict[str, Optional[str]]]:
+        """Parses once, then reads every field of every card from that tree."""
+        root = html
+        if isinstance(html, str):
+            html = _XML_DECL.sub("", html, count=1)
+        if isinstance(html, (str, bytes)):
+            if not html.strip():                # lxml raises ParserError on a blank document
+                return []
+            root = lxml.html.fromstring(html)
+        return [{name: rule.first(card) for name, rule in self.fields.items()} for card in self.card.all(root)]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        rows = []
+        for rule in [self.card, *self.fields.values()]:
+            total = sum(rule.hits) + rule.misses
+            for sel, hits in zip(rule.selectors, rule.hits):
+                rows.append({"site": self.site, "version": self.version, "rule": rule.name, "selector": sel,
+                             "hits": hits, "share": round(hits / total, 3) if total else 0.0})
+            rows.append({"site": self.site, "version": self.version, "rule": rule.name, "selector": "(no match)",
+                         "hits": rule.misses, "share": round(rule.misses / total, 3) if total else 0.0})
+        return rows
+
+    def dead(self) -> List[Tuple[str, str]]:
+        """(rule, selector) pairs that never matched while their rule was in use."""
+        out = []
+        for rule in [self.card, *self.fields.values()]:
+            if sum(rule.hits) + rule.misses:
+                out += [(rule.name, s) for s, h in zip(rule.selectors, rule.hits) if not h]
+        return out
+
+    def reset(self):
+        for rule in [self.card, *self.fields.values()]:
+            rule.reset()
+
+
+REGISTRY: Dict[str, Dict[str, SelectorSet]] = {}
+
+def register(sel: SelectorSet) -> SelectorSet:
+    REGISTRY.setdefault(sel.site, {})[sel.version] = sel
+    return sel
+
+def take_counts() -> List[Tuple[str, str, str, List[int], int]]:
+    """(site, version, rule, hits, misses) recorded since the last call, then zeroed; parse pool workers ship these back."""
+    out = []
+    for site, versions in REGISTRY.items():
+        for version, sel in versions.items():
+            for rule in [sel.card, *sel.fields.values()]:
+                if sum(rule.hits) + rule.misses:
+                    out.append((site, version, rule.name, rule.hits, rule.misses))
+            sel.reset()
+    return out
+
+def add_counts(counts: Sequence[Tuple[str, str, str, List[int], int]]):
+    """Fold counts from take_counts() (another process) into this process's hit tables."""
+    for site, version, name, hits, misses in counts:
+        sel = REGISTRY[site][version]
+        rule = sel.card if name == "card" else sel.fields[name]
+        rule.hits = [a + b for a, b in zip(rule.hits, hits)]
+        rule.misses += misses
+
+def get(site: str = "aa.com", version: Optional[str] = None) -> SelectorSet:
+    """The requested version, else AA_SELECTORS_VERSION, else the newest registered for the site."""
+    versions = REGISTRY[site]
+    version = version or os.getenv("AA_SELECTORS_VERSION") or max(versions)
+    return versions[version]
+
+
+# ---- aa.com ----
+register(SelectorSet(
+    "aa.com", "v1",
+    card=["[data-test-id='resultCard']", "[data-testid='resultCard']", "article, li"],
+    fields={
+        "flight_number": ["[data-test-id='flightNumber']", "xpath:.//text()[contains(., 'AA')]"],
+        "departure_time": ["[data-test-id='departTime']", ".depart-time"],
+        "arrival_time": ["[data-test-id='arrivalTime']", ".arrive-time"],
+        # AA prints "12,500 miles" and "$289" + "$5.60"; the text fallbacks cover unlabeled markup
+        "points": ["[data-test-id='milesAmount']", "xpath:.//text()[contains(., 'miles')]"],
+        "cash": ["[data-test-id='cashAmount']", "xpath:.//text()[starts-with(normalize-space(.), '$')]"],
+        "taxes": ["[data-test-id='taxesAmount']", "xpath:.//text()[starts-with(normalize-space(.), '+')][contains(., '$')]"],
+    },
+    page={
+        "results_list": ["[data-test-id='resultsList']", "[data-testid='resultsList']", "[role='list']"],
+        "result_card": ["[data-test-id='resultCard']", "[data-testid='resultCard']"],
+        # "show more" first, then numbered pagination
+        "load_more": ["[data-test-id='loadMoreResults']", "button:has-text('Show more')", "button:has-text('More flights')",
+                      "a[rel='next']", "button[aria-label*='next page' i]"],
+    },
+))
+
+
+# -------- CLI: python -m src.parse_selectors [--html FILE ...] --------
+if __name__ == "__main__":
+    import argparse, glob
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--site", default="aa.com")
+    ap.add_argument("--version", default=None)
+    ap.add_argument("--html", nargs="*", default=[], help="pages to run against (default: stored results pages)")
+    ap.add_argument("--limit", type=int, default=200)
+    args = ap.parse_args()
+
+    sel = get(args.site, args.version)
+    pages = [open(p, encoding="utf-8", errors="replace").read() for g in args.html for p in sorted(glob.glob(g))]
+    if not args.html:
+        from . import blobstore
+        store = blobstore.default()
+        pages = [store.get_text(r["sha256"]) for r in store.refs(kind="results.html", limit=args.limit)]
+    cards = sum(len(sel.extract(p)) for p in pages)
+    print(f"🔎 {sel.site} {sel.version}: {len(pages)} page(s), {cards} card(s)")
+    for row in sel.stats():
+        print(f"   {row['rule']:<15} {row['hits']:7d} {row['share']:7.1%}  {row['selector']}")
+    for rule, s in sel.dead():
+        print(f"🪦 never matched: {rule}: {s}")
@@ -0,0 +1,144 @@
+import contextlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from .models import SearchMetadata, FlightItem, SearchResult
+from .cpp import cpp_cents_per_point
+from .parse_aa import parse_from_network, parse_from_dom, parse_offers
+from . import metrics
+
+
+"""
+Turns parsed flight dicts into FlightItem models with cpp filled in
+"""
+def to_items(flights: List[Dict[str, Any]]) -> List[FlightItem]:
+    items = []
+    for f in flights:
+        cpp = cpp_cents_per_point(f["cash_price_usd"], f["taxes_fees_usd"], f["points_required"])
+        items.append(FlightItem(
+            flight_number=f["flight_number"],
+            departure_time=f["departure_time"],
+            arrival_time=f["arrival_time"],
+            points_required=f["points_required"],
+            cash_price_usd=f["cash_price_usd"],
+            taxes_fees_usd=f["taxes_fees_usd"],
+            cpp=cpp,
+        ))
+    return items
+
+
+"""
+Builds a SearchResult from a search_and_capture payload, preferring
+captured network JSON and falling back to the results page DOM
+"""
+def build_result(meta: SearchMetadata, payload: Dict[str, Any]) -> SearchResult:
+    flights, source = parse_from_network(payload["network_json"]), "network"
+    if not flights and payload["page_html"]:
+        flights, source = parse_from_dom(payload["page_html"]), "dom"
+    return _result(meta, flights, source)
+
+
+"""
+Same as build_result for async callers: the DOM fallback is parsed in
+the parse process pool, so other searches on the loop keep running
+"""
+async def abuild_result(meta: SearchMetadata, payload: Dict[str, Any]) -> SearchResult:
+    from . import parse_pool
+    flights, source = parse_from_network(payload["network_json"]), "network"
+    if not flights and payload["page_html"]:
+        flights, source = await parse_pool.parse_dom(payload["page_html"]), "dom"
+    return _result(meta, flights, source)
+
+
+def _result(meta: SearchMetadata, flights: List[Dict[str, Any]], source: str) -> SearchResult:
+    if flights:
+        metrics.FLIGHTS.inc(len(flights), source=source)
+    else:
+        metrics.PARSE_EMPTY.inc()
+    items = to_items(flights)
+    return SearchResult(search_metadata=meta, flights=items, total_results=len(items))
+
+
+"""
+Single search entry point shared by the CLI and the worker fleet
+"""
+async def run_search(meta: SearchMetadata, profile_dir: Optional[str] = None,
+                     deadline_s: Optional[float] = None) -> SearchResult:
+    from .playwright_flow import search_and_capture  # pulls in playwright; parse-only never needs it
+    payload = await search_and_capture({
+        "origin": meta.origin, "destination": meta.destination, "date": meta.date.isoformat()
+    }, profile_dir=profile_dir, deadline_s=deadline_s)
+    return await abuild_result(meta, payload)
+
+
+"""
+Flights of one search as they load: `async for flight in iter_flights(meta)`.
+Network batches are yielded as they arrive, then DOM chunks; further
+result pages ("show more" / next) load only while the caller keeps
+iterating, so breaking out after the first few stops the browser.
+"""
+async def iter_flights(meta: SearchMetadata, profile_dir: Optional[str] = None, deadline_s: Optional[float] = None,
+                       max_pages: Optional[int] = None) -> AsyncIterator[FlightItem]:
+    from .playwright_flow import stream_results, STREAM_MAX_PAGES  # pulls in playwright
+    params = {"origin": meta.origin, "destination": meta.destination, "date": meta.date.isoformat()}
+    async with contextlib.aclosing(stream_results(params, profile_dir, deadline_s, max_pages or STREAM_MAX_PAGES)) as batches:
+        async for source, flights in batches:
+            metrics.FLIGHTS.inc(len(flights), source=source)
+            for item in to_items(flights):
+                yield item
+
+
+"""
+Hash join of cash and award offers on (flight number, departure time):
+the award side is indexed, every cash offer probes it once. Joined rows
+carry cash price, award miles and award taxes, so cpp is real. Offers
+missing their other half (or a price) come back in `unmatched`.
+"""
+def pair_offers(cash: List[Dict[str, Any]], award: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    index: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    for a in award:
+        index.setdefault((a["flight_number"], a["departure_time"]), []).append(a)
+
+    flights, unmatched = [], []
+    for c in cash:
+        bucket = index.get((c["flight_number"], c["departure_time"]))
+        if not bucket:
+            unmatched.append({**c, "side": "cash", "reason": "no award offer"})
+            continue
+        a = bucket.pop(0)
+        row = {
+            "flight_number": c["flight_number"],
+            "departure_time": c["departure_time"],
+            "arrival_time": c["arrival_time"] or a["arrival_time"],
+            "points_required": a["points"],
+            "cash_price_usd": c["cash"],
+            "taxes_fees_usd": a["taxes"] if a["taxes"] is not None else 0.0,
+        }
+        if None in row.values():
+            unmatched.append({**c, "points": a["points"], "taxes": a["taxes"], "side": "both", "reason": "incomplete fare"})
+        else:
+            flights.append(row)
+    for bucket in index.values():
+        unmatched += [{**a, "side": "award", "reason": "no cash offer"} for a in bucket]
+    return flights, unmatched
+
+
+def build_paired_result(meta: SearchMetadata, cash_json: Any, award_json: Any) -> SearchResult:
+    flights, unmatched = pair_offers(parse_offers(cash_json or {}), parse_offers(award_json or {}))
+    if flights:
+        metrics.FLIGHTS.inc(len(flights), source="paired")
+    else:
+        metrics.PARSE_EMPTY.inc()
+    items = to_items(flights)
+    return SearchResult(search_metadata=meta, flights=items, total_results=len(items), unmatched=unmatched)
+
+
+"""
+Cash and award searches run concurrently in one warm context (direct
+API path), joined into flights with real cents-per-point
+"""
+async def run_paired_search(meta: SearchMetadata, profile_dir: Optional[str] = None,
+                            deadline_s: Optional[float] = None) -> SearchResult:
+    from .crawler_api import fetch_paired_json  # pulls in playwright
+    res = await fetch_paired_json({
+        "origin": meta.origin, "destination": meta.destination, "date": meta.date.isoformat()
+    }, profile_dir=profile_dir, deadline_s=deadline_s)
+    return build_paired_result(meta, res["cash"], res["award"])
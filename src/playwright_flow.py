@@ -1,12 +1,19 @@
 # src/playwright_flow.py
-import os, re, asyncio, pathlib, random, string
-from typing import Any, Dict, List, Optional
+import os, re, json, time, asyncio, random, string
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from playwright.async_api import async_playwright, TimeoutError as PWTimeout, Page
 
-OUT = pathlib.Path("data/debug"); OUT.mkdir(parents=True, exist_ok=True)
-PROFILE_DIR = ".pw-user"
+from .proxy_pool import POOL, proxy_from_env
+from .profile_pool import profile_slot
+from . import storage_state, replay, memprof, blobstore, parse_selectors, parse_pool, deadline, metrics
+from .parse_aa import parse_from_network
+from .strategies import STRATEGIES
+from .deadline import clamp, clamp_s
+
+PROFILE_DIR = ".pw-user"  # golden profile; see profile_pool for concurrent runs
 
 PREWARM = os.getenv("AA_PREWARM", "0").lower() in ("1","true","yes")
+BOOKING_URL = os.getenv("AA_BOOKING_URL", "https://www.aa.com/booking/find-flights")
 ROTATE  = os.getenv("AA_ROTATE",  "0").lower() in ("1","true","yes")
 BLOCK_MEDIA_ON_HOME = False  # flip True after you’re stable
 
@@ -14,18 +21,17 @@ UA = os.getenv("AA_UA",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
     "Chrome/127.0.0.0 Safari/537.36"
 )
+STREAM_MAX_PAGES = int(os.getenv("AA_STREAM_MAX_PAGES", "5"))   # "show more" / next-page loads per stream
 NETWORK_KEEP = re.compile(r"(availability|shopping|offers?|price|itinerary|calendar|miles|fare)", re.I)
 
-# ---------------- proxy helper (simple env variant) ----------------
-def proxy_from_env(idx: int):
-    p = os.getenv("AA_HTTP_PROXY") or os.getenv("HTTP_PROXY")
-    return {"server": p} if p else None
-
 # ---------------- debug utils ----------------
-async def debug_step(page: Page, name: str):
+async def debug_step(page: Page, name: str, key: Optional[str] = None):
+    """Step HTML and screenshot into the blob store under the search key, so concurrent searches keep their own."""
     try:
-        (OUT / f"{name}.html").write_text(await page.content(), encoding="utf-8")
-        await page.screenshot(path=str(OUT / f"{name}.png"), full_page=True)
+        html, png = await page.content(), await page.screenshot(full_page=True)
+        store = blobstore.default()
+        await asyncio.to_thread(store.put, html, url=page.url, key=key, kind=f"{name}.html")
+        await asyncio.to_thread(store.put, png, url=page.url, key=key, kind=f"{name}.png")
     except Exception:
         pass
 
@@ -44,7 +50,7 @@ async def accept_banners(page: Page):
         "button[aria-label*='dismiss' i]", "button[aria-label*='close' i]"
     ]
     for s in sels:
-        try: await page.locator(s).first.click(timeout=800)
+        try: await page.locator(s).first.click(timeout=clamp(800))
         except Exception: pass
 
 async def blocked(page: Page) -> bool:
@@ -72,7 +78,7 @@ async def ensure_book_flights_panel(page: Page) -> None:
         try:
             loc = page.locator(sel).first
             if await loc.is_visible():
-                await loc.click(timeout=900)
+                await loc.click(timeout=clamp(900))
                 break
         except Exception:
             pass
@@ -87,7 +93,7 @@ async def ensure_book_flights_panel(page: Page) -> None:
         try:
             loc = page.locator(sel).first
             if await loc.is_visible():
-                await loc.click(timeout=900)
+                await loc.click(timeout=clamp(900))
                 break
         except Exception:
             pass
@@ -152,13 +158,13 @@ async def force_one_way_hard(page: Page, form_sel: str):
     try:
         radio = page.locator(f"{form_sel} input#flightSearchForm\\.tripType\\.oneWay")
         if await radio.count():
-            await radio.first.check(timeout=900)
+            await radio.first.check(timeout=clamp(900))
     except Exception:
         pass
     try:
         lab = page.locator(f"{form_sel} label[for='flightSearchForm.tripType.oneWay']")
         if await lab.count():
-            await lab.first.click(timeout=900)
+            await lab.first.click(timeout=clamp(900))
     except Exception:
         pass
 
@@ -224,22 +230,18 @@ async def force_one_way_hard(page: Page, form_sel: str):
 async def fill_airport(page: Page, form_sel: str, name_attr: str, code: str):
     await wait_akamai_clear(page)
     inp = page.locator(f"{form_sel} input[name='{name_attr}']").first
-    await inp.wait_for(state="visible", timeout=6000)
+    await inp.wait_for(state="visible", timeout=clamp(6000))
     try: await inp.fill("")
     except Exception: pass
     await inp.type(code, delay=25)
 
-    # Prefer ARIA options; fallback to jQuery UI
-    try:
-        opt = page.get_by_role("option", name=re.compile(rf"\b{re.escape(code)}\b", re.I)).first
-        await opt.click(timeout=1200); return
-    except Exception:
-        pass
-    try:
-        dd = page.locator("ul.ui-autocomplete li a", has_text=re.compile(rf"\b{re.escape(code)}\b", re.I)).first
-        await dd.click(timeout=1200); return
-    except Exception:
-        pass
+    # ARIA options or jQuery UI, whichever has been working lately
+    pat = re.compile(rf"\b{re.escape(code)}\b", re.I)
+    if await STRATEGIES.run("airport_option_flow", [
+        ("role=option", lambda: page.get_by_role("option", name=pat).first.click(timeout=clamp(1200))),
+        ("ui-autocomplete", lambda: page.locator("ul.ui-autocomplete li a", has_text=pat).first.click(timeout=clamp(1200))),
+    ]):
+        return
 
     # Minimal keyboard nudge
     try:
@@ -262,7 +264,7 @@ async def set_depart_date(page: Page, form_sel: str, date_iso: str):
     ).filter(has_not=page.locator("[type='hidden']")).first
 
     try:
-        await date_inp.wait_for(state="visible", timeout=5000)
+        await date_inp.wait_for(state="visible", timeout=clamp(5000))
         await date_inp.click()
         await date_inp.fill(mmddyyyy)
         await page.keyboard.press("Tab")
@@ -309,166 +311,493 @@ async def set_depart_date(page: Page, form_sel: str, date_iso: str):
         raise RuntimeError("Depart date not set correctly")
 
 # ---------------- JSON capture ----------------
-async def _capture_json(resp, bucket: List[Dict[str, Any]]):
+async def _capture_json(resp, bucket: List[Dict[str, Any]], flights_seen: Optional[asyncio.Event] = None,
+                        arrivals: Optional[asyncio.Queue] = None):
     try:
         url = resp.url
         if not NETWORK_KEEP.search(url): return
         ct = (resp.headers.get("content-type") or "").lower()
         if "json" not in ct: return
-        js = await resp.json()
-        bucket.append({"url": url, "json": js})
+        body = await resp.body()
+        js = json.loads(body)
+        metrics.CAPTURED.inc(flow=metrics.current_flow())
+        metrics.CAPTURED_BYTES.inc(len(body), flow=metrics.current_flow())
+        entry = {"url": url, "json": js}
+        bucket.append(entry)
+        if arrivals is not None:
+            arrivals.put_nowait(entry)
+        # same parser the pipeline uses, so "seen" means the result needs no DOM
+        if flights_seen is not None and not flights_seen.is_set() and parse_from_network([entry]):
+            flights_seen.set()
     except Exception:
         pass
 
+async def _wait_results_dom(page: Page):
+    try:
+        await page.wait_for_load_state("networkidle")
+        await page.wait_for_selector(parse_selectors.get("aa.com").css("results_list"), timeout=clamp(25000))
+    except PWTimeout:
+        pass
+
 # ---------------- prewarm (optional) ----------------
 async def prewarm(page: Page):
     try:
         await page.goto("https://www.aa.com/i18n/customer-service/support/contact-american/american-customer-service.jsp",
-                        wait_until="domcontentloaded", timeout=9000)
+                        wait_until="domcontentloaded", timeout=clamp(9000))
         await wait_akamai_clear(page)
         await asyncio.sleep(0.2)
     except Exception:
         pass
     try:
         await page.goto("https://www.aa.com/i18n/travel-info/experience/dining/main-cabin.jsp",
-                        wait_until="domcontentloaded", timeout=9000)
+                        wait_until="domcontentloaded", timeout=clamp(9000))
         await wait_akamai_clear(page)
         await asyncio.sleep(0.2)
     except Exception:
         pass
 
+# ---------------- warm-state shortcut ----------------
+async def open_booking_form_fast(page: Page) -> Optional[str]:
+    """With a restored storage state, go straight to the booking form. None means re-warm."""
+    try:
+        await page.goto(BOOKING_URL, wait_until="domcontentloaded", timeout=clamp(15000))
+        await wait_akamai_clear(page)
+        if await blocked(page):
+            return None
+        await ensure_book_flights_panel(page)
+        return await get_booking_form_selector(page)
+    except Exception:
+        return None
+
+# ---------------- launch ----------------
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-features=Translate",
+    "--no-default-browser-check",
+    "--no-first-run",
+    "--force-webrtc-ip-handling-policy=disable_non_proxied_udp",
+]
+EXTRA_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.aa.com/",
+    "Upgrade-Insecure-Requests": "1",
+    "sec-ch-ua": '"Chromium";v="127", "Not=A?Brand";v="24", "Google Chrome";v="127"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Windows"',
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "same-origin",
+    "Sec-Fetch-User": "?1",
+}
+
+class AkamaiBlocked(RuntimeError):
+    def __init__(self, html: str = ""):
+        super().__init__("akamai_blocked")
+        self.html = html
+
+async def launch_context(p, profile_dir: str, proxy: Optional[Dict[str, str]]):
+    metrics.LAUNCHES.inc(flow=metrics.current_flow())
+    ctx = await p.chromium.launch_persistent_context(
+        profile_dir,
+        channel="chrome",
+        headless=False,
+        viewport={"width": 1366, "height": 900},
+        user_agent=UA,
+        locale="en-US,en;q=0.9",
+        timezone_id="America/Los_Angeles",
+        proxy=proxy,
+        args=LAUNCH_ARGS,
+    )
+    await ctx.set_extra_http_headers(EXTRA_HEADERS)
+    await ctx.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined})")
+    await replay.attach(ctx)
+    return ctx
+
+# ---------------- form → results page ----------------
+async def _submit_search(page: Page, params: Dict[str, Any], state: Optional[Dict[str, Any]], warm: bool = False):
+    """Fill and submit the booking form; raises AkamaiBlocked if the results page is a deny page."""
+    key = blobstore.search_key(params)
+    form_sel = None
+    if state or warm:
+        form_sel = await open_booking_form_fast(page)
+        if not form_sel:
+            print("♻️ Saved storage state no longer works, re-warming")
+            storage_state.invalidate()
+            state = None
+
+    if not form_sel:
+        # ---- Home ----
+        await page.goto("https://www.aa.com/", wait_until="domcontentloaded")
+        await wait_akamai_clear(page)
+        await accept_banners(page)
+        await debug_step(page, "01_home", key)
+
+        if PREWARM:
+            await prewarm(page)
+            await page.goto("https://www.aa.com/", wait_until="domcontentloaded")
+            await wait_akamai_clear(page)
+
+        # Anchor booking panel and select form
+        await ensure_book_flights_panel(page)
+        form_sel = await get_booking_form_selector(page)
+
+    memprof.stage("form_ready")
+
+    # One-way
+    await force_one_way_hard(page, form_sel)
+    await debug_step(page, "02_oneway", key)
+
+    # Airports
+    await fill_airport(page, form_sel, "originAirport", params["origin"])
+    await debug_step(page, "03_origin", key)
+    await fill_airport(page, form_sel, "destinationAirport", params["destination"])
+    await debug_step(page, "04_destination", key)
+
+    # Date
+    await set_depart_date(page, form_sel, params["date"])
+    await debug_step(page, "05_date_set", key)
+
+    # Submit to HTTPS
+    await wait_akamai_clear(page)
+    await page.evaluate("""
+    (formSel) => {
+      const f = document.querySelector(formSel);
+      if (!f) throw new Error('search form not found');
+      f.setAttribute('action','https://www.aa.com/booking/find-flights');
+      f.submit();
+    }
+    """, form_sel)
+
+    await page.wait_for_load_state("domcontentloaded")
+    await debug_step(page, "06_after_submit", key)
+    memprof.stage("submitted")
+
+    if await blocked(page):
+        if state:
+            storage_state.invalidate()
+        raise AkamaiBlocked(await page.content())
+
+# ---------------- one attempt in a launched context ----------------
+async def run_attempt(ctx, params: Dict[str, Any], warm: bool = False) -> Dict[str, Any]:
+    """
+    Run one search in a new page of `ctx` and close the page afterwards.
+    `warm` means the context already searched successfully, so its live
+    cookies beat any saved snapshot. Raises AkamaiBlocked on a deny page.
+    """
+    state = storage_state.load()
+    if state and not warm:
+        await storage_state.apply(ctx, state)
+    page = await ctx.new_page()
+    # untimed calls (goto, content, ...) must not outlive the budget either
+    page.set_default_timeout(clamp(30000))
+    page.set_default_navigation_timeout(clamp(30000))
+    memprof.stage("page_open")
+
+    # optional resource slimming
+    if BLOCK_MEDIA_ON_HOME:
+        async def route_filter(route):
+            try:
+                if route.request.resource_type in ("image","media","font"):
+                    return await route.abort()
+            except Exception:
+                pass
+            try: await route.continue_()
+            except Exception: pass
+        await page.route("**/*", route_filter)
+
+    # capture JSON; flights_seen fires once a response parses into flights
+    captured: List[Dict[str, Any]] = []
+    flights_seen = asyncio.Event()
+    page.on("response", lambda r: asyncio.create_task(_capture_json(r, captured, flights_seen)))
+
+    try:
+        await _submit_search(page, params, state, warm)
+
+        # Results: done as soon as captured JSON holds flights, else the DOM shell (best effort)
+        if not flights_seen.is_set():
+            waiters = [asyncio.create_task(flights_seen.wait()), asyncio.create_task(_wait_results_dom(page))]
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for t in waiters:
+                    t.cancel()
+        memprof.stage("results_loaded")
+
+        await storage_state.save(ctx)
+        key, store = blobstore.search_key(params), blobstore.default()
+        await asyncio.to_thread(store.put_json, list(captured), url=page.url, key=key, kind="network.json")
+        html = ""
+        if flights_seen.is_set():
+            print("⚡ Flights in captured JSON, skipping DOM wait and screenshot")
+        else:
+            html = await page.content()
+            await asyncio.to_thread(store.put, html, url=page.url, key=key, kind="results.html")
+            await asyncio.to_thread(store.put, await page.screenshot(full_page=True), url=page.url, key=key, kind="results.png")
+        memprof.stage("artifacts")
+        return {"network_json": list(captured), "page_html": html}
+
+    except AkamaiBlocked:
+        raise
+    except (Exception, asyncio.CancelledError):
+        # failed or out of budget: keep whatever we got for parse-only / debugging
+        try:
+            key, store = blobstore.search_key(params), blobstore.default()
+            if captured:
+                store.put_json(list(captured), url=page.url, key=key, kind="network.json")
+            last_html = await page.content()
+            store.put(last_html, url=page.url, key=key, kind="last.html")
+            store.put(await page.screenshot(full_page=True, timeout=5000), url=page.url, key=key, kind="last.png")
+        except Exception:
+            pass
+        raise
+    finally:
+        try: await page.close()
+        except Exception: pass
+
 # ---------------- main ----------------
-async def search_and_capture(params: Dict[str, Any]) -> Dict[str, Any]:
+async def search_and_capture(params: Dict[str, Any], profile_dir: Optional[str] = None,
+                             deadline_s: Optional[float] = None) -> Dict[str, Any]:
+    """
+    deadline_s bounds the whole search (profile wait, retries, every
+    Playwright wait); past it the attempt is cancelled, the context closed
+    and DeadlineExceeded raised. None keeps an enclosing budget, if any.
+    """
+    with memprof.session(f"search {params['origin']}->{params['destination']} {params['date']}"), \
+            metrics.search("search"), deadline.scope(deadline_s):
+        if profile_dir:  # caller (e.g. a fleet worker) already owns a profile
+            return await deadline.enforce(_search_with_profile(params, profile_dir))
+        async with profile_slot() as profile_dir:
+            return await deadline.enforce(_search_with_profile(params, profile_dir))
+
+async def _search_with_profile(params: Dict[str, Any], profile_dir: str) -> Dict[str, Any]:
     attempts, max_attempts = 0, 4
     last_html = ""
     while attempts < max_attempts:
+        deadline.check("search")
         attempts += 1
+        if attempts > 1:
+            metrics.RETRIES.inc(flow="search")
+        if ROTATE:
+            POOL.release(profile_dir)
+        proxy = proxy_from_env(profile_dir)
+        started = time.monotonic()
         async with async_playwright() as p:
-            ctx = await p.chromium.launch_persistent_context(
-                PROFILE_DIR,
-                channel="chrome",
-                headless=False,
-                viewport={"width": 1366, "height": 900},
-                user_agent=UA,
-                locale="en-US,en;q=0.9",
-                timezone_id="America/Los_Angeles",
-                proxy=proxy_from_env(attempts if ROTATE else 1),
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-features=Translate",
-                    "--no-default-browser-check",
-                    "--no-first-run",
-                    "--force-webrtc-ip-handling-policy=disable_non_proxied_udp",
-                ],
-            )
-            await ctx.set_extra_http_headers({
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.aa.com/",
-                "Upgrade-Insecure-Requests": "1",
-                "sec-ch-ua": '"Chromium";v="127", "Not=A?Brand";v="24", "Google Chrome";v="127"',
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": '"Windows"',
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "same-origin",
-                "Sec-Fetch-User": "?1",
-            })
-            await ctx.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined})")
-            page = await ctx.new_page()
-
-            # optional resource slimming
-            if BLOCK_MEDIA_ON_HOME:
-                async def route_filter(route):
-                    try:
-                        if route.request.resource_type in ("image","media","font"):
-                            return await route.abort()
-                    except Exception:
-                        pass
-                    try: await route.continue_()
-                    except Exception: pass
-                await page.route("**/*", route_filter)
-
-            # capture JSON
-            captured: List[Dict[str, Any]] = []
-            page.on("response", lambda r: asyncio.create_task(_capture_json(r, captured)))
-
+            ctx = await launch_context(p, profile_dir, proxy)
+            memprof.stage(f"launched#{attempts}")
             try:
-                # ---- Home ----
-                await page.goto("https://www.aa.com/", wait_until="domcontentloaded")
-                await wait_akamai_clear(page)
-                await accept_banners(page)
-                await debug_step(page, "01_home")
-
-                if PREWARM:
-                    await prewarm(page)
-                    await page.goto("https://www.aa.com/", wait_until="domcontentloaded")
-                    await wait_akamai_clear(page)
-
-                # Anchor booking panel and select form
-                await ensure_book_flights_panel(page)
-                form_sel = await get_booking_form_selector(page)
-
-                # One-way
-                await force_one_way_hard(page, form_sel)
-                await debug_step(page, "02_oneway")
-
-                # Airports
-                await fill_airport(page, form_sel, "originAirport", params["origin"])
-                await debug_step(page, "03_origin")
-                await fill_airport(page, form_sel, "destinationAirport", params["destination"])
-                await debug_step(page, "04_destination")
-
-                # Date
-                await set_depart_date(page, form_sel, params["date"])
-                await debug_step(page, "05_date_set")
-
-                # Submit to HTTPS
-                await wait_akamai_clear(page)
-                await page.evaluate("""
-                (formSel) => {
-                  const f = document.querySelector(formSel);
-                  if (!f) throw new Error('search form not found');
-                  f.setAttribute('action','https://www.aa.com/booking/find-flights');
-                  f.submit();
-                }
-                """, form_sel)
-
-                await page.wait_for_load_state("domcontentloaded")
-                await debug_step(page, "06_after_submit")
-
-                if await blocked(page):
-                    last_html = await page.content()
-                    await ctx.close()
-                    await asyncio.sleep(0.9 + attempts*0.5)
-                    continue
-
-                # Results shell (best effort)
-                try:
-                    await page.wait_for_load_state("networkidle")
-                    await page.wait_for_selector(
-                        "[data-test-id='resultsList'], [data-testid='resultsList'], [role='list']",
-                        timeout=25000
-                    )
-                except PWTimeout:
-                    pass
-
-                html = await page.content()
-                (OUT / "results.html").write_text(html, encoding="utf-8")
-                await page.screenshot(path=str(OUT / "results.png"), full_page=True)
+                payload = await run_attempt(ctx, params)
+            except AkamaiBlocked as e:
+                POOL.report(proxy, ok=False, blocked=True)
+                metrics.attempt("search", proxy, profile_dir, "blocked")
+                last_html = e.html
                 await ctx.close()
-                return {"network_json": captured, "page_html": html}
-
+                await asyncio.sleep(clamp_s(0.9 + attempts*0.5))
+                continue
+            except asyncio.CancelledError:
+                await ctx.close()   # out of budget: close cleanly, not the proxy's fault
+                raise
             except Exception:
-                try:
-                    last_html = await page.content()
-                    (OUT / "last.html").write_text(last_html, encoding="utf-8")
-                    await page.screenshot(path=str(OUT / "last.png"), full_page=True)
-                except Exception:
-                    pass
+                if not deadline.expired():
+                    POOL.report(proxy, ok=False)
+                    metrics.attempt("search", proxy, profile_dir, "failed")
                 await ctx.close()
+                deadline.check("search")
                 raise
+            POOL.report(proxy, ok=True, latency_ms=(time.monotonic() - started) * 1000)
+            metrics.attempt("search", proxy, profile_dir, "ok")
+            await ctx.close()
+            return payload
 
     if last_html:
-        (OUT / "akamai_last.html").write_text(last_html, encoding="utf-8")
+        blobstore.default().put(last_html, key=blobstore.search_key(params), kind="akamai_last.html")
     raise RuntimeError("Blocked or failed after multiple attempts. Use a sticky US residential proxy and retry.")
+
+
+# ---------------- streaming ----------------
+Batch = Tuple[str, List[Dict[str, Any]]]   # ("network" | "dom", parsed flight dicts)
+
+async def _wait_more_results(page: Page, before: int):
+    """After "show more" / next page: wait until the number of result cards changes."""
+    try:
+        await page.wait_for_function("([sel, n]) => document.querySelectorAll(sel).length !== n",
+                                     arg=[parse_selectors.get("aa.com").css("result_card"), before], timeout=clamp(15000))
+    except PWTimeout:
+        pass
+
+async def _load_more(page: Page) -> bool:
+    """Click whichever "show more" / next-page control is there; False when there is none."""
+    async def click(sel: str):
+        loc = page.locator(sel).first
+        if not await loc.is_visible():
+            return False
+        await loc.click(timeout=clamp(3000))
+    sels = parse_selectors.get("aa.com").page["load_more"]
+    return await STRATEGIES.run("load_more", [(s, lambda s=s: click(s)) for s in sels]) is not None
+
+async def _forward(page: Page, arrivals: asyncio.Queue, out: asyncio.Queue, fresh: Callable, settled) -> int:
+    """
+    Hand each captured response's flights to the consumer as it arrives,
+    until `settled` (the results DOM is in) finishes. Returns flights sent.
+    """
+    sent = 0
+    done_waiting = asyncio.create_task(settled)
+    try:
+        while True:
+            nxt = asyncio.create_task(arrivals.get())
+            done, _ = await asyncio.wait({nxt, done_waiting}, return_when=asyncio.FIRST_COMPLETED)
+            if nxt not in done:
+                nxt.cancel()
+                break
+            flights = fresh(parse_from_network([nxt.result()]))
+            if flights:
+                await out.put(("network", flights))
+                sent += len(flights)
+        while not arrivals.empty():
+            flights = fresh(parse_from_network([arrivals.get_nowait()]))
+            if flights:
+                await out.put(("network", flights))
+                sent += len(flights)
+    finally:
+        done_waiting.cancel()
+    return sent
+
+async def _stream_attempt(ctx, params: Dict[str, Any], out: asyncio.Queue, max_pages: int):
+    """
+    One streamed search in a new page of `ctx`. Each results page's flights
+    go to `out` as network batches arrive, then as one DOM chunk (only
+    flights not sent yet); the next page is loaded only after the consumer
+    has taken everything queued (out.join()).
+    """
+    state = storage_state.load()
+    if state:
+        await storage_state.apply(ctx, state)
+    page = await ctx.new_page()
+    page.set_default_timeout(clamp(30000))
+    page.set_default_navigation_timeout(clamp(30000))
+    memprof.stage("page_open")
+
+    captured: List[Dict[str, Any]] = []
+    arrivals: asyncio.Queue = asyncio.Queue()
+    page.on("response", lambda r: asyncio.create_task(_capture_json(r, captured, arrivals=arrivals)))
+    seen = set()
+
+    def fresh(flights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        new = [f for f in flights if (f["flight_number"], f["departure_time"]) not in seen]
+        seen.update((f["flight_number"], f["departure_time"]) for f in new)
+        return new
+
+    html = ""
+    try:
+        await _submit_search(page, params, state)
+        settled = _wait_results_dom(page)
+        for n in range(1, max_pages + 1):
+            sent = await _forward(page, arrivals, out, fresh, settled)
+            html = await page.content()
+            dom = fresh(await parse_pool.parse_dom(html))
+            if dom:
+                await out.put(("dom", dom))
+            memprof.stage(f"results_page#{n}")
+            if not (sent or dom) or n == max_pages:
+                break
+            await out.join()   # consumer stopped asking: we are cancelled here instead of loading more
+            cards = await page.locator(parse_selectors.get("aa.com").css("result_card")).count()
+            if not await _load_more(page):
+                break
+            settled = _wait_more_results(page, cards)
+        await storage_state.save(ctx)
+    finally:
+        # keep what was loaded, also when the consumer stopped early
+        try:
+            key, store = blobstore.search_key(params), blobstore.default()
+            if captured:
+                await asyncio.to_thread(store.put_json, list(captured), url=page.url, key=key, kind="network.json")
+            if html:
+                await asyncio.to_thread(store.put, html, url=page.url, key=key, kind="results.html")
+        except (Exception, asyncio.CancelledError):
+            pass
+        try: await page.close()
+        except (Exception, asyncio.CancelledError): pass
+
+async def _stream_with_profile(params: Dict[str, Any], profile_dir: str, out: asyncio.Queue, max_pages: int):
+    # a deny page comes before any flight is sent, so those attempts can be retried
+    attempts, max_attempts = 0, 4
+    while True:
+        deadline.check("stream")
+        attempts += 1
+        if attempts > 1:
+            metrics.RETRIES.inc(flow="stream")
+        proxy = proxy_from_env(profile_dir)
+        started = time.monotonic()
+        async with async_playwright() as p:
+            ctx = await launch_context(p, profile_dir, proxy)
+            memprof.stage(f"launched#{attempts}")
+            try:
+                await _stream_attempt(ctx, params, out, max_pages)
+            except AkamaiBlocked:
+                POOL.report(proxy, ok=False, blocked=True)
+                metrics.attempt("stream", proxy, profile_dir, "blocked")
+                if attempts >= max_attempts:
+                    raise RuntimeError("Blocked after multiple attempts. Use a sticky US residential proxy and retry.")
+                await asyncio.sleep(clamp_s(0.9 + attempts*0.5))
+                continue
+            except asyncio.CancelledError:
+                raise   # consumer stopped or out of budget: not the proxy's fault
+            except Exception:
+                if not deadline.expired():
+                    POOL.report(proxy, ok=False)
+                    metrics.attempt("stream", proxy, profile_dir, "failed")
+                deadline.check("stream")
+                raise
+            finally:
+                try: await ctx.close()
+                except (Exception, asyncio.CancelledError): pass
+            POOL.report(proxy, ok=True, latency_ms=(time.monotonic() - started) * 1000)
+            metrics.attempt("stream", proxy, profile_dir, "ok")
+            return
+
+async def _stream_worker(params: Dict[str, Any], profile_dir: Optional[str], deadline_s: Optional[float],
+                         out: asyncio.Queue, max_pages: int):
+    # runs as its own task, so its deadline/metrics context never leaks into the consumer's
+    try:
+        with memprof.session(f"stream {params['origin']}->{params['destination']} {params['date']}"), \
+                metrics.search("stream"), deadline.scope(deadline_s):
+            if profile_dir:
+                await deadline.enforce(_stream_with_profile(params, profile_dir, out, max_pages), "stream")
+            else:
+                async with profile_slot() as profile_dir:
+                    await deadline.enforce(_stream_with_profile(params, profile_dir, out, max_pages), "stream")
+    except Exception as e:
+        out.put_nowait(e)
+    else:
+        out.put_nowait(None)
+
+async def stream_results(params: Dict[str, Any], profile_dir: Optional[str] = None, deadline_s: Optional[float] = None,
+                         max_pages: int = STREAM_MAX_PAGES) -> AsyncIterator[Batch]:
+    """
+    Async generator of ("network" | "dom", flights) batches for one search,
+    each yielded as soon as it is parsed. The browser runs in a task of
+    its own; leaving the loop (or closing the generator) cancels it, which
+    closes the page and context and stops further page loads.
+    """
+    parse_pool.enable()   # later pages are parsed while the consumer works on earlier ones
+    out: asyncio.Queue = asyncio.Queue()
+    worker = asyncio.create_task(_stream_worker(params, profile_dir, deadline_s, out, max_pages))
+    try:
+        while True:
+            item = await out.get()
+            try:
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+            finally:
+                out.task_done()
+    finally:
+        if not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except (Exception, asyncio.CancelledError):
+                pass
@@ -1,9 +1,13 @@
 # src/playwright_utils.py
-import os, re, asyncio, random
+import re, asyncio, random
 from datetime import datetime
 from typing import Optional
 from playwright.async_api import TimeoutError as PWTimeout, Page
 
+from .proxy_pool import proxy_from_env  # re-exported for older callers
+from .strategies import STRATEGIES
+from .deadline import clamp
+
 BUSY_SEL   = ".aa-busy-module, .aa-busy-bg, .aa-busy-text"
 BLOCK_SIGS = ("akamai-challenge-resubmit=true", "access denied", "edgesuite")
 CALENDAR_DIALOG = "div[role='dialog'], [role='dialog']"
@@ -27,13 +31,13 @@ async def warm_up(page):
 async def accept_banners(page):
     for label in ["Accept", "I Agree", "Agree", "Got it", "OK"]:
         try:
-            await page.get_by_role("button", name=re.compile(label, re.I)).click(timeout=1200)
+            await page.get_by_role("button", name=re.compile(label, re.I)).click(timeout=clamp(1200))
             break
         except PWTimeout:
             pass
 
 async def wait_busy_clear(page, timeout_ms=8000):
-    deadline = page.context._loop.time() + (timeout_ms / 1000)
+    deadline = page.context._loop.time() + (clamp(timeout_ms) / 1000)
     overlay = page.locator(BUSY_SEL)
     while page.context._loop.time() < deadline:
         try:
@@ -53,30 +57,6 @@ async def blocked(page):
     except Exception:
         return False
 
-def proxy_from_env(index=0):
-    """
-    Optionally rotate proxies if the user provides a list.
-    Example:
-      export PROXIES="us1:port,us2:port,us3:port"
-    """
-    proxies = os.getenv("PROXIES")
-    if proxies:
-        lst = [p.strip() for p in proxies.split(",") if p.strip()]
-        if lst:
-            p = lst[index % len(lst)]
-            return {"server": p}
-
-    # fallback to single proxy envs
-    p = (
-        os.getenv("HTTP_PROXY")
-        or os.getenv("HTTPS_PROXY")
-        or os.getenv("PROXY")
-        or os.getenv("http_proxy")
-        or os.getenv("https_proxy")
-        or os.getenv("proxy")
-    )
-    return {"server": p} if p else None
-
 # ---------- trip mode ----------
 async def ensure_one_way(page):
     """
@@ -88,39 +68,36 @@ async def ensure_one_way(page):
 
     # Make sure the Flights tab is active (some variants default to Hotels/Vacations)
     try:
-        await page.get_by_role("tab", name=re.compile(r"\b(Flights|Book)\b", re.I)).first.click(timeout=1200)
+        await page.get_by_role("tab", name=re.compile(r"\b(Flights|Book)\b", re.I)).first.click(timeout=clamp(1200))
     except Exception:
         pass
 
-    # Candidate controls that can represent "One way"
-    candidates = [
-        page.get_by_role("radio",  name=re.compile(r"\b(one[\s\-]?way)\b", re.I)).first,
-        page.get_by_role("button", name=re.compile(r"\b(one[\s\-]?way)\b", re.I)).first,
-        page.get_by_label(re.compile(r"\b(one[\s\-]?way)\b", re.I)).first,
-        page.get_by_text(re.compile(r"\b(one[\s\-]?way)\b", re.I)).first,
-        page.locator("input[type='radio'][value*='one']").first,
-        page.locator("input[type='radio'][id*='one']").first,
-        page.locator("input[type='radio'][name*='one']").first,
-        page.locator("[data-trip*='one']").first,
-    ]
-
-    clicked = False
-    for loc in candidates:
-        try:
-            # prefer .check() for inputs, fallback to .click()
-            tag = (await loc.evaluate("el => el.tagName.toLowerCase()")).strip().lower()
-            if tag == "input":
-                typ = await loc.evaluate("el => el.type")
-                if typ and typ.lower() == "radio":
-                    await loc.check(timeout=1200)
-                else:
-                    await loc.click(timeout=1200)
+    # Candidate controls that can represent "One way" (tried in learned order)
+    one_way = re.compile(r"\b(one[\s\-]?way)\b", re.I)
+    candidates = {
+        "role=radio":   page.get_by_role("radio",  name=one_way).first,
+        "role=button":  page.get_by_role("button", name=one_way).first,
+        "label":        page.get_by_label(one_way).first,
+        "text":         page.get_by_text(one_way).first,
+        "radio[value]": page.locator("input[type='radio'][value*='one']").first,
+        "radio[id]":    page.locator("input[type='radio'][id*='one']").first,
+        "radio[name]":  page.locator("input[type='radio'][name*='one']").first,
+        "[data-trip]":  page.locator("[data-trip*='one']").first,
+    }
+
+    async def pick(loc):
+        # prefer .check() for inputs, fallback to .click()
+        tag = (await loc.evaluate("el => el.tagName.toLowerCase()", timeout=clamp(1200))).strip().lower()
+        if tag == "input":
+            typ = await loc.evaluate("el => el.type")
+            if typ and typ.lower() == "radio":
+                await loc.check(timeout=clamp(1200))
             else:
-                await loc.click(timeout=1200)
-            clicked = True
-            break
-        except Exception:
-            continue
+                await loc.click(timeout=clamp(1200))
+        else:
+            await loc.click(timeout=clamp(1200))
+
+    clicked = await STRATEGIES.run("one_way", [(n, lambda loc=loc: pick(loc)) for n, loc in candidates.items()])
 
     await human_pause(120, 250)
     await wait_busy_clear(page)
@@ -174,23 +151,20 @@ def _iso_to_mmddyyyy(date_iso):
 
 async def _open_depart_calendar(page):
     await wait_busy_clear(page)
-    for sel in [
-        "button[aria-label*='Depart']",
-        "button:has-text('Depart')",
-        "input[name='departDate']",
-        "input[id*='depart']",
-        "[aria-controls*='depart']",
-    ]:
-        try:
-            await page.locator(sel).first.click(timeout=1500)
-            break
-        except PWTimeout:
-            continue
-    else:
-        await page.get_by_text("Depart", exact=False).first.click(timeout=1800)
+    candidates = [
+        (sel, lambda sel=sel: page.locator(sel).first.click(timeout=clamp(1500))) for sel in [
+            "button[aria-label*='Depart']",
+            "button:has-text('Depart')",
+            "input[name='departDate']",
+            "input[id*='depart']",
+            "[aria-controls*='depart']",
+        ]
+    ] + [("text=Depart", lambda: page.get_by_text("Depart", exact=False).first.click(timeout=clamp(1800)))]
+    if not await STRATEGIES.run("depart_calendar", candidates):
+        raise PWTimeout("No depart date control could be clicked")
 
     try:
-        await page.locator(CALENDAR_DIALOG).first.wait_for(state="visible", timeout=3000)
+        await page.locator(CALENDAR_DIALOG).first.wait_for(state="visible", timeout=clamp(3000))
     except PWTimeout:
         pass
     await human_pause(200, 500)
@@ -207,34 +181,37 @@ async def _calendar_next(page):
         page.locator("[aria-label*='Next month']").first,
     ]:
         try:
-            await loc.click(timeout=1200)
+            await loc.click(timeout=clamp(1200))
             return
         except PWTimeout:
             continue
     await page.keyboard.press("Tab")
 
+# keyed by the template so the stats carry over from one date to the next
+CALENDAR_CELLS = {
+    "button[aria-label='{month} {day}, {year}']": "button[aria-label='{month} {day}, {year}']",
+    "button[aria-label='{month} {day:02d}, {year}']": "button[aria-label='{month} {day:02d}, {year}']",
+    "td[data-date]": "td[data-date='{iso}']",
+    "[data-date]": "[data-date='{iso}']",
+    "gridcell text": "[role='gridcell'] >> text=^{day}$",
+    "button:has-text": "button:has-text('^{day}$')",
+    "[aria-label*=month day year]": "[aria-label*='{month}'][aria-label*=' {day}'][aria-label*='{year}']",
+}
+
 async def _try_click_calendar_cell(scope, month_name, year, day, date_iso):
-    candidates = [
-        f"button[aria-label='{month_name} {day}, {year}']",
-        f"button[aria-label='{month_name} {day:02d}, {year}']",
-        f"td[data-date='{date_iso}']",
-        f"[data-date='{date_iso}']",
-        f"[role='gridcell'] >> text=^{day}$",
-        f"button:has-text('^{day}$')",
-        f"[aria-label*='{month_name}'][aria-label*=' {day}'][aria-label*='{year}']",
-    ]
-    for sel in candidates:
+    async def click(sel):
         loc = scope.locator(sel).first
         try:
-            await loc.scroll_into_view_if_needed(timeout=500)
+            await loc.scroll_into_view_if_needed(timeout=clamp(500))
         except Exception:
             pass
-        try:
-            await loc.click(timeout=1800)
-            return True
-        except PWTimeout:
-            continue
-    return False
+        await loc.click(timeout=clamp(1800))
+
+    candidates = [
+        (name, lambda sel=tpl.format(month=month_name, day=day, year=year, iso=date_iso): click(sel))
+        for name, tpl in CALENDAR_CELLS.items()
+    ]
+    return bool(await STRATEGIES.run("calendar_cell", candidates))
 
 def _depart_input_selectors():
     return [
@@ -250,13 +227,13 @@ async def _type_depart_mmddyyyy(page, date_iso):
     for sel in _depart_input_selectors():
         loc = page.locator(sel).first
         try:
-            await loc.click(timeout=1200)
+            await loc.click(timeout=clamp(1200))
         except PWTimeout:
             continue
         try:
             # clear
             try:
-                await loc.fill("", timeout=800)
+                await loc.fill("", timeout=clamp(800))
             except Exception:
                 await loc.click()
                 await page.keyboard.press("Control+A")
@@ -269,7 +246,7 @@ async def _type_depart_mmddyyyy(page, date_iso):
 
             # verify
             try:
-                val = await loc.input_value(timeout=800)
+                val = await loc.input_value(timeout=clamp(800))
                 if val and (mmdd in val or val.strip() == mmdd):
                     return True
             except Exception:
@@ -279,7 +256,7 @@ async def _type_depart_mmddyyyy(page, date_iso):
             await human_pause(200, 400)
             await wait_busy_clear(page)
             try:
-                val = await loc.input_value(timeout=800)
+                val = await loc.input_value(timeout=clamp(800))
                 if val and (mmdd in val or val.strip() == mmdd):
                     return True
             except Exception:
@@ -374,7 +351,7 @@ async def wait_akamai_clear(page, timeout_ms=15000):
     """Waits until we're not on the akamai resubmit URL anymore."""
     if "akamai-challenge-resubmit=true" not in page.url:
         return
-    target_deadline = page.context._loop.time() + (timeout_ms / 1000)
+    target_deadline = page.context._loop.time() + (clamp(timeout_ms) / 1000)
     # Wait for the bounce to finish (URL changes away from resubmit)
     while "akamai-challenge-resubmit=true" in page.url:
         await page.wait_for_load_state("domcontentloaded")
@@ -398,7 +375,7 @@ async def force_one_way(page):
 
     # 1) Label click first (bypasses most overlay-z-index weirdness)
     try:
-        await page.locator("label[for='flightSearchForm.tripType.oneWay']").click(timeout=1200, force=True)
+        await page.locator("label[for='flightSearchForm.tripType.oneWay']").click(timeout=clamp(1200), force=True)
     except Exception:
         pass
 
@@ -423,7 +400,7 @@ async def force_one_way(page):
     radio = page.locator(f"#{one_id}")
     try:
         if not await radio.is_checked():
-            await radio.check(timeout=1200, force=True)
+            await radio.check(timeout=clamp(1200), force=True)
     except Exception:
         pass
 
@@ -0,0 +1,288 @@
+# src/profile_pool.py
+import os, json, time, shutil, asyncio, pathlib, contextlib
+from typing import Iterator, AsyncIterator, List, Optional
+
+from . import deadline
+
+GOLDEN_DIR = pathlib.Path(os.getenv("AA_PROFILE_DIR", ".pw-user"))
+POOL_DIR = pathlib.Path(os.getenv("AA_PROFILE_POOL_DIR", ".pw-pool"))
+POOL_SIZE = int(os.getenv("AA_PROFILE_POOL_SIZE", str(os.cpu_count() or 4)))
+REFRESH_USES = int(os.getenv("AA_PROFILE_REFRESH_USES", "50"))        # re-clone after N searches
+REFRESH_AGE_S = float(os.getenv("AA_PROFILE_REFRESH_AGE", str(6 * 3600)))
+USE_POOL = os.getenv("AA_PROFILE_POOL", "0").lower() in ("1", "true", "yes")
+CHECKOUT_TIMEOUT_S = 600.0   # longest wait for a free slot; cut to the search deadline when one is set
+
+# Chrome's own locks plus caches that are large and rebuilt on demand
+CLONE_IGNORE = shutil.ignore_patterns(
+    "Singleton*", "LOCK", "lockfile", "Crashpad", "CrashpadMetrics*",
+    "Cache", "Code Cache", "GPUCache", "*ShaderCache", "*Dawn*Cache", "component_crx_cache",
+    "extensions_crx_cache", "optimization_guide_model_store",
+)
+
+
+LOCK_GRACE_S = 10.0   # a lock file this young is held even if its pid cannot be read yet
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows; ask the kernel instead
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)   # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5   # access denied: exists, owned by someone else
+        try:
+            code = ctypes.c_ulong()
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == 259   # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def _lock_pid(path: pathlib.Path) -> int:
+    try:
+        return int(path.read_text().strip() or 0)
+    except Exception:
+        return 0
+
+def _lock_held(path: pathlib.Path) -> bool:
+    """Held unless it names a dead pid; empty or just-written files count as held."""
+    try:
+        age = time.time() - path.stat().st_mtime
+    except OSError:
+        return False
+    pid = _lock_pid(path)
+    if not pid:
+        return age < LOCK_GRACE_S
+    return age < LOCK_GRACE_S or _pid_alive(pid)
+
+
+def _place(tmp: pathlib.Path, lock: pathlib.Path) -> bool:
+    """Atomically create `lock` with tmp's content; False if it exists."""
+    try:
+        os.link(tmp, lock)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        # no hard links on this filesystem: exclusive create (the grace period covers the empty moment)
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(tmp.read_text())
+        return True
+
+
+"""
+Pool of cloned Chrome profiles so several persistent contexts can run
+on one host. Each slot is a copy of the seeded golden profile
+(`.pw-user`), locked by a pid file while checked out, and re-cloned
+after REFRESH_USES searches, REFRESH_AGE_S seconds, or whenever the
+golden profile is newer than the clone.
+"""
+class ProfilePool:
+    def __init__(self, golden: pathlib.Path = GOLDEN_DIR, root: pathlib.Path = POOL_DIR, size: int = POOL_SIZE):
+        self.golden = pathlib.Path(golden)
+        self.root = pathlib.Path(root)
+        self.size = max(int(size), 1)
+
+    # ---------- slot bookkeeping ----------
+    def _slot(self, i: int) -> pathlib.Path:
+        return self.root / f"slot-{i:02d}"
+
+    def _lock_path(self, i: int) -> pathlib.Path:
+        return self.root / f"slot-{i:02d}.lock"
+
+    def _meta(self, i: int) -> dict:
+        try:
+            return json.loads((self._slot(i) / "pool.json").read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+
+    def _write_meta(self, i: int, meta: dict):
+        (self._slot(i) / "pool.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    def _try_lock(self, i: int) -> bool:
+        """
+        The pid is written to a private file first and hard-linked into
+        place, so a lock is never seen without its pid. A dead holder's
+        lock is renamed aside before retrying: only one stealer can win
+        that rename, and a fresh lock moved by mistake is put back.
+        """
+        lock = self._lock_path(i)
+        tmp = lock.with_name(f".{lock.name}.{os.getpid()}.tmp")
+        tmp.write_text(str(os.getpid()))
+        try:
+            for _ in range(2):
+                if _place(tmp, lock):
+                    return True
+                if _lock_held(lock):
+                    return False
+                # holder died without releasing: steal the slot
+                stale_pid = _lock_pid(lock)
+                grave = lock.with_name(f".{lock.name}.{os.getpid()}.stale")
+                try:
+                    os.replace(lock, grave)
+                except OSError:
+                    return False   # another starter moved it first
+                if _lock_pid(grave) != stale_pid or _lock_held(grave):
+                    try:
+                        os.link(grave, lock)   # it was a fresh lock taken in between: give it back
+                    except OSError:
+                        pass
+                    grave.unlink(missing_ok=True)
+                    return False
+                grave.unlink(missing_ok=True)
+            return False
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _unlock(self, i: int):
+        self._lock_path(i).unlink(missing_ok=True)
+
+    # ---------- cloning ----------
+    def _needs_refresh(self, i: int) -> bool:
+        meta = self._meta(i)
+        if not meta or not (self._slot(i) / "profile").is_dir():
+            return True
+        if meta.get("uses", 0) >= REFRESH_USES:
+            return True
+        if time.time() - meta.get("created", 0) > REFRESH_AGE_S:
+            return True
+        return self._golden_mtime() > meta.get("golden_mtime", 0)
+
+    def _golden_mtime(self) -> float:
+        try:
+            return (self.golden / "Default" / "Preferences").stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _clone(self, i: int):
+        slot = self._slot(i)
+        tmp = self.root / f".slot-{i:02d}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        if self.golden.is_dir():
+            shutil.copytree(self.golden, tmp / "profile", ignore=CLONE_IGNORE, symlinks=True)
+        else:
+            (tmp / "profile").mkdir(parents=True)
+        shutil.rmtree(slot, ignore_errors=True)
+        os.replace(tmp, slot)
+        self._write_meta(i, {"created": time.time(), "uses": 0, "golden_mtime": self._golden_mtime()})
+        print(f"🧬 Cloned profile into {slot}")
+
+    # ---------- public API ----------
+    @contextlib.contextmanager
+    def checkout(self, timeout_s: float = CHECKOUT_TIMEOUT_S) -> Iterator[str]:
+        """Lock a free slot, refresh it if due, and yield its profile directory."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        give_up = time.monotonic() + timeout_s
+        i = None
+        while i is None:
+            i = next((n for n in range(self.size) if self._try_lock(n)), None)
+            if i is None:
+                if time.monotonic() > give_up:
+                    raise RuntimeError(f"No free profile slot in {self.root} after {timeout_s:.0f}s")
+                time.sleep(0.5)
+        try:
+            if self._needs_refresh(i):
+                self._clone(i)
+            meta = self._meta(i)
+            meta["uses"] = meta.get("uses", 0) + 1
+            meta["last_used"] = time.time()
+            self._write_meta(i, meta)
+            yield str(self._slot(i) / "profile")
+        finally:
+            self._unlock(i)
+
+    @contextlib.asynccontextmanager
+    async def acheckout(self, timeout_s: float = CHECKOUT_TIMEOUT_S) -> AsyncIterator[str]:
+        """Async wrapper: the copy and lock polling run off the event loop."""
+        cm = self.checkout(timeout_s)
+        entering = asyncio.ensure_future(asyncio.to_thread(cm.__enter__))
+        try:
+            profile = await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            # the thread cannot be cancelled: if it still gets a slot, hand it straight back
+            entering.add_done_callback(lambda f: f.cancelled() or f.exception() or cm.__exit__(None, None, None))
+            raise
+        except RuntimeError:
+            deadline.check("profile checkout")   # the search budget ran out before a slot freed up
+            raise
+        try:
+            yield profile
+        finally:
+            await asyncio.to_thread(cm.__exit__, None, None, None)
+
+    def cleanup(self) -> List[str]:
+        """Remove slots beyond `size`, stale locks and half-finished clones."""
+        removed: List[str] = []
+        if not self.root.is_dir():
+            return removed
+        for path in self.root.iterdir():
+            name = path.name
+            if name.startswith(".slot-") and name.endswith(".tmp"):
+                pid = name.rsplit(".", 2)[-2]
+                if not (pid.isdigit() and _pid_alive(int(pid))):
+                    if path.is_dir():
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        path.unlink(missing_ok=True)   # a lock's pid file left by a crash
+                    removed.append(name)
+            elif name.startswith("slot-") and not name.endswith(".lock"):
+                idx = int(name.split("-")[1])
+                if idx >= self.size and self._try_lock(idx):
+                    shutil.rmtree(path, ignore_errors=True); self._unlock(idx); removed.append(name)
+            elif name.endswith(".lock"):
+                if not _lock_held(path):
+                    path.unlink(missing_ok=True); removed.append(name)
+        return removed
+
+    def warm(self) -> int:
+        """Pre-clone every free slot that is due for refresh; returns how many were cloned."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        cloned = 0
+        for i in range(self.size):
+            if not self._try_lock(i):
+                continue
+            try:
+                if self._needs_refresh(i):
+                    self._clone(i); cloned += 1
+            finally:
+                self._unlock(i)
+        return cloned
+
+
+PROFILES = ProfilePool()
+
+"""
+Yields the profile directory for one browser: a pooled clone when
+AA_PROFILE_POOL is on, otherwise the shared golden profile as before.
+"""
+@contextlib.asynccontextmanager
+async def profile_slot(pool: Optional[ProfilePool] = None) -> AsyncIterator[str]:
+    if pool is None and not USE_POOL:
+        yield str(GOLDEN_DIR)
+        return
+    async with (pool or PROFILES).acheckout(deadline.clamp_s(CHECKOUT_TIMEOUT_S)) as profile_dir:
+        yield profile_dir
+
+
+# -------- CLI: python -m src.profile_pool {warm,cleanup} --------
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("action", choices=["warm", "cleanup"])
+    args = ap.parse_args()
+    if args.action == "warm":
+        print(f"✅ Cloned {PROFILES.warm()} profile slot(s) into {PROFILES.root}")
+    else:
+        print(f"✅ Removed: {PROFILES.cleanup() or 'nothing'}")
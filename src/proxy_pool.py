@@ -0,0 +1,239 @@
+# src/proxy_pool.py
+import os, json, time, atexit, random, pathlib, threading
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .utils import file_lock
+
+STATE_PATH = pathlib.Path(os.getenv("AA_PROXY_STATE", "data/state/proxies.json"))
+COOLDOWN_S = float(os.getenv("AA_PROXY_COOLDOWN", "60"))          # first quarantine
+COOLDOWN_MAX_S = float(os.getenv("AA_PROXY_COOLDOWN_MAX", "3600"))  # cap for exponential back-off
+STRIKES_BEFORE_QUARANTINE = 2  # plain failures tolerated in a row; a block quarantines at once
+LATENCY_ALPHA = 0.3            # EWMA weight of the newest latency sample
+REFRESH_S = float(os.getenv("AA_PROXY_REFRESH", "5"))   # re-read other processes' quarantines this often
+FLUSH_S = 2.0                  # outcomes are written to the shared file in batches, off the caller's thread
+
+# single-proxy env vars, in order of precedence
+SINGLE_PROXY_ENVS = ("AA_HTTP_PROXY", "HTTP_PROXY", "HTTPS_PROXY", "PROXY", "http_proxy", "https_proxy", "proxy")
+
+
+"""
+Per-proxy health record. Rates are Laplace-smoothed so a fresh proxy
+starts at a neutral score instead of 0 or 1.
+"""
+@dataclass
+class ProxyStats:
+    server: str
+    successes: int = 0
+    failures: int = 0
+    blocks: int = 0
+    latency_ms: float = 0.0
+    strikes: int = 0                # consecutive bad outcomes
+    quarantines: int = 0            # drives the exponential cool-down
+    quarantined_until: float = 0.0
+
+    @property
+    def attempts(self) -> int:
+        return self.successes + self.failures + self.blocks
+
+    def success_rate(self) -> float:
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def block_rate(self) -> float:
+        return self.blocks / (self.attempts + 2)
+
+    def quarantined(self, now: Optional[float] = None) -> bool:
+        return self.quarantined_until > (now if now is not None else time.time())
+
+    def score(self) -> float:
+        # 1s of average latency halves the weight of an otherwise equal proxy
+        latency_factor = 1.0 / (1.0 + self.latency_ms / 1000.0)
+        return max(self.success_rate() * (1.0 - self.block_rate()) * latency_factor, 1e-3)
+
+
+"""
+Proxy manager shared by every flow: weighted pick by health score,
+sticky assignment per session/profile, and quarantine with exponential
+cool-down for proxies that fail or get blocked. Stats are persisted so
+a burned proxy stays out of rotation across CLI runs.
+"""
+class ProxyPool:
+    def __init__(self, servers: List[str], state_path: Optional[pathlib.Path] = STATE_PATH):
+        self._lock = threading.Lock()
+        self._state_path = state_path
+        self._sticky: Dict[Hashable, str] = {}
+        self.stats: Dict[str, ProxyStats] = {s: ProxyStats(server=s) for s in servers}
+        self._pending: List[Tuple[str, bool, Optional[float], bool, float]] = []   # outcomes not yet on disk
+        self._flush_timer: Optional[threading.Timer] = None
+        self._loaded_at = 0.0
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> "ProxyPool":
+        """
+        PROXIES="us1:port,us2:port" gives a list; otherwise the first
+        single-proxy env var found is used as a pool of one.
+        """
+        servers = [p.strip() for p in os.getenv("PROXIES", "").split(",") if p.strip()]
+        if not servers:
+            single = next((os.getenv(k) for k in SINGLE_PROXY_ENVS if os.getenv(k)), None)
+            servers = [single] if single else []
+        return cls(servers)
+
+    # ---------- persistence ----------
+    # fleet workers and serve share the file: batched outcomes are merged by a read-modify-write
+    # under an inter-process lock, so one process never erases another's blocks/quarantines
+    def _lock_file(self) -> pathlib.Path:
+        return self._state_path.with_suffix(".lock")
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            saved = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        return {row["server"]: row for row in saved.get("proxies", []) if isinstance(row, dict) and row.get("server")}
+
+    def _load(self):
+        """Take the shared file's stats, then re-apply this process's outcomes it does not hold yet."""
+        if not self._state_path or not self.stats:
+            return
+        self._loaded_at = time.monotonic()
+        rows = self._read()
+        for server in self.stats:
+            try:
+                self.stats[server] = ProxyStats(**rows[server])
+            except Exception:   # not on disk yet: only this process's pending outcomes count
+                self.stats[server] = ProxyStats(server=server)
+        for event in self._pending:
+            self._apply(*event, quiet=True)
+
+    def _save(self):
+        if not self._state_path:
+            return
+        try:
+            rows = self._read()   # keep proxies this process was not configured with
+            rows.update({s.server: asdict(s) for s in self.stats.values()})
+            tmp = self._state_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"proxies": list(rows.values())}, indent=2), encoding="utf-8")
+            os.replace(tmp, self._state_path)
+        except Exception:
+            pass
+
+    def flush(self):
+        """
+        Merge pending outcomes into the shared file under the inter-process
+        lock (timer thread and exit, never the event loop). Waiting for
+        another process's lock does not hold up report()/acquire().
+        """
+        with self._lock:
+            self._flush_timer = None
+            if not self._pending or not self._state_path:
+                return
+        lock = file_lock(self._lock_file())
+        try:
+            lock.__enter__()
+        except Exception:   # unwritable state dir: keep working in memory, as before
+            with self._lock:
+                self._pending.clear()
+            return
+        try:
+            with self._lock:
+                self._load()
+                self._save()
+                self._pending.clear()
+        finally:
+            lock.__exit__(None, None, None)
+
+    def _schedule_flush(self):
+        if self._state_path and self._flush_timer is None:
+            self._flush_timer = threading.Timer(FLUSH_S, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    # ---------- selection ----------
+    def acquire(self, session: Optional[Hashable] = None) -> Optional[Dict[str, str]]:
+        """Return a Playwright proxy dict (or None when no proxies are configured)."""
+        with self._lock:
+            if not self.stats:
+                return None
+            if self._state_path and time.monotonic() - self._loaded_at > REFRESH_S:
+                self._load()   # pick up proxies another worker quarantined
+            now = time.time()
+            if session is not None:
+                server = self._sticky.get(session)
+                if server and not self.stats[server].quarantined(now):
+                    return {"server": server}
+
+            healthy = [s for s in self.stats.values() if not s.quarantined(now)]
+            if healthy:
+                pick = random.choices(healthy, weights=[s.score() for s in healthy], k=1)[0]
+            else:
+                # everything is cooling down: use the one that recovers first
+                pick = min(self.stats.values(), key=lambda s: s.quarantined_until)
+
+            if session is not None:
+                self._sticky[session] = pick.server
+            return {"server": pick.server}
+
+    def release(self, session: Hashable):
+        """Drop a sticky assignment so the next acquire re-picks."""
+        with self._lock:
+            self._sticky.pop(session, None)
+
+    # ---------- feedback ----------
+    def report(self, proxy: Optional[Dict[str, str]], ok: bool, latency_ms: Optional[float] = None, blocked: bool = False):
+        """Record the outcome of one attempt made through `proxy`; the file write is batched."""
+        if not proxy or proxy.get("server") not in self.stats:
+            return
+        event = (proxy["server"], ok, latency_ms, blocked, time.time())
+        with self._lock:
+            self._apply(*event)
+            self._pending.append(event)
+            self._schedule_flush()
+
+    def _apply(self, server: str, ok: bool, latency_ms: Optional[float], blocked: bool, at: float, quiet: bool = False):
+        st = self.stats[server]
+        if latency_ms is not None:
+            st.latency_ms = latency_ms if not st.latency_ms else (
+                LATENCY_ALPHA * latency_ms + (1 - LATENCY_ALPHA) * st.latency_ms
+            )
+        if ok:
+            st.successes += 1
+            st.strikes = 0
+            st.quarantines = max(st.quarantines - 1, 0)
+        else:
+            if blocked: st.blocks += 1
+            else: st.failures += 1
+            st.strikes += 1
+            if blocked or st.strikes >= STRIKES_BEFORE_QUARANTINE:
+                self._quarantine(st, at, quiet)
+
+    def _quarantine(self, st: ProxyStats, at: float, quiet: bool = False):
+        cooldown = min(COOLDOWN_S * (2 ** st.quarantines), COOLDOWN_MAX_S)
+        st.quarantines += 1
+        st.strikes = 0
+        st.quarantined_until = max(st.quarantined_until, at + cooldown)
+        for sess in [k for k, v in self._sticky.items() if v == st.server]:
+            del self._sticky[sess]
+        if not quiet:
+            print(f"🧯 Proxy {st.server} quarantined for {cooldown:.0f}s")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            now = time.time()
+            return [
+                {**asdict(s), "score": round(s.score(), 4), "quarantined": s.quarantined(now)}
+                for s in self.stats.values()
+            ]
+
+
+POOL = ProxyPool.from_env()
+atexit.register(POOL.flush)
+
+"""
+Drop-in replacement for the per-module proxy_from_env helpers.
+`session` keeps the same proxy for a profile/worker until it gets
+quarantined; None picks a fresh proxy each call.
+"""
+def proxy_from_env(session: Optional[Hashable] = None) -> Optional[Dict[str, str]]:
+    return POOL.acquire(session)
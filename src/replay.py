@@ -0,0 +1,134 @@
+# src/replay.py
+import os, json, base64, hashlib, pathlib, contextlib
+from typing import Any, Dict, List, Optional
+
+CASSETTE_ROOT = pathlib.Path(os.getenv("AA_CASSETTE_DIR", "data/cassettes"))
+
+# live | record | replay; set from the CLI via configure() or from the env
+_MODE = os.getenv("AA_NET_MODE", "live").lower()
+_NAME = os.getenv("AA_CASSETTE", "default")
+
+
+def configure(mode: str, name: Optional[str] = None):
+    global _MODE, _NAME
+    if mode not in ("live", "record", "replay"):
+        raise ValueError(f"unknown network mode: {mode}")
+    _MODE = mode
+    if name:
+        _NAME = name
+    _api_cache.clear()
+
+def mode() -> str:
+    return _MODE
+
+def active() -> bool:
+    return _MODE in ("record", "replay")
+
+def session_dir() -> pathlib.Path:
+    return CASSETTE_ROOT / _NAME
+
+
+# -------- browser traffic: Playwright HAR --------
+"""
+Record every page request of the context into browser.har, or serve
+them back from it with unknown requests aborted (fully offline).
+The HAR is written when the context closes.
+"""
+async def attach(ctx):
+    if not active():
+        return
+    har = session_dir() / "browser.har"
+    if _MODE == "record":
+        har.parent.mkdir(parents=True, exist_ok=True)
+        await ctx.route_from_har(str(har), update=True, update_content="embed", update_mode="full")
+    else:
+        if not har.exists():
+            raise RuntimeError(f"No HAR to replay at {har}; record it first with --record {_NAME}")
+        await ctx.route_from_har(str(har), not_found="abort")
+
+
+# -------- ctx.request calls (not covered by HAR routing) --------
+_api_cache: Dict[str, Any] = {}
+
+def _api_path() -> pathlib.Path:
+    return session_dir() / "api.json"
+
+def _api_key(method: str, url: str, data: Optional[str]) -> str:
+    body = hashlib.sha256((data or "").encode("utf-8")).hexdigest()[:16]
+    return f"{method.upper()} {url} {body}"
+
+def _api_entries() -> Dict[str, List[Dict[str, Any]]]:
+    if "entries" not in _api_cache:
+        try:
+            _api_cache["entries"] = json.loads(_api_path().read_text(encoding="utf-8"))
+        except Exception:
+            _api_cache["entries"] = {}
+        _api_cache["cursor"] = {}
+    return _api_cache["entries"]
+
+
+"""
+Stand-in for Playwright's APIResponse built from a cassette entry
+"""
+class ReplayResponse:
+    def __init__(self, entry: Dict[str, Any]):
+        self.url = entry["url"]
+        self.status = entry["status"]
+        self.headers = entry.get("headers", {})
+        self._body = base64.b64decode(entry.get("body_b64", ""))
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    async def body(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode("utf-8", "replace")
+
+    async def json(self) -> Any:
+        return json.loads(self._body)
+
+
+async def api_post(ctx, url: str, headers: Optional[Dict[str, str]] = None, data: Optional[str] = None):
+    """ctx.request.post with record/replay; identical calls replay in recorded order."""
+    key = _api_key("POST", url, data)
+    if _MODE == "replay":
+        entries = _api_entries().get(key)
+        if not entries:
+            raise RuntimeError(f"Request not in cassette {_NAME}: POST {url}")
+        cursor = _api_cache["cursor"]
+        i = cursor.get(key, 0)
+        cursor[key] = i + 1
+        return ReplayResponse(entries[i % len(entries)])
+
+    r = await ctx.request.post(url, headers=headers, data=data)
+    if _MODE == "record":
+        body = await r.body()
+        _api_entries().setdefault(key, []).append({
+            "url": url, "status": r.status, "headers": dict(r.headers),
+            "body_b64": base64.b64encode(body).decode("ascii"),
+        })
+        path = _api_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(_api_entries(), indent=1), encoding="utf-8")
+    return r
+
+
+# -------- httpx (fetch.py): vcrpy cassettes --------
+"""
+Context manager around httpx calls: records to / replays from
+httpx.yaml in the session directory; a no-op in live mode.
+"""
+def httpx_cassette():
+    if not active():
+        return contextlib.nullcontext()
+    import vcr
+    recorder = vcr.VCR(
+        cassette_library_dir=str(session_dir()),
+        record_mode="all" if _MODE == "record" else "none",
+        match_on=["method", "uri", "body"],
+        decode_compressed_response=True,
+    )
+    return recorder.use_cassette("httpx.yaml", allow_playback_repeats=True)
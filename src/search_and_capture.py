@@ -1,6 +1,9 @@
 import asyncio, re
 from playwright.async_api import Locator, Page, TimeoutError as PWTimeout
 
+from .strategies import STRATEGIES
+from .deadline import clamp, clamp_s
+
 async def fill_airport(page: Page, input_locator: Locator, code: str, city_hint: str | None = None):
     """Type an airport code, then select it from AA's autocomplete robustly."""
     await input_locator.click()
@@ -18,37 +21,27 @@ async def fill_airport(page: Page, input_locator: Locator, code: str, city_hint:
 
     # give the suggestions up to ~3s to appear
     try:
-        await asyncio.wait_for(asyncio.shield(dropdown.wait_for(state="visible", timeout=1500)), timeout=2.0)
+        await asyncio.wait_for(asyncio.shield(dropdown.wait_for(state="visible", timeout=clamp(1500))), timeout=clamp_s(2.0))
     except Exception:
         try:
-            await listbox.wait_for(state="visible", timeout=1500)
+            await listbox.wait_for(state="visible", timeout=clamp(1500))
         except Exception:
             pass  # we'll try keyboard fallback
 
     # Try multiple ways to click a matching entry
     patterns = []
     if city_hint:
-        patterns.append(re.compile(rf"\b{re.escape(code)}\b.*{re.escape(city_hint)}", re.I))
-        patterns.append(re.compile(rf"{re.escape(city_hint)}.*\b{re.escape(code)}\b", re.I))
-    patterns.append(re.compile(rf"\b{re.escape(code)}\b", re.I))
-
-    # 1) role=option variant
-    for pat in patterns:
-        opt = page.get_by_role("option", name=pat).first
-        try:
-            await opt.click(timeout=800)
-            return
-        except PWTimeout:
-            pass
-
-    # 2) classic jQuery UI autocomplete list
-    for pat in patterns:
-        li = dropdown.locator("li a", has_text=pat).first
-        try:
-            await li.click(timeout=800)
-            return
-        except PWTimeout:
-            pass
+        patterns.append(("code+city", re.compile(rf"\b{re.escape(code)}\b.*{re.escape(city_hint)}", re.I)))
+        patterns.append(("city+code", re.compile(rf"{re.escape(city_hint)}.*\b{re.escape(code)}\b", re.I)))
+    patterns.append(("code", re.compile(rf"\b{re.escape(code)}\b", re.I)))
+
+    # 1) role=option variant, 2) classic jQuery UI autocomplete list -- in learned order
+    candidates = [(f"role=option {kind}", lambda pat=pat: page.get_by_role("option", name=pat).first.click(timeout=clamp(800)))
+                  for kind, pat in patterns]
+    candidates += [(f"ui-autocomplete {kind}", lambda pat=pat: dropdown.locator("li a", has_text=pat).first.click(timeout=clamp(800)))
+                   for kind, pat in patterns]
+    if await STRATEGIES.run("airport_option_capture", candidates):
+        return
 
     # 3) Fallback: press ArrowDown then Enter to accept top suggestion
     for _ in range(2):
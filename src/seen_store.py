@@ -0,0 +1,234 @@
+# src/seen_store.py
+import os, math, time, struct, sqlite3, hashlib, pathlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+CAPACITY = int(os.getenv("AA_SEEN_CAPACITY", "10000000"))   # URLs the Bloom filter is sized for
+FP_RATE = float(os.getenv("AA_SEEN_FP_RATE", "0.01"))        # Bloom false-positive rate at CAPACITY
+BATCH = 10_000        # writes buffered before one SQLite transaction
+FLUSH_S = 2.0         # ...or this old, so a killed crawl loses seconds of frontier, not all of it
+RECENT = 50_000       # recently confirmed duplicates answered without touching disk
+
+_MASK = (1 << 64) - 1
+_HEADER = struct.Struct("<8sQQQ")   # magic, bits, hashes, capacity
+_MAGIC = b"AASEEN01"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (h INTEGER PRIMARY KEY);       -- 64-bit URL hash, rowid table
+CREATE TABLE IF NOT EXISTS pending (url TEXT PRIMARY KEY, depth INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+"""
+
+
+def url_key(url: str) -> int:
+    """Signed 64-bit hash stored in SQLite; collisions are ~3e-6 likely at 10M URLs."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def _mix(x: int) -> int:
+    # splitmix64 finalizer: second, independent hash for double hashing
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK
+    return x ^ (x >> 31)
+
+
+"""
+Plain Bloom filter over url_key() values. Positions are derived from the
+64-bit key alone, so the filter can be rebuilt from the SQLite index.
+"""
+class BloomFilter:
+    def __init__(self, capacity: int = CAPACITY, fp_rate: float = FP_RATE):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.bits = max(64, int(math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: int):
+        h1 = key & _MASK
+        h2 = _mix(h1) | 1
+        m = self.bits
+        return [(h1 + i * h2) % m for i in range(self.hashes)]
+
+    def add(self, key: int) -> bool:
+        """Sets the key's bits; True if at least one was unset (key definitely new)."""
+        arr, new = self.array, False
+        for p in self._positions(key):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not arr[byte] & bit:
+                arr[byte] |= bit
+                new = True
+        return new
+
+    def __contains__(self, key: int) -> bool:
+        arr = self.array
+        return all(arr[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def save(self, path: pathlib.Path):
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, self.capacity))
+            f.write(self.array)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: pathlib.Path, capacity: int, fp_rate: float) -> Optional["BloomFilter"]:
+        """The saved filter if it matches the requested sizing, else None."""
+        bf = cls(capacity, fp_rate)
+        try:
+            with path.open("rb") as f:
+                magic, bits, hashes, cap = _HEADER.unpack(f.read(_HEADER.size))
+                if (magic, bits, hashes, cap) != (_MAGIC, bf.bits, bf.hashes, bf.capacity):
+                    return None
+                data = f.read()
+        except Exception:
+            return None
+        if len(data) != len(bf.array):
+            return None
+        bf.array = bytearray(data)
+        return bf
+
+
+"""
+Memory-bounded seen-URL set for the crawler: a Bloom filter answers "new"
+without I/O, and only Bloom hits fall through to the exact SQLite index.
+Writes are buffered and committed every BATCH URLs or FLUSH_S seconds,
+together with the pending frontier and staged meta, so a restarted crawl
+picks up where the last flush left off.
+The filter is saved on close and rebuilt from SQLite after a crash.
+"""
+class SeenStore:
+    def __init__(self, path: pathlib.Path, capacity: int = CAPACITY, fp_rate: float = FP_RATE, batch: int = BATCH,
+                 flush_s: float = FLUSH_S):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.bloom_path = self.path.with_suffix(".bloom")
+        self.batch = batch
+        self.flush_s = flush_s
+        self._flushed = time.monotonic()
+        self.db = sqlite3.connect(str(self.path), isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+        self._new: Dict[int, None] = {}                 # keys added since the last flush
+        self._recent: "OrderedDict[int, None]" = OrderedDict()   # FIFO of keys confirmed on disk
+        self._push: Dict[str, int] = {}
+        self._done: Dict[str, None] = {}
+        self._meta: Dict[str, str] = {}                  # staged meta, committed with the rows it describes
+        self.counters = {"bloom_new": 0, "disk_lookups": 0, "false_positives": 0}
+        self.count = self.db.execute("SELECT count(*) FROM seen").fetchone()[0]
+
+        self.bloom = BloomFilter.load(self.bloom_path, capacity, fp_rate) if self.get_meta("bloom_clean") == "1" else None
+        if self.bloom is None:
+            self.bloom = BloomFilter(capacity, fp_rate)
+            for (h,) in self.db.execute("SELECT h FROM seen"):
+                self.bloom.add(h)
+        self.set_meta("bloom_clean", "0")   # until close() saves it again
+
+    # ---------- seen set ----------
+    def add(self, url: str) -> bool:
+        """True if the URL was not seen before (and records it)."""
+        key = url_key(url)
+        if self.bloom.add(key):
+            self.counters["bloom_new"] += 1
+            return self._record(key)
+        if key in self._new or key in self._recent:
+            return False
+        self.counters["disk_lookups"] += 1
+        if self.db.execute("SELECT 1 FROM seen WHERE h=?", (key,)).fetchone():
+            self._remember(key)
+            return False
+        self.counters["false_positives"] += 1
+        return self._record(key)
+
+    def __contains__(self, url: str) -> bool:
+        key = url_key(url)
+        if key not in self.bloom:
+            return False
+        if key in self._new or key in self._recent:
+            return True
+        return self.db.execute("SELECT 1 FROM seen WHERE h=?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, key: int) -> bool:
+        # flush before recording, never after: the caller pushes this URL's pending row right
+        # after add(), and a URL must not reach disk as seen without it
+        if self._due():
+            self.flush()
+        self._new[key] = None
+        self.count += 1
+        return True
+
+    def _due(self) -> bool:
+        if len(self._new) >= self.batch:
+            return True
+        return bool(self._new or self._push or self._done or self._meta) and time.monotonic() - self._flushed >= self.flush_s
+
+    def _remember(self, key: int):
+        self._recent[key] = None
+        if len(self._recent) > RECENT:
+            self._recent.popitem(last=False)
+
+    # ---------- pending frontier (for resume) ----------
+    def push_pending(self, url: str, depth: int):
+        self._done.pop(url, None)
+        self._push[url] = depth
+        if self._due():
+            self.flush()
+
+    def done_pending(self, url: str):
+        if self._push.pop(url, None) is None:
+            self._done[url] = None
+        if self._due():
+            self.flush()
+
+    def pending(self) -> List[Tuple[str, int]]:
+        self.flush()
+        return self.db.execute("SELECT url, depth FROM pending ORDER BY depth").fetchall()
+
+    # ---------- meta ----------
+    def get_meta(self, k: str, default: Optional[str] = None) -> Optional[str]:
+        row = self.db.execute("SELECT v FROM meta WHERE k=?", (k,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, k: str, v) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta(k, v) VALUES (?, ?)", (k, str(v)))
+
+    def stage_meta(self, k: str, v) -> None:
+        """Written by the next flush, in the same transaction as the buffered rows."""
+        self._meta[k] = str(v)
+
+    # ---------- persistence ----------
+    def flush(self):
+        self._flushed = time.monotonic()
+        if not (self._new or self._push or self._done or self._meta):
+            return
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR IGNORE INTO seen(h) VALUES (?)", ((k,) for k in self._new))
+            self.db.executemany("INSERT OR REPLACE INTO pending(url, depth) VALUES (?, ?)", self._push.items())
+            self.db.executemany("DELETE FROM pending WHERE url=?", ((u,) for u in self._done))
+            self.db.executemany("INSERT OR REPLACE INTO meta(k, v) VALUES (?, ?)", self._meta.items())
+            self.db.execute("INSERT OR REPLACE INTO meta(k, v) VALUES ('flushed_at', ?)", (str(time.time()),))
+        for k in self._new:
+            self._remember(k)
+        self._new.clear(); self._push.clear(); self._done.clear(); self._meta.clear()
+
+    def close(self):
+        self.flush()
+        self.bloom.save(self.bloom_path)
+        self.set_meta("bloom_clean", "1")
+        self.db.close()
+
+    def reset(self):
+        """Forget everything (fresh crawl on the same state path)."""
+        self._new.clear(); self._recent.clear(); self._push.clear(); self._done.clear(); self._meta.clear()
+        with self.db:
+            self.db.execute("BEGIN")
+            for table in ("seen", "pending", "meta"):
+                self.db.execute(f"DELETE FROM {table}")
+        self.bloom = BloomFilter(self.bloom.capacity, self.bloom.fp_rate)
+        self.count = 0
+        self.set_meta("bloom_clean", "0")
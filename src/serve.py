@@ -0,0 +1,316 @@
+# src/serve.py
+import os, json, time, asyncio, contextlib
+from typing import Any, Dict, Optional, Tuple
+
+from playwright.async_api import async_playwright
+
+from .models import SearchMetadata
+from .pipeline import abuild_result
+from .playwright_flow import launch_context, run_attempt, AkamaiBlocked
+from .proxy_pool import POOL, proxy_from_env
+from .profile_pool import PROFILES, profile_slot
+from . import memprof, deadline, metrics, parse_pool
+
+HOST = os.getenv("AA_SERVE_HOST", "127.0.0.1")
+PORT = int(os.getenv("AA_SERVE_PORT", "8765"))
+BROWSERS = int(os.getenv("AA_SERVE_BROWSERS", "1"))
+MAX_QUEUE = int(os.getenv("AA_SERVE_MAX_QUEUE", "16"))       # requests waiting for a browser
+DEFAULT_DEADLINE_S = float(os.getenv("AA_SERVE_DEADLINE", "120"))
+MAX_ATTEMPTS = 3
+SERVICE_TIME_ALPHA = 0.2  # EWMA weight for the service-time estimate used by admission
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+"""
+One long-lived persistent context. Relaunched (with a fresh proxy)
+after a block or crash; otherwise reused across searches so startup
+and home-page warm-up are paid once.
+"""
+class WarmBrowser:
+    def __init__(self, idx: int, pooled: bool):
+        self.idx = idx
+        self.pooled = pooled
+        self._stack = contextlib.AsyncExitStack()
+        self.p = None
+        self.ctx = None
+        self.proxy = None
+        self.profile_dir = ""
+        self.searches = 0
+        self.dirty = False   # a relaunch was cut short (deadline cancelled it); redo it before the next search
+
+    async def start(self):
+        self.p = await self._stack.enter_async_context(async_playwright())
+        self.profile_dir = await self._stack.enter_async_context(profile_slot(PROFILES if self.pooled else None))
+        await self._launch()
+
+    async def _launch(self):
+        self.proxy = proxy_from_env(self.profile_dir)
+        self.ctx = await launch_context(self.p, self.profile_dir, self.proxy)
+        self.searches = 0
+
+    async def _relaunch(self):
+        # stays dirty unless the new context is up: a cancel between close and launch leaves no usable ctx
+        self.dirty = True
+        try: await self.ctx.close()
+        except Exception: pass
+        POOL.release(self.profile_dir)
+        await self._launch()
+        self.dirty = False
+
+    async def search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.dirty:
+            print(f"🔧 Browser {self.idx} was interrupted while relaunching, finishing the relaunch")
+            await self._relaunch()
+        elif memprof.should_recycle(profile_dir=self.profile_dir):
+            print(f"♻️ Browser {self.idx} RSS over {memprof.RSS_LIMIT_MB:.0f} MB, recycling it")
+            await self._relaunch()
+        last_exc: Optional[BaseException] = None
+        for i in range(MAX_ATTEMPTS):
+            deadline.check("search")
+            if i:
+                metrics.RETRIES.inc(flow="serve")
+            started = time.monotonic()
+            try:
+                with memprof.session(f"serve#{self.idx} {params['origin']}->{params['destination']} {params['date']}"):
+                    payload = await run_attempt(self.ctx, params, warm=self.searches > 0)
+            except AkamaiBlocked as e:
+                POOL.report(self.proxy, ok=False, blocked=True)
+                metrics.attempt("serve", self.proxy, self.profile_dir, "blocked")
+                last_exc = e
+                await self._relaunch()
+                continue
+            except Exception as e:
+                deadline.check("search")   # out of budget: not the proxy's fault, keep the browser
+                POOL.report(self.proxy, ok=False)
+                metrics.attempt("serve", self.proxy, self.profile_dir, "failed")
+                last_exc = e
+                await self._relaunch()
+                continue
+            POOL.report(self.proxy, ok=True, latency_ms=(time.monotonic() - started) * 1000)
+            metrics.attempt("serve", self.proxy, self.profile_dir, "ok")
+            self.searches += 1
+            return payload
+        raise RuntimeError(f"search failed after {MAX_ATTEMPTS} attempts: {last_exc}")
+
+    async def close(self):
+        try: await self.ctx.close()
+        except Exception: pass
+        await self._stack.aclose()
+
+
+"""
+Keeps N warm browsers, coalesces identical concurrent searches into one
+browser run, and applies admission control: a bounded wait queue plus
+rejection of requests whose deadline cannot be met given the current
+queue depth and the observed service time.
+"""
+class SearchService:
+    def __init__(self, browsers: int = BROWSERS, max_queue: int = MAX_QUEUE):
+        self.n = max(int(browsers), 1)
+        self.max_queue = max_queue
+        self.idle: "asyncio.Queue[WarmBrowser]" = asyncio.Queue()
+        self.browsers = []
+        self.inflight: Dict[Tuple, Tuple[asyncio.Future, float]] = {}   # key -> (outcome, its run's expiry)
+        self.waiting = 0
+        self.busy = 0
+        self.service_s = 30.0  # prior until real searches are observed
+        self.counters = {
+            "requests_total": 0, "coalesced_total": 0, "succeeded_total": 0, "failed_total": 0,
+            "rejected_queue_full_total": 0, "rejected_deadline_total": 0, "deadline_expired_total": 0,
+        }
+
+    async def start(self):
+        parse_pool.enable()
+        await asyncio.to_thread(parse_pool.warm_up)   # parse workers are spawned before the first results page
+        for i in range(self.n):
+            b = WarmBrowser(i, pooled=self.n > 1)
+            await b.start()
+            self.browsers.append(b)
+            self.idle.put_nowait(b)
+        print(f"🔥 {self.n} warm browser(s) ready")
+
+    async def close(self):
+        for b in self.browsers:
+            await b.close()
+
+    @staticmethod
+    def key(meta: SearchMetadata) -> Tuple:
+        return (meta.origin.upper(), meta.destination.upper(), meta.date.isoformat(), meta.passengers, meta.cabin_class.lower())
+
+    def _expected_wait_s(self) -> float:
+        # requests ahead of us drain n at a time, then ours takes one service time
+        return (self.waiting // self.n + 1) * self.service_s
+
+    async def search(self, meta: SearchMetadata, deadline_s: float) -> Dict[str, Any]:
+        self.counters["requests_total"] += 1
+        k = self.key(meta)
+        expires = time.monotonic() + deadline_s
+        running = self.inflight.get(k)
+        # ride on an identical search only if its budget outlasts ours; a shorter one could 504 us early
+        if running is not None and running[1] >= expires:
+            self.counters["coalesced_total"] += 1
+            return await asyncio.wait_for(asyncio.shield(running[0]), timeout=deadline_s)
+
+        if self.waiting >= self.max_queue:
+            self.counters["rejected_queue_full_total"] += 1
+            raise Rejected(503, "queue full")
+        if self._expected_wait_s() > deadline_s:
+            self.counters["rejected_deadline_total"] += 1
+            raise Rejected(503, f"deadline {deadline_s:.1f}s cannot be met (expected {self._expected_wait_s():.1f}s)")
+
+        fut = asyncio.get_running_loop().create_future()
+        # mark the outcome retrieved even if every caller already timed out
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.inflight[k] = (fut, expires)
+        # counted now, not when the task first runs, so requests arriving in the same tick see each other
+        self.waiting += 1
+        task = asyncio.create_task(self._run(meta, fut, expires))
+        task.add_done_callback(lambda _t: self._forget(k, fut))
+        return await asyncio.wait_for(asyncio.shield(fut), timeout=deadline_s)
+
+    def _forget(self, k: Tuple, fut: asyncio.Future):
+        # a longer-deadline run may have taken the key over meanwhile; leave that one in place
+        if k in self.inflight and self.inflight[k][0] is fut:
+            del self.inflight[k]
+
+    async def _run(self, meta: SearchMetadata, fut: asyncio.Future, expires: float):
+        # self.waiting was incremented by search()
+        try:
+            browser = await asyncio.wait_for(self.idle.get(), timeout=max(expires - time.monotonic(), 0.001))
+        except asyncio.TimeoutError:
+            self.counters["deadline_expired_total"] += 1
+            fut.set_exception(Rejected(504, "deadline expired while queued"))
+            return
+        finally:
+            self.waiting -= 1
+
+        self.busy += 1
+        started = time.monotonic()
+        try:
+            # the request's own deadline bounds the browser run, so a slow search frees its browser
+            with metrics.search("serve"), deadline.scope(expires - time.monotonic()):
+                payload = await deadline.enforce(browser.search({
+                    "origin": meta.origin, "destination": meta.destination, "date": meta.date.isoformat()
+                }))
+            result = await abuild_result(meta, payload)
+            self.counters["succeeded_total"] += 1
+            fut.set_result(json.loads(result.model_dump_json()))
+        except deadline.DeadlineExceeded as e:
+            self.counters["deadline_expired_total"] += 1
+            fut.set_exception(e)
+        except Exception as e:
+            self.counters["failed_total"] += 1
+            fut.set_exception(e)
+        finally:
+            took = time.monotonic() - started
+            self.service_s = SERVICE_TIME_ALPHA * took + (1 - SERVICE_TIME_ALPHA) * self.service_s
+            self.busy -= 1
+            self.idle.put_nowait(browser)
+
+    def metrics_text(self) -> str:
+        lines = []
+        for name, v in self.counters.items():
+            lines += [f"# TYPE aa_serve_{name} counter", f"aa_serve_{name} {v}"]
+        gauges = {
+            "waiting": self.waiting, "busy_browsers": self.busy, "browsers": self.n,
+            "inflight_searches": len(self.inflight), "service_time_seconds": round(self.service_s, 3),
+        }
+        for name, v in gauges.items():
+            lines += [f"# TYPE aa_serve_{name} gauge", f"aa_serve_{name} {v}"]
+        return "\n".join(lines) + "\n" + metrics.METRICS.render()
+
+
+# -------- minimal HTTP/1.1 front end --------
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+               503: "Service Unavailable", 504: "Gateway Timeout"}
+
+async def _respond(writer, status: int, body: Any, content_type: str = "application/json"):
+    data = body if isinstance(body, bytes) else (
+        body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+    )
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n")
+    writer.write(head.encode("latin-1") + data)
+    await writer.drain()
+
+async def _handle(service: SearchService, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            k, _, v = line.partition(":")
+            headers[k.strip().lower()] = v.strip()
+        body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+
+        if method == "GET" and path == "/healthz":
+            return await _respond(writer, 200, {"ok": True, "browsers": service.n})
+        if method == "GET" and path == "/metrics":
+            return await _respond(writer, 200, service.metrics_text(), "text/plain; version=0.0.4")
+        if method == "POST" and path == "/search":
+            try:
+                req = json.loads(body or b"{}")
+                deadline_s = float(req.pop("deadline_s", DEFAULT_DEADLINE_S))
+                meta = SearchMetadata(**req)
+            except Exception as e:
+                return await _respond(writer, 400, {"error": str(e)})
+            try:
+                result = await service.search(meta, deadline_s)
+            except Rejected as e:
+                return await _respond(writer, e.status, {"error": e.reason})
+            except (asyncio.TimeoutError, deadline.DeadlineExceeded):
+                return await _respond(writer, 504, {"error": "deadline exceeded"})
+            except Exception as e:
+                return await _respond(writer, 500, {"error": str(e)})
+            return await _respond(writer, 200, result)
+        return await _respond(writer, 404, {"error": f"no route {method} {path}"})
+    except Exception:
+        pass
+    finally:
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+async def serve(host: str = HOST, port: int = PORT, browsers: int = BROWSERS, max_queue: int = MAX_QUEUE):
+    service = SearchService(browsers, max_queue)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: _handle(service, r, w), host, port)
+    print(f"🚀 Serving on http://{host}:{port}  (POST /search, GET /metrics, GET /healthz)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+"""
+CLI: python -m src serve [--port 8765] [--browsers 2]
+"""
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog="serve", description="Local search service with warm browsers")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--browsers", type=int, default=BROWSERS)
+    ap.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.browsers, args.max_queue))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# src/snapshots.py
+import os, json, time, sqlite3, pathlib, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import zstandard
+
+from .models import FareChange, FareDelta, FlightItem, SearchMetadata, SearchResult
+
+PATH = pathlib.Path(os.getenv("AA_SNAPSHOT_DB", "data/state/snapshots.db"))
+
+# compact row layout: one list per flight instead of a dict with repeated keys
+FIELDS = ("flight_number", "departure_time", "arrival_time", "points_required", "cash_price_usd", "taxes_fees_usd", "cpp")
+PRICE_FIELDS = ("points_required", "cash_price_usd", "taxes_fees_usd")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+  search_key  TEXT PRIMARY KEY,       -- LAX-JFK-2025-12-15-ECONOMY-1
+  flights     BLOB NOT NULL,          -- zstd(JSON list of FIELDS rows)
+  flights_n   INTEGER NOT NULL,
+  updated     REAL NOT NULL,
+  changed     REAL NOT NULL           -- last time the delta was non-empty
+);
+"""
+
+
+def snapshot_key(meta: SearchMetadata) -> str:
+    """One snapshot per distinct search: cabin and party size change the fares, so they are part of the key."""
+    return f"{meta.origin}-{meta.destination}-{meta.date.isoformat()}-{meta.cabin_class}-{meta.passengers}".upper()
+
+
+def flight_id(f: FlightItem) -> Tuple[str, str]:
+    """Identity of a flight within one route/date: number and departure time."""
+    return (f.flight_number, f.departure_time)
+
+
+"""
+Added, removed and re-priced flights between two results for the same
+search key; flights whose points, cash and taxes are unchanged are only
+counted. Arrival times and cpp follow from those, so they are not compared.
+"""
+def diff(prev: Optional[List[FlightItem]], cur: SearchResult) -> FareDelta:
+    before = {flight_id(f): f for f in (prev or [])}
+    now = {flight_id(f): f for f in cur.flights}
+    added = [f for k, f in now.items() if k not in before]
+    removed = [f for k, f in before.items() if k not in now]
+    changed, same = [], 0
+    for k, f in now.items():
+        old = before.get(k)
+        if old is None:
+            continue
+        fields = {name: [getattr(old, name), getattr(f, name)] for name in PRICE_FIELDS if getattr(old, name) != getattr(f, name)}
+        if fields:
+            changed.append(FareChange(flight_number=f.flight_number, departure_time=f.departure_time,
+                                      changes=fields, cpp=f.cpp))
+        else:
+            same += 1
+    return FareDelta(search_metadata=cur.search_metadata, first_snapshot=prev is None,
+                     added=added, removed=removed, changed=changed, unchanged=same)
+
+
+"""
+Last result per search key, kept as zstd-compressed compact rows in
+one SQLite table. update() diffs a new result against it, stores the
+new one and returns the delta, so monitoring runs ship only changes.
+Results without flights are never stored or diffed (delta.no_flights).
+"""
+class SnapshotStore:
+    def __init__(self, path: pathlib.Path = PATH):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def _pack(flights: List[FlightItem]) -> bytes:
+        rows = [[getattr(f, name) for name in FIELDS] for f in flights]
+        return zstandard.ZstdCompressor(level=3).compress(json.dumps(rows, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: bytes) -> List[FlightItem]:
+        rows = json.loads(zstandard.ZstdDecompressor().decompress(blob))
+        return [FlightItem(**dict(zip(FIELDS, r))) for r in rows]
+
+    def get(self, key: str) -> Optional[List[FlightItem]]:
+        with self._lock:
+            row = self.db.execute("SELECT flights FROM snapshots WHERE search_key = ?", (key,)).fetchone()
+        return self._unpack(row[0]) if row else None
+
+    def update(self, result: SearchResult) -> FareDelta:
+        meta = result.search_metadata
+        if not result.flights:
+            # a blocked or unparsed page, not every flight gone: don't diff it or replace the last good snapshot
+            return FareDelta(search_metadata=meta, no_flights=True)
+        key = snapshot_key(meta)
+        delta = diff(self.get(key), result)
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute("BEGIN")
+            if delta.empty() and not delta.first_snapshot:
+                self.db.execute("UPDATE snapshots SET updated = ? WHERE search_key = ?", (now, key))
+            else:
+                self.db.execute(
+                    "INSERT INTO snapshots(search_key, flights, flights_n, updated, changed) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(search_key) DO UPDATE SET flights = excluded.flights, flights_n = excluded.flights_n, "
+                    "updated = excluded.updated, changed = excluded.changed",
+                    (key, self._pack(result.flights), len(result.flights), now, now),
+                )
+        return delta
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys, flights = self.db.execute("SELECT count(*), coalesce(sum(flights_n), 0) FROM snapshots").fetchone()
+        return {"keys": keys, "flights": flights, "db_mb": round(self.path.stat().st_size / 1e6, 2)}
+
+
+_default: Optional[SnapshotStore] = None
+
+def default() -> SnapshotStore:
+    """Process-wide store under AA_SNAPSHOT_DB, opened on first use."""
+    global _default
+    if _default is None:
+        _default = SnapshotStore()
+    return _default
@@ -0,0 +1,78 @@
+# src/storage_state.py
+import os, json, time, pathlib
+from typing import Any, Dict, Optional
+from . import replay
+
+STATE_PATH = pathlib.Path(os.getenv("AA_STORAGE_STATE", "data/state/storage_state.json"))
+STATE_TTL_S = float(os.getenv("AA_STATE_TTL", "1800"))  # Akamai sensor cookies go stale in ~30 min
+USE_STATE = os.getenv("AA_USE_STATE", "1").lower() in ("1", "true", "yes")
+
+# replays localStorage for the current origin before any page script runs. Init scripts
+# run on every navigation, so it is one-shot per tab (sessionStorage flag) and never
+# overwrites a key the site has set since
+_LOCAL_STORAGE_JS = r"""
+(origins) => {
+  try {
+    if (sessionStorage.getItem('__aa_state_replayed')) return;
+    const hit = origins.find(o => o.origin === location.origin);
+    if (!hit) return;
+    sessionStorage.setItem('__aa_state_replayed', '1');
+    for (const kv of (hit.localStorage || [])) {
+      try { if (localStorage.getItem(kv.name) === null) localStorage.setItem(kv.name, kv.value); } catch(e) {}
+    }
+  } catch(e) {}
+}
+"""
+
+
+"""
+Snapshot Playwright storage_state (cookies incl. Akamai _abck/bm_sz,
+plus localStorage) after a successful search so fresh contexts can skip
+the home-page warm-up. Snapshots older than STATE_TTL_S are ignored.
+"""
+async def save(ctx, path: pathlib.Path = STATE_PATH):
+    if replay.active():  # keep recorded/replayed sessions on the same path every time
+        return
+    try:
+        state = await ctx.storage_state()
+        state["saved_at"] = time.time()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, path)
+        print(f"💾 Saved storage state ({len(state.get('cookies', []))} cookies)")
+    except Exception:
+        pass
+
+
+def load(path: pathlib.Path = STATE_PATH, ttl_s: float = STATE_TTL_S) -> Optional[Dict[str, Any]]:
+    """Return the saved state if it exists and is still fresh, else None."""
+    if not USE_STATE or replay.active():
+        return None
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if time.time() - float(state.get("saved_at", 0)) > ttl_s:
+        return None
+    return state
+
+
+def invalidate(path: pathlib.Path = STATE_PATH):
+    """Forget the snapshot so the next attempt does a full warm-up."""
+    path.unlink(missing_ok=True)
+
+
+"""
+Seed an existing (persistent) context from a snapshot. Persistent
+contexts cannot take storage_state at launch, so cookies are added
+directly and localStorage is replayed once per tab by an init script.
+"""
+async def apply(ctx, state: Dict[str, Any]):
+    now = time.time()
+    cookies = [c for c in state.get("cookies", []) if c.get("expires", -1) in (-1, None) or c["expires"] > now]
+    if cookies:
+        await ctx.add_cookies(cookies)
+    origins = state.get("origins") or []
+    if origins:
+        await ctx.add_init_script(f"({_LOCAL_STORAGE_JS})({json.dumps(origins)})")
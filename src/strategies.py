@@ -0,0 +1,238 @@
+# src/strategies.py
+import os, json, time, atexit, pathlib, threading
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import deadline
+from .deadline import DeadlineExceeded
+from .utils import file_lock
+
+STATE_PATH = pathlib.Path(os.getenv("AA_STRATEGY_STATE", "data/state/strategies.json"))
+UNTRIED_MS = 500.0   # assumed cost of a candidate with no history
+HISTORY = 50         # attempts kept at full weight; older ones are halved so a redesign is noticed
+FLUSH_S = 2.0        # outcomes are merged into the shared file in batches, off the event loop
+
+
+"""
+Outcome history of one candidate (selector or strategy) for one form
+step. Time spent on failures is what the step wasted before something
+worked; timeouts are counted separately since they cost the most.
+"""
+@dataclass
+class StrategyStats:
+    step: str
+    name: str
+    successes: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    success_ms: float = 0.0
+    wasted_ms: float = 0.0
+
+    @property
+    def attempts(self) -> int:
+        return self.successes + self.failures
+
+    def success_rate(self) -> float:
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def cost(self) -> float:
+        """Expected ms spent before this candidate succeeds, if it is tried first."""
+        mean_ms = (self.success_ms + self.wasted_ms) / self.attempts if self.attempts else UNTRIED_MS
+        return mean_ms / self.success_rate()
+
+    def decay(self):
+        for f in ("successes", "failures", "timeouts"):
+            setattr(self, f, getattr(self, f) // 2)
+        self.success_ms /= 2
+        self.wasted_ms /= 2
+
+
+"""
+Learns which candidate works for each step of the booking form. Helpers
+hand over their candidates in hand-written order; run() tries them
+cheapest-expected-first (ties keep that order, so a fresh install
+behaves as before) and records the outcome. Stats are persisted so the
+fallbacks that always time out sink to the end across CLI runs.
+"""
+class StrategyRegistry:
+    def __init__(self, state_path: Optional[pathlib.Path] = STATE_PATH):
+        self._lock = threading.Lock()
+        self._state_path = state_path
+        self.stats: Dict[Tuple[str, str], StrategyStats] = {}
+        self._pending: Dict[Tuple[str, str], StrategyStats] = {}   # outcomes not yet merged into the file
+        self._flush_timer: Optional[threading.Timer] = None
+        self._loaded = False
+
+    # ---------- persistence ----------
+    def _read(self) -> Dict[Tuple[str, str], StrategyStats]:
+        out: Dict[Tuple[str, str], StrategyStats] = {}
+        try:
+            saved = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except Exception:
+            return out
+        for row in saved.get("strategies", []):
+            try:
+                out[(row["step"], row["name"])] = StrategyStats(**row)
+            except Exception:
+                pass
+        return out
+
+    def _load(self):
+        self._loaded = True
+        if self._state_path:
+            self.stats.update(self._read())
+
+    def _write(self, stats: Dict[Tuple[str, str], StrategyStats]):
+        tmp = self._state_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"strategies": [asdict(s) for s in stats.values()]}, indent=2), encoding="utf-8")
+        os.replace(tmp, self._state_path)
+
+    @staticmethod
+    def _merge(into: Dict[Tuple[str, str], StrategyStats], deltas: Dict[Tuple[str, str], StrategyStats]):
+        for key, d in deltas.items():
+            st = into.setdefault(key, StrategyStats(step=d.step, name=d.name))
+            st.successes += d.successes
+            st.failures += d.failures
+            st.timeouts += d.timeouts
+            st.success_ms += d.success_ms
+            st.wasted_ms += d.wasted_ms
+            if st.attempts > HISTORY:
+                st.decay()
+
+    def _schedule_flush(self):
+        if self._state_path and self._flush_timer is None:
+            self._flush_timer = threading.Timer(FLUSH_S, self.save)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _get(self, step: str, name: str) -> StrategyStats:
+        if not self._loaded:
+            self._load()
+        key = (step, name)
+        if key not in self.stats:
+            self.stats[key] = StrategyStats(step=step, name=name)
+        return self.stats[key]
+
+    # ---------- ordering / feedback ----------
+    def order(self, step: str, names: Sequence[str]) -> List[str]:
+        with self._lock:
+            costs = {n: self._get(step, n).cost() for n in names}
+        return sorted(names, key=lambda n: costs[n])   # stable: ties keep the caller's order
+
+    def record(self, step: str, name: str, ok: bool, ms: float, timeout: bool = False):
+        with self._lock:
+            st = self._get(step, name)
+            delta = self._pending.setdefault((step, name), StrategyStats(step=step, name=name))
+            for target in (st, delta):
+                if ok:
+                    target.successes += 1
+                    target.success_ms += ms
+                else:
+                    target.failures += 1
+                    target.wasted_ms += ms
+                    target.timeouts += int(timeout)
+            if st.attempts > HISTORY:
+                st.decay()
+            self._schedule_flush()
+
+    def save(self):
+        """
+        Several processes share the file, so this process's new outcomes
+        are added onto what is on disk now (under a file lock) instead of
+        overwriting it with this process's view. The file lock is taken
+        outside self._lock, so record() never waits on another process.
+        """
+        with self._lock:
+            self._flush_timer = None
+            batch, self._pending = self._pending, {}
+        if not batch or not self._state_path:
+            return
+        try:
+            with file_lock(self._state_path.with_suffix(".lock")):
+                merged = self._read()
+                self._merge(merged, batch)
+                self._write(merged)
+        except Exception:   # unwritable state dir: keep learning in memory, as before
+            return
+        with self._lock:
+            self._merge(merged, self._pending)   # recorded while we were writing; flushed next time
+            self.stats = merged
+
+    async def run(self, step: str, candidates: Sequence[Tuple[str, Callable[[], Awaitable[Any]]]]) -> Optional[str]:
+        """
+        Awaits each candidate's thunk in learned order until one returns
+        anything but False without raising; returns its name (None if all
+        failed). Once the search deadline has passed it raises
+        DeadlineExceeded instead, without blaming the candidate that was
+        cut short. Stats are saved in the background (see save()).
+        """
+        thunks = dict(candidates)
+        for name in self.order(step, [n for n, _ in candidates]):
+            deadline.check(step)
+            t0 = time.monotonic()
+            try:
+                ok = (await thunks[name]()) is not False
+                timeout = False
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                deadline.check(step)   # a clamped wait ran out with the budget: not this candidate's failure
+                ok, timeout = False, type(e).__name__ == "TimeoutError"   # playwright's and asyncio's
+            self.record(step, name, ok, (time.monotonic() - t0) * 1000, timeout)
+            if ok:
+                return name
+        return None
+
+    # ---------- reporting ----------
+    def wasted(self) -> Dict[str, Dict[str, float]]:
+        """Per step: timeouts and ms spent on candidates that did not work."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            out: Dict[str, Dict[str, float]] = {}
+            for st in self.stats.values():
+                row = out.setdefault(st.step, {"timeouts": 0, "failures": 0, "wasted_ms": 0.0})
+                row["timeouts"] += st.timeouts
+                row["failures"] += st.failures
+                row["wasted_ms"] = round(row["wasted_ms"] + st.wasted_ms, 1)
+            return out
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            rows = [{**asdict(s), "success_rate": round(s.success_rate(), 3), "cost_ms": round(s.cost(), 1)}
+                    for s in self.stats.values()]
+        return sorted(rows, key=lambda r: (r["step"], r["cost_ms"]))
+
+    def reset(self, step: Optional[str] = None):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._pending = {k: v for k, v in self._pending.items() if step is not None and k[0] != step}
+            if not self._state_path:
+                self.stats = {k: v for k, v in self.stats.items() if step is not None and k[0] != step}
+                return
+            with file_lock(self._state_path.with_suffix(".lock")):
+                self.stats = {k: v for k, v in self._read().items() if step is not None and k[0] != step}
+                self._write(self.stats)
+
+
+STRATEGIES = StrategyRegistry()
+atexit.register(STRATEGIES.save)
+
+
+# -------- CLI: python -m src.strategies [--reset [STEP]] --------
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reset", nargs="?", const="*", metavar="STEP", help="forget the stats (of one step)")
+    args = ap.parse_args()
+    if args.reset:
+        STRATEGIES.reset(None if args.reset == "*" else args.reset)
+        print(f"🧹 reset {args.reset}")
+    for row in STRATEGIES.snapshot():
+        print(f"   {row['step']:<16} {row['successes']:5d} ok {row['failures']:5d} fail {row['timeouts']:5d} t/o "
+              f"{row['cost_ms']:9.1f} ms  {row['name']}")
+    for step, w in STRATEGIES.wasted().items():
+        print(f"⏳ {step}: {w['timeouts']} timeouts, {w['wasted_ms'] / 1000:.1f}s wasted")
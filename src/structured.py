@@ -0,0 +1,195 @@
+import re, json, html as htmllib
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+SYNTAXES = ("json-ld", "microdata", "opengraph")
+
+# same namespaces extruct's OpenGraphExtractor knows without a prefix= declaration
+OG_NAMESPACES = {
+    "og": "http://ogp.me/ns#",
+    "music": "http://ogp.me/ns/music#",
+    "video": "http://ogp.me/ns/video#",
+    "article": "http://ogp.me/ns/article#",
+    "book": "http://ogp.me/ns/book#",
+    "profile": "http://ogp.me/ns/profile#",
+    "product": "http://ogp.me/ns/product#",
+}
+HEAD_TAGS = {"!doctype", "html", "head", "meta", "link", "title", "script", "style", "base", "noscript", "template"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_SCRIPT_OPEN = re.compile(r"<script\b[^>]*?\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>", re.I)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.I)
+_COMMENT_LINE = re.compile(r"^\s*(//.*|<!--.*-->)")
+_HEAD = re.compile(r"<head\b([^>]*)>(.*?)(?:</head\s*>|<body\b)", re.I | re.S)
+_HTML_TAG = re.compile(r"<html\b([^>]*)>", re.I)
+_ANY_TAG = re.compile(r"<([a-zA-Z!][\w-]*)")
+_META = re.compile(r"<meta\b([^>]*)>", re.I)
+_ATTR = re.compile(r"""([^\s=/>"']+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+_PREFIX = re.compile(r"\s*(\w+):\s*([^\s]+)")
+_START_TAG = re.compile(r"<([a-zA-Z][\w-]*)\b[^>]*>")
+
+
+def _lower(html: str) -> Optional[str]:
+    """Lower-cased copy whose indexes line up with html (None in the rare case they would not)."""
+    low = html.lower()
+    return low if len(low) == len(html) else None
+
+
+def _tags_with(html: str, low: Optional[str], needle: str, start_tag: "re.Pattern", attr: bool = False):
+    """
+    Start tags containing `needle`, found by a plain substring search for the
+    needle and a step back to its '<' -- re.I patterns lose the literal fast
+    path and would be tried at every '<' of a large page. With attr=True the
+    needle must stand alone as an attribute name.
+    """
+    ci = re.compile(re.escape(needle), re.I) if low is None else None
+    pos = 0
+    while True:
+        if ci is None:
+            i = low.find(needle, pos)
+        else:
+            hit = ci.search(html, pos)
+            i = hit.start() if hit else -1
+        if i < 0:
+            return
+        pos = i + len(needle)
+        if attr and not (html[i - 1].isspace() and (pos == len(html) or not (html[pos].isalnum() or html[pos] in "-_:"))):
+            continue
+        lt = html.rfind("<", 0, i)
+        m = start_tag.match(html, lt) if lt >= 0 else None
+        if m and m.end() > i:
+            yield m
+            pos = m.end()
+
+
+def _attrs(tag_body: str) -> Dict[str, str]:
+    out = {}
+    for m in _ATTR.finditer(tag_body):
+        out.setdefault(m.group(1).lower(), htmllib.unescape(next(v for v in m.groups()[1:] if v is not None)))
+    return out
+
+
+"""
+JSON-LD BLOCKS, FOUND BY SCANNING FOR THEIR <script> TAGS INSTEAD OF
+PARSING THE DOCUMENT; SAME DECODING RULES AS EXTRUCT (LISTS FLATTENED,
+COMMENT-PREFIXED SCRIPTS RETRIED WITH JSTYLESON, BROKEN BLOCKS SKIPPED)
+"""
+def extract_jsonld(html: str, low: Optional[str] = None) -> List[Any]:
+    items: List[Any] = []
+    low = _lower(html) if low is None else low
+    for m in _tags_with(html, low, "application/ld+json", _SCRIPT_OPEN):
+        close = _SCRIPT_CLOSE.search(html, m.end())
+        if not close:
+            break
+        script = html[m.end():close.start()]
+        try:
+            data = json.loads(script, strict=False)
+        except ValueError:
+            try:
+                import jstyleson  # ships with extruct
+                data = jstyleson.loads(_COMMENT_LINE.sub("", script), strict=False)
+            except Exception:
+                continue
+        for item in (data if isinstance(data, list) else [data]):
+            if isinstance(item, dict) and item:
+                items.append(item)
+    return items
+
+
+"""
+OPENGRAPH <meta property=... content=...> TAGS FROM <head> ONLY,
+RETURNED IN EXTRUCT'S {"namespace": ..., "properties": [...]} SHAPE
+"""
+def extract_opengraph(html: str) -> List[Dict[str, Any]]:
+    head = _HEAD.search(html)
+    if head:
+        head_start, head_attrs, head_html = head.start(), head.group(1), head.group(2)
+    else:
+        # no <head> tag: like lxml, the implied head runs until the first body element
+        head_start, head_attrs, head_html = 0, "", html
+        for t in _ANY_TAG.finditer(html):
+            if t.group(1).lower() not in HEAD_TAGS:
+                head_html = html[:t.start()]
+                break
+    namespaces: Dict[str, str] = {}
+    html_tag = _HTML_TAG.search(html, 0, head_start) if head else _HTML_TAG.search(head_html)
+    for attrs in ((_attrs(html_tag.group(1)) if html_tag else {}), _attrs(head_attrs)):
+        namespaces.update(_PREFIX.findall(attrs.get("prefix", "")))
+    props: List[Tuple[str, str]] = []
+    for m in _META.finditer(head_html):
+        attrs = _attrs(m.group(1))
+        prop, val = attrs.get("property"), attrs.get("content")
+        if prop is None or val is None:
+            continue
+        ns = prop.partition(":")[0]
+        if ns in OG_NAMESPACES:
+            namespaces[ns] = OG_NAMESPACES[ns]
+        if ns in namespaces:
+            props.append((prop, val))
+    return [{"namespace": namespaces, "properties": props}] if props else []
+
+
+def _region_end(html: str, tag: str, start: int) -> int:
+    """Index just past the element whose start tag ends at `start`, by balancing tags of the same name."""
+    depth = 1
+    for m in re.compile(rf"<(/?){re.escape(tag)}\b[^>]*?(/?)>", re.I).finditer(html, start):
+        if m.group(1):
+            depth -= 1
+        elif not m.group(2):
+            depth += 1
+        if depth == 0:
+            return m.end()
+    return len(html)
+
+
+"""
+MICRODATA FROM THE TOP-LEVEL itemscope ELEMENTS ONLY: EACH REGION IS CUT
+OUT BY A TAG-BALANCING SCAN AND HANDED TO EXTRUCT'S MICRODATA EXTRACTOR.
+itemref CAN POINT ANYWHERE IN THE PAGE, SO THOSE PAGES ARE PARSED WHOLE
+"""
+def extract_microdata(html: str, base_url: Optional[str] = None, low: Optional[str] = None) -> List[Dict[str, Any]]:
+    low = _lower(html) if low is None else low
+    scopes = _tags_with(html, low, "itemscope", _START_TAG, attr=True)
+    first = next(scopes, None)
+    if not first:
+        return []
+    import lxml.html
+    from extruct.w3cmicrodata import LxmlMicrodataExtractor
+    extractor = LxmlMicrodataExtractor()
+    if (low.find("itemref", first.start()) >= 0) if low is not None else "itemref" in html.lower():
+        return extractor.extract_items(lxml.html.fromstring(html), base_url)
+
+    items: List[Dict[str, Any]] = []
+    end, m = 0, first
+    while m:
+        if m.start() >= end:   # nested scopes belong to the region already extracted
+            tag = m.group(1).lower()
+            end = m.end() if tag in VOID_TAGS else _region_end(html, tag, m.end())
+            region = lxml.html.fragment_fromstring(html[m.start():end], create_parent="div")
+            items.extend(extractor.extract_items(region, base_url))
+        m = next(scopes, None)
+    return items
+
+
+_EXTRACTORS = {
+    "json-ld": lambda html, base_url, low: extract_jsonld(html, low),
+    "opengraph": lambda html, base_url, low: extract_opengraph(html),
+    "microdata": extract_microdata,
+}
+
+"""
+DROP-IN FOR extruct.extract(html, syntaxes=..., uniform=False) LIMITED TO
+JSON-LD, MICRODATA AND OPENGRAPH; ONLY THE REQUESTED SYNTAXES ARE SCANNED
+"""
+def extract(html: Union[str, bytes], base_url: Optional[str] = None,
+            syntaxes: Iterable[str] = SYNTAXES) -> Dict[str, List[Any]]:
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", "replace")
+    syntaxes = list(syntaxes)
+    for syntax in syntaxes:
+        if syntax not in _EXTRACTORS:
+            raise ValueError(f"unsupported syntax {syntax!r}; choose from {', '.join(SYNTAXES)}")
+    low = _lower(html) if set(syntaxes) - {"opengraph"} else None
+    out = {}
+    for syntax in syntaxes:
+        out[syntax] = _EXTRACTORS[syntax](html, base_url, low)
+    return out
@@ -0,0 +1,37 @@
+# src/utils.py
+import os, pathlib, contextlib
+from typing import Iterator
+
+
+"""
+Exclusive inter-process lock on `path` (created if missing), for the
+JSON state files several processes read-modify-write. flock on POSIX,
+msvcrt byte lock on Windows; released when the block exits or the
+process dies.
+"""
+@contextlib.contextmanager
+def file_lock(path: pathlib.Path) -> Iterator[None]:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)   # retries for ~10 s, then raises
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,290 @@
+# src/watch.py
+import os, json, time, heapq, asyncio, pathlib
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import metrics
+
+STATE_PATH = pathlib.Path(os.getenv("AA_WATCH_STATE", "data/state/watch.json"))
+BUDGET_PER_HOUR = float(os.getenv("AA_WATCH_BUDGET", "60"))      # searches per hour across all watches
+BASE_INTERVAL_S = float(os.getenv("AA_WATCH_BASE_S", "3600"))    # a key with 50% change rate, 14 days out
+MIN_INTERVAL_S = float(os.getenv("AA_WATCH_MIN_S", "600"))
+MAX_INTERVAL_S = float(os.getenv("AA_WATCH_MAX_S", str(24 * 3600)))
+CHANGE_ALPHA = 0.3       # EWMA weight of the newest "did it change" observation
+PRIOR_CHANGE_RATE = 0.5  # unknown keys start in the middle
+FAILURE_BACKOFF_S = 900.0
+
+COVERAGE = metrics.METRICS.gauge("aa_watch_coverage_ratio", "Watched keys polled within their target interval")
+STALENESS = metrics.METRICS.gauge("aa_watch_staleness_seconds", "Age of the last successful poll", ["stat"])
+WATCHED = metrics.METRICS.gauge("aa_watch_keys", "Keys being watched")
+DEMAND = metrics.METRICS.gauge("aa_watch_demand_per_hour", "Searches per hour the unscaled intervals would need")
+POLLS = metrics.METRICS.counter("aa_watch_polls_total", "Watch polls by outcome (changed|unchanged|empty|failed)", ["outcome"])
+
+
+"""
+One watched search. change_rate is an EWMA of "the last poll found a
+fare change"; the interval is re-derived from it and the days left to
+departure after every poll.
+"""
+@dataclass
+class Watch:
+    key: str
+    meta: Dict[str, Any]             # SearchMetadata fields, JSON-safe
+    change_rate: float = PRIOR_CHANGE_RATE
+    interval_s: float = BASE_INTERVAL_S
+    next_due: float = 0.0
+    last_ok: float = 0.0
+    polls: int = 0
+    changes: int = 0
+    failures: int = 0
+
+    def days_out(self, today: Optional[date] = None) -> int:
+        return (date.fromisoformat(self.meta["date"]) - (today or date.today())).days
+
+    def target_interval(self, today: Optional[date] = None) -> float:
+        """
+        Volatile keys and near-term departures get polled more: the base
+        interval scales with days out (x0.25 at <=3 days, x4 past ~2 months)
+        and inversely with the change rate.
+        """
+        horizon = min(max(self.days_out(today) / 14.0, 0.25), 4.0)
+        volatility = 0.2 + self.change_rate            # 0.2 .. 1.2
+        return min(max(BASE_INTERVAL_S * horizon * 0.7 / volatility, MIN_INTERVAL_S), MAX_INTERVAL_S)
+
+
+def watch_key(meta: Dict[str, Any]) -> str:
+    """Same key the snapshot store files this search under."""
+    from .models import SearchMetadata
+    from .snapshots import snapshot_key
+    return snapshot_key(SearchMetadata(**meta))
+
+
+"""
+Polls watched searches from a priority queue ordered by due time, under
+a global searches-per-hour budget. When the watches together ask for
+more than the budget, every interval is stretched by the same factor,
+so volatile and near-term keys keep their relative priority. State is
+persisted so a restart resumes where it left off.
+"""
+class WatchScheduler:
+    def __init__(self, search: Callable[[Any], Awaitable[Any]], budget_per_hour: float = BUDGET_PER_HOUR,
+                 state_path: Optional[pathlib.Path] = STATE_PATH, on_delta: Optional[Callable[[Any], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.search = search             # async (SearchMetadata) -> SearchResult
+        self.budget_per_hour = budget_per_hour
+        self.state_path = state_path
+        self.on_delta = on_delta
+        self.clock = clock
+        self.watches: Dict[str, Watch] = {}
+        self._heap: List = []
+        self._tokens = 1.0
+        self._refilled = clock()
+        self._load()
+
+    # ---------- persistence ----------
+    def _load(self):
+        if not self.state_path:
+            return
+        try:
+            saved = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for row in saved.get("watches", []):
+            try:
+                self.watches[row["key"]] = Watch(**row)
+            except Exception:
+                pass
+        self._rebuild()
+
+    def _save(self):
+        if not self.state_path:
+            return
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"watches": [asdict(w) for w in self.watches.values()]}, indent=2), encoding="utf-8")
+            os.replace(tmp, self.state_path)
+        except Exception:
+            pass
+
+    def _rebuild(self):
+        self._heap = [(w.next_due, w.key) for w in self.watches.values()]
+        heapq.heapify(self._heap)
+
+    # ---------- watch list ----------
+    def add(self, meta: Dict[str, Any]) -> Watch:
+        meta = {**meta, "origin": meta["origin"].upper(), "destination": meta["destination"].upper(), "date": str(meta["date"])}
+        key = watch_key(meta)
+        if key not in self.watches:
+            self.watches[key] = Watch(key=key, meta=meta, next_due=self.clock())
+            heapq.heappush(self._heap, (self.clock(), key))
+        return self.watches[key]
+
+    def remove(self, key: str):
+        self.watches.pop(key, None)   # its heap entry is skipped when popped
+
+    def prune_departed(self, today: Optional[date] = None) -> int:
+        gone = [k for k, w in self.watches.items() if w.days_out(today) < 0]
+        for k in gone:
+            self.remove(k)
+        return len(gone)
+
+    # ---------- budget ----------
+    def demand_per_hour(self) -> float:
+        return sum(3600.0 / w.target_interval() for w in self.watches.values())
+
+    def stretch(self) -> float:
+        """Factor applied to every interval so the watches fit the budget (1.0 when they already do)."""
+        return max(self.demand_per_hour() / self.budget_per_hour, 1.0) if self.budget_per_hour > 0 else 1.0
+
+    def _take_token(self) -> float:
+        """0 if a search may start now, else seconds until the budget allows one."""
+        now = self.clock()
+        rate = self.budget_per_hour / 3600.0
+        self._tokens = min(self._tokens + (now - self._refilled) * rate, 1.0)
+        self._refilled = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / rate if rate > 0 else float("inf")
+
+    # ---------- polling ----------
+    def next_due(self) -> Optional[Watch]:
+        while self._heap:
+            due, key = self._heap[0]
+            w = self.watches.get(key)
+            if w is None or w.next_due != due:   # removed, or rescheduled since this entry
+                heapq.heappop(self._heap)
+                continue
+            return w
+        return None
+
+    async def poll(self, w: Watch):
+        from .models import SearchMetadata
+        from . import snapshots
+        now = self.clock()
+        w.polls += 1
+        try:
+            result = await self.search(SearchMetadata(**w.meta))
+            delta = snapshots.default().update(result)
+        except Exception as e:
+            w.failures += 1
+            POLLS.inc(outcome="failed")
+            w.next_due = now + min(FAILURE_BACKOFF_S * w.failures, MAX_INTERVAL_S)
+            print(f"⚠️ watch {w.key}: {type(e).__name__}: {e}")
+        else:
+            if delta.no_flights:
+                # says nothing about whether fares moved: leave change_rate and the snapshot alone
+                POLLS.inc(outcome="empty")
+                print(f"⚠️ watch {w.key}: search returned no flights, keeping the previous snapshot")
+                w.next_due = now + w.interval_s
+            else:
+                changed = not delta.empty() and not delta.first_snapshot
+                w.failures = 0
+                w.last_ok = self.clock()
+                w.changes += changed
+                if not delta.first_snapshot:
+                    w.change_rate = CHANGE_ALPHA * changed + (1 - CHANGE_ALPHA) * w.change_rate
+                POLLS.inc(outcome="changed" if changed else "unchanged")
+                if self.on_delta and not delta.empty():
+                    self.on_delta(delta)
+                w.interval_s = w.target_interval() * self.stretch()
+                w.next_due = w.last_ok + w.interval_s
+        heapq.heappush(self._heap, (w.next_due, w.key))
+        self._save()
+
+    async def run(self, stop: Optional[asyncio.Event] = None, report_every_s: float = 60.0):
+        stop = stop or asyncio.Event()
+        last_report = 0.0
+        while not stop.is_set():
+            now = self.clock()
+            if now - last_report >= report_every_s:
+                self.prune_departed()
+                print(self.report_line())
+                last_report = now
+            w = self.next_due()
+            if w is None:
+                wait = report_every_s
+            elif w.next_due > now:
+                wait = w.next_due - now
+            else:
+                wait = self._take_token()
+                if wait == 0:
+                    await self.poll(w)
+                    continue
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=min(wait, report_every_s))
+            except asyncio.TimeoutError:
+                pass
+
+    # ---------- reporting ----------
+    def coverage(self) -> Dict[str, Any]:
+        """Share of keys polled within their (budget-stretched) interval, and how stale the rest are."""
+        now = self.clock()
+        ages = [now - w.last_ok if w.last_ok else float("inf") for w in self.watches.values()]
+        fresh = sum(1 for w, a in zip(self.watches.values(), ages) if a <= w.interval_s * 1.5)
+        finite = sorted(a for a in ages if a != float("inf"))
+        out = {
+            "keys": len(self.watches),
+            "coverage": round(fresh / len(self.watches), 3) if self.watches else 1.0,
+            "never_polled": len(ages) - len(finite),
+            "staleness_mean_s": round(sum(finite) / len(finite), 1) if finite else 0.0,
+            "staleness_p95_s": round(finite[int(0.95 * (len(finite) - 1))], 1) if finite else 0.0,
+            "staleness_max_s": round(finite[-1], 1) if finite else 0.0,
+            "demand_per_hour": round(self.demand_per_hour(), 1),
+            "budget_per_hour": self.budget_per_hour,
+        }
+        WATCHED.set(out["keys"])
+        COVERAGE.set(out["coverage"])
+        DEMAND.set(out["demand_per_hour"])
+        for stat in ("mean", "p95", "max"):
+            STALENESS.set(out[f"staleness_{stat}_s"], stat=stat)
+        return out
+
+    def report_line(self) -> str:
+        c = self.coverage()
+        return (f"👀 {c['keys']} watched | coverage {c['coverage']:.0%} | stale mean {c['staleness_mean_s'] / 60:.0f}m "
+                f"p95 {c['staleness_p95_s'] / 60:.0f}m | demand {c['demand_per_hour']:.0f}/h of {c['budget_per_hour']:.0f}/h")
+
+
+# -------- CLI: python -m src watch --watches watches.jsonl --budget 60 --deltas data/processed/deltas.jsonl --------
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m src watch", description="Poll watched searches adaptively")
+    ap.add_argument("--watches", help="JSONL of SearchMetadata objects to add to the watch list")
+    ap.add_argument("--remove", nargs="*", default=[], metavar="KEY", help="watch keys to drop")
+    ap.add_argument("--budget", type=float, default=BUDGET_PER_HOUR, help="searches per hour across all watches")
+    ap.add_argument("--deltas", default="data/processed/deltas.jsonl", help="where fare changes are appended")
+    ap.add_argument("--deadline", type=float, default=None, metavar="SECONDS", help="time budget per search")
+    ap.add_argument("--status", action="store_true", help="print the watch list and exit")
+    args = ap.parse_args(argv)
+
+    from .pipeline import run_search
+    out = pathlib.Path(args.deltas)
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    def emit(delta):
+        with open(out, "a", encoding="utf-8") as f:
+            f.write(delta.model_dump_json() + "\n")
+
+    sched = WatchScheduler(lambda meta: run_search(meta, deadline_s=args.deadline), args.budget, on_delta=emit)
+    if args.watches:
+        for line in pathlib.Path(args.watches).read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                sched.add(json.loads(line))
+    for key in args.remove:
+        sched.remove(key)
+    sched._save()
+
+    if args.status:
+        for w in sorted(sched.watches.values(), key=lambda w: w.next_due):
+            print(f"   {w.key:<36} every {w.target_interval() * sched.stretch() / 60:6.0f}m  change rate {w.change_rate:.2f}  "
+                  f"{w.days_out():4d}d out  due in {max(w.next_due - time.time(), 0) / 60:5.0f}m")
+        print(sched.report_line())
+        return
+    metrics.start_from_env()
+    try:
+        asyncio.run(sched.run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from src import deadline
+from src.deadline import DeadlineExceeded
+from src.profile_pool import ProfilePool, profile_slot
+
+
+def test_clamp_is_a_no_op_without_a_budget():
+    assert deadline.current() is None
+    assert deadline.clamp(25000) == 25000 and deadline.clamp_s(30) == 30
+    assert not deadline.expired()
+    deadline.check()
+
+
+def test_nested_scope_never_extends_its_parent():
+    with deadline.scope(1.0) as outer:
+        with deadline.scope(60) as inner:
+            assert inner.expires == pytest.approx(outer.expires) and outer.remaining() <= 1.0
+            assert deadline.clamp(25000) <= 1000
+            assert deadline.clamp_s(30) <= 1.0
+        with deadline.scope(None) as same:
+            assert same is outer
+    assert deadline.current() is None
+
+
+def test_expired_budget_clamps_to_the_minimum():
+    with deadline.scope(0):
+        assert deadline.expired()
+        assert deadline.clamp(1200) == deadline.MIN_MS   # never 0: playwright reads that as "no timeout"
+        assert deadline.clamp_s(5) == 0.0
+        with pytest.raises(DeadlineExceeded, match="step"):
+            deadline.check("step")
+
+
+def test_enforce_cancels_the_work_and_raises_deadline_exceeded():
+    cleaned = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        finally:
+            cleaned.append(True)
+
+    async def main():
+        with deadline.scope(0.05):
+            await deadline.enforce(slow(), "search")
+
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="search"):
+        asyncio.run(main())
+    assert cleaned and time.monotonic() - t0 < 1
+
+
+def test_profile_wait_is_cut_to_the_deadline(tmp_path):
+    pool = ProfilePool(golden=tmp_path / "golden", root=tmp_path / "pool", size=1)
+
+    async def main():
+        async with pool.acheckout():
+            with deadline.scope(0.3):
+                async with profile_slot(pool):
+                    pass
+
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="profile checkout"):
+        asyncio.run(main())
+    assert time.monotonic() - t0 < 5
+
+
+def test_cancelled_profile_wait_gives_the_slot_back(tmp_path):
+    pool = ProfilePool(golden=tmp_path / "golden", root=tmp_path / "pool", size=1)
+
+    async def main():
+        held = pool.checkout()
+        held.__enter__()
+        waiter = asyncio.ensure_future(pool.acheckout(10).__aenter__())
+        await asyncio.sleep(0.2)
+        waiter.cancel()
+        held.__exit__(None, None, None)      # the thread now gets the slot for nobody
+        await asyncio.sleep(1.0)
+        assert not pool._lock_path(0).exists()
+
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+import pytest
+
+from src import fetch, replay
+
+CASSETTE = """\
+interactions:
+- request:
+    body: ''
+    headers: {}
+    method: GET
+    uri: https://example.com/
+  response:
+    status: {code: 200, message: OK}
+    headers:
+      content-type: [text/html; charset=utf-8]
+    body: {string: '<html><head><title>Example Domain</title></head><body><a href="https://www.iana.org/domains/example">More</a></body></html>'}
+- request:
+    body: ''
+    headers: {}
+    method: GET
+    uri: https://example.com/missing
+  response:
+    status: {code: 404, message: Not Found}
+    headers:
+      content-type: [text/html]
+    body: {string: 'not here'}
+version: 1
+"""
+
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, "CASSETTE_ROOT", tmp_path)
+    (tmp_path / "fetch").mkdir()
+    (tmp_path / "fetch" / "httpx.yaml").write_text(CASSETTE, encoding="utf-8")
+    replay.configure("replay", "fetch")
+    yield
+    replay.configure("live")
+
+
+def test_fetch_text_replays_cassette(cassette):
+    html = fetch.fetch_text("https://example.com/")
+    assert "<title>Example Domain</title>" in html
+
+
+def test_fetch_text_raises_on_error_status(cassette):
+    import httpx
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch.fetch_text("https://example.com/missing")
@@ -0,0 +1,50 @@
+from datetime import date
+
+import pytest
+
+from src.flightstore import FlightStore
+from src.models import FlightItem, SearchMetadata, SearchResult
+
+
+def result(day, *cpps, origin="LAX", destination="JFK"):
+    flights = [FlightItem(flight_number=f"AA {i}", departure_time=f"{6 + i:02d}:00", arrival_time="15:05",
+                          points_required=10000, cash_price_usd=cpp * 100, taxes_fees_usd=0.0, cpp=cpp)
+               for i, cpp in enumerate(cpps)]
+    meta = SearchMetadata(origin=origin, destination=destination, date=date(2025, 12, day))
+    return SearchResult(search_metadata=meta, flights=flights, total_results=len(flights))
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = FlightStore(tmp_path / "flights.db")
+    yield s
+    s.close()
+
+
+def test_best_orders_by_cpp_and_filters_route(store):
+    store.add_many([result(15, 1.2, 2.5), result(16, 1.9), result(15, 9.9, origin="SFO")])
+    rows = store.best(limit=2, origin="lax", destination="JFK")
+    assert [(r["date"], r["cpp"]) for r in rows] == [("2025-12-15", 2.5), ("2025-12-16", 1.9)]
+
+
+def test_best_per_date_keeps_top_flight_of_each_day(store):
+    store.add_many([result(16, 1.9, 3.1), result(15, 1.2, 2.5)])
+    rows = store.best(per_date=True, date_from="2025-12-01", date_to="2025-12-31")
+    assert [(r["date"], r["flight_number"], r["cpp"]) for r in rows] == [("2025-12-15", "AA 1", 2.5), ("2025-12-16", "AA 1", 3.1)]
+
+
+def test_best_latest_ignores_older_scrapes(store):
+    store.add(result(15, 4.0), scraped=1.0)
+    store.add(result(15, 1.5), scraped=2.0)
+    assert [r["cpp"] for r in store.best(latest=True)] == [1.5]
+    assert [r["cpp"] for r in store.best()] == [4.0, 1.5]
+
+
+def test_best_latest_skips_empty_scrapes_and_keeps_passenger_counts_apart(store):
+    store.add(result(15, 2.0), scraped=1.0)
+    store.add(result(15), scraped=2.0)                    # blocked or empty page: no flights
+    assert [r["cpp"] for r in store.best(latest=True)] == [2.0]
+    two = result(15, 3.0)
+    two.search_metadata.passengers = 2
+    store.add(two, scraped=3.0)
+    assert sorted(r["cpp"] for r in store.best(latest=True)) == [2.0, 3.0]
@@ -0,0 +1,24 @@
+from src.parse_aa import parse_from_network
+
+
+def slice_(number, dep, arr, **price):
+    return {"segments": [{"flight": {"carrierCode": "AA", "flightNumber": number},
+                          "departureDateTime": f"2025-12-15T{dep}:00", "arrivalDateTime": f"2025-12-15T{arr}:00"}],
+            "pricingDetail": [price]}
+
+
+CASH = {"data": {"slices": [slice_("100", "06:00", "14:20", perPassengerDisplayTotal={"amount": 289.0}),
+                            slice_("200", "12:30", "20:45", perPassengerDisplayTotal={"amount": 199.0})]}}
+AWARD = {"data": {"slices": [slice_("100", "06:00", "14:20", perPassengerAwardPoints=25000,
+                                    perPassengerTaxesAndFees={"amount": 5.6}, perPassengerDisplayTotal={"amount": 5.6})]}}
+
+
+def test_parse_from_network_merges_cash_and_award_responses():
+    flights = parse_from_network([{"url": "cash", "json": CASH}, {"url": "award", "json": AWARD}])
+    assert flights == [{"flight_number": "AA100", "departure_time": "06:00", "arrival_time": "14:20",
+                        "points_required": 25000, "cash_price_usd": 289.0, "taxes_fees_usd": 5.6}]
+
+
+def test_parse_from_network_needs_both_prices():
+    assert parse_from_network([{"url": "award", "json": AWARD}]) == []
+    assert parse_from_network([{"url": "x", "json": None}, {"url": "y", "json": {"unrelated": 1}}]) == []
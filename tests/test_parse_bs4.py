@@ -0,0 +1,11 @@
+from src.parse_bs4 import parse_titles_and_links
+
+
+def test_parse_titles_and_links():
+    html = ('<html><head><title>  Choose flights </title></head><body>'
+            '<a href="/fare/1">Fare</a><a name="anchor">no href</a><a href="https://www.aa.com/">Home</a></body></html>')
+    assert parse_titles_and_links(html) == {"title": "Choose flights", "links": ["/fare/1", "https://www.aa.com/"]}
+
+
+def test_parse_titles_and_links_without_title():
+    assert parse_titles_and_links("<p>nothing</p>") == {"title": "", "links": []}
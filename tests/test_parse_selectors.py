@@ -0,0 +1,50 @@
+import pytest
+
+from src.parse_selectors import SelectorSet
+
+CARDS = ('<ul><li data-test-id="resultCard"><span data-test-id="flightNumber">AA 100</span>'
+         '<span class="depart-time">06:00</span><span>12,500 miles</span></li>'
+         '<li data-test-id="resultCard"><span>AA 200</span><span class="depart-time">12:30</span></li></ul>')
+
+
+@pytest.fixture
+def sel():
+    return SelectorSet("test", "v1", card=["[data-test-id='resultCard']", "li"],
+                       fields={"flight_number": ["[data-test-id='flightNumber']", "xpath:.//text()[contains(., 'AA')]"],
+                               "departure_time": ["[data-test-id='departTime']", ".depart-time"],
+                               "points": ["xpath:.//text()[contains(., 'miles')]"]})
+
+
+def test_fields_fall_back_in_order_and_record_hits(sel):
+    assert sel.extract(CARDS) == [
+        {"flight_number": "AA 100", "departure_time": "06:00", "points": "12,500 miles"},
+        {"flight_number": "AA 200", "departure_time": "12:30", "points": None},
+    ]
+    hits = {(r["rule"], r["selector"]): r["hits"] for r in sel.stats()}
+    assert hits[("flight_number", "[data-test-id='flightNumber']")] == 1
+    assert hits[("flight_number", "xpath:.//text()[contains(., 'AA')]")] == 1
+    assert hits[("points", "(no match)")] == 1
+    assert ("departure_time", "[data-test-id='departTime']") in sel.dead()
+    assert ("card", "li") in sel.dead()
+
+
+def test_card_rule_falls_back_when_the_first_selector_misses(sel):
+    assert [c["flight_number"] for c in sel.extract("<ul><li>AA 300</li></ul>")] == ["AA 300"]
+
+
+@pytest.mark.parametrize("html", ["", "   \n", b"", b"  "])
+def test_blank_document_has_no_cards(sel, html):
+    assert sel.extract(html) == []
+
+
+def test_str_with_xml_encoding_declaration_parses(sel):
+    doc = '<?xml version="1.0" encoding="utf-8"?>\n<html><body>' + CARDS + '</body></html>'
+    assert [c["flight_number"] for c in sel.extract(doc)] == ["AA 100", "AA 200"]
+    assert len(sel.extract(doc.encode())) == 2
+
+
+def test_build_result_without_network_or_page_html():
+    from src.models import SearchMetadata
+    from src.pipeline import build_result
+    meta = SearchMetadata(origin="LAX", destination="JFK", date="2025-12-15", passengers=1, cabin_class="economy")
+    assert build_result(meta, {"network_json": [], "page_html": ""}).flights == []
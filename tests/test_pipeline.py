@@ -0,0 +1,30 @@
+from src.pipeline import pair_offers
+
+
+def offer(num, dep, arr="09:05", cash=None, points=None, taxes=None):
+    return {"flight_number": num, "departure_time": dep, "arrival_time": arr, "cash": cash, "points": points, "taxes": taxes}
+
+
+def test_pair_offers_joins_on_flight_and_departure():
+    cash = [offer("AA 100", "06:00", cash=289.0), offer("AA 200", "12:30", cash=199.0)]
+    award = [offer("AA 200", "12:30", points=12500, taxes=5.6), offer("AA 100", "06:00", points=25000, taxes=None)]
+    flights, unmatched = pair_offers(cash, award)
+    assert unmatched == []
+    assert flights == [
+        {"flight_number": "AA 100", "departure_time": "06:00", "arrival_time": "09:05",
+         "points_required": 25000, "cash_price_usd": 289.0, "taxes_fees_usd": 0.0},
+        {"flight_number": "AA 200", "departure_time": "12:30", "arrival_time": "09:05",
+         "points_required": 12500, "cash_price_usd": 199.0, "taxes_fees_usd": 5.6},
+    ]
+
+
+def test_pair_offers_reports_one_sided_and_incomplete_offers():
+    cash = [offer("AA 100", "06:00", cash=289.0), offer("AA 300", "18:00", cash=None)]
+    award = [offer("AA 300", "18:00", points=30000, taxes=5.6), offer("AA 400", "20:00", points=7500, taxes=5.6)]
+    flights, unmatched = pair_offers(cash, award)
+    assert flights == []
+    assert {(u["flight_number"], u["side"], u["reason"]) for u in unmatched} == {
+        ("AA 100", "cash", "no award offer"),
+        ("AA 300", "both", "incomplete fare"),
+        ("AA 400", "award", "no cash offer"),
+    }
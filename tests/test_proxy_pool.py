@@ -0,0 +1,57 @@
+import pytest
+
+from src import proxy_pool
+from src.proxy_pool import ProxyPool, ProxyStats
+
+
+def test_fresh_proxy_scores_neutral_and_latency_halves_weight():
+    fresh = ProxyStats(server="a")
+    assert fresh.success_rate() == 0.5 and fresh.block_rate() == 0.0
+    slow = ProxyStats(server="b", latency_ms=1000.0)
+    assert slow.score() == pytest.approx(fresh.score() / 2)
+    burned = ProxyStats(server="c", blocks=50)
+    assert burned.score() < 0.05 * fresh.score()
+
+
+def test_block_quarantines_at_once_with_exponential_cooldown():
+    pool = ProxyPool(["a:1", "b:2"], state_path=None)
+    pool.report({"server": "a:1"}, ok=False, blocked=True)
+    st = pool.stats["a:1"]
+    assert st.quarantined() and st.quarantines == 1
+    first = st.quarantined_until
+    st.quarantined_until = 0
+    pool.report({"server": "a:1"}, ok=False, blocked=True)
+    assert st.quarantined_until - first == pytest.approx(proxy_pool.COOLDOWN_S, abs=1.0)   # 60 s, then 120 s
+    assert {pool.acquire()["server"] for _ in range(20)} == {"b:2"}
+
+
+def test_failures_quarantine_after_strikes_and_success_resets():
+    pool = ProxyPool(["a:1"], state_path=None)
+    pool.report({"server": "a:1"}, ok=False)
+    pool.report({"server": "a:1"}, ok=True, latency_ms=200)
+    pool.report({"server": "a:1"}, ok=False)
+    assert not pool.stats["a:1"].quarantined()
+    pool.report({"server": "a:1"}, ok=False)
+    assert pool.stats["a:1"].quarantined()
+    assert pool.acquire() == {"server": "a:1"}   # everything cooling down: the first to recover
+
+
+def test_sticky_session_repicks_after_quarantine():
+    pool = ProxyPool(["a:1", "b:2"], state_path=None)
+    first = pool.acquire("profile-1")["server"]
+    assert all(pool.acquire("profile-1")["server"] == first for _ in range(10))
+    pool.report({"server": first}, ok=False, blocked=True)
+    assert pool.acquire("profile-1")["server"] != first
+
+
+def test_quarantine_from_another_process_is_seen_after_refresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(proxy_pool, "REFRESH_S", 0.0)
+    path = tmp_path / "proxies.json"
+    mine, theirs = ProxyPool(["a:1", "b:2"], state_path=path), ProxyPool(["a:1", "b:2"], state_path=path)
+    theirs.report({"server": "a:1"}, ok=False, blocked=True)
+    theirs.flush()
+    mine.report({"server": "b:2"}, ok=True, latency_ms=100)
+    assert {mine.acquire()["server"] for _ in range(20)} == {"b:2"}
+    mine.flush()
+    stats = ProxyPool(["a:1", "b:2"], state_path=path).stats
+    assert stats["a:1"].blocks == 1 and stats["b:2"].successes == 1
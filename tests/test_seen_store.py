@@ -0,0 +1,60 @@
+import math
+import time
+
+from src.seen_store import BloomFilter, SeenStore, url_key
+
+
+def test_bloom_sizing_matches_formula_and_has_no_false_negatives():
+    bf = BloomFilter(capacity=10_000, fp_rate=0.01)
+    assert bf.bits == math.ceil(-10_000 * math.log(0.01) / math.log(2) ** 2)   # ~9.6 bits per key
+    assert bf.hashes == 7
+    keys = [url_key(f"https://www.aa.com/p/{i}") for i in range(10_000)]
+    for k in keys:
+        bf.add(k)
+    assert all(k in bf for k in keys)
+    others = sum(url_key(f"https://www.aa.com/q/{i}") in bf for i in range(10_000))
+    assert others < 300   # 1% target, generous slack
+
+
+def test_bloom_round_trips_and_rejects_other_sizing(tmp_path):
+    bf = BloomFilter(1000, 0.01)
+    bf.add(url_key("https://www.aa.com/"))
+    bf.save(tmp_path / "f.bloom")
+    again = BloomFilter.load(tmp_path / "f.bloom", 1000, 0.01)
+    assert again is not None and url_key("https://www.aa.com/") in again
+    assert BloomFilter.load(tmp_path / "f.bloom", 2000, 0.01) is None
+
+
+def test_killed_crawl_resumes_frontier_and_scheduled_from_time_flush(tmp_path):
+    path = tmp_path / "seen.sqlite"
+    store = SeenStore(path, capacity=1000, flush_s=0.05)
+    for i in range(5):
+        url = f"https://www.aa.com/p/{i}"
+        assert store.add(url)
+        store.stage_meta("scheduled", i + 1)
+        store.push_pending(url, 1)
+    store.done_pending("https://www.aa.com/p/0")
+    time.sleep(0.06)
+    store.done_pending("https://www.aa.com/p/1")   # well under BATCH, flushed because it is old enough
+    # killed here: no flush(), no close(), the bloom is never saved
+
+    again = SeenStore(path, capacity=1000)
+    assert again.get_meta("scheduled") == "5"
+    assert len(again) == 5
+    assert sorted(u for u, _ in again.pending()) == [f"https://www.aa.com/p/{i}" for i in (2, 3, 4)]
+    assert not again.add("https://www.aa.com/p/0")   # bloom rebuilt from SQLite
+    assert again.add("https://www.aa.com/p/9")
+    again.close(); store.db.close()
+
+
+def test_nothing_reaches_disk_before_batch_or_interval(tmp_path):
+    path = tmp_path / "seen.sqlite"
+    store = SeenStore(path, capacity=1000, batch=100, flush_s=3600)
+    store.add("https://www.aa.com/a")
+    store.stage_meta("scheduled", 1)
+    store.push_pending("https://www.aa.com/a", 0)
+    other = SeenStore(path, capacity=1000)
+    assert other.get_meta("scheduled") is None and len(other) == 0
+    store.close()
+    assert other.get_meta("scheduled") == "1"
+    other.close()
@@ -0,0 +1,61 @@
+from datetime import date
+
+from src.models import FlightItem, SearchMetadata, SearchResult
+from src.snapshots import diff
+
+META = SearchMetadata(origin="LAX", destination="JFK", date=date(2025, 12, 15))
+
+
+def flight(num, dep, points=12500, cash=289.0, taxes=5.6):
+    return FlightItem(flight_number=num, departure_time=dep, arrival_time="15:05", points_required=points,
+                      cash_price_usd=cash, taxes_fees_usd=taxes, cpp=round((cash - taxes) / points * 100, 2))
+
+
+def test_diff_first_snapshot_adds_everything():
+    cur = SearchResult(search_metadata=META, flights=[flight("AA 1", "06:00")], total_results=1)
+    delta = diff(None, cur)
+    assert delta.first_snapshot and [f.flight_number for f in delta.added] == ["AA 1"]
+
+
+def test_diff_reports_added_removed_and_repriced():
+    prev = [flight("AA 1", "06:00"), flight("AA 2", "08:00"), flight("AA 3", "10:00")]
+    cur = SearchResult(search_metadata=META, total_results=3,
+                       flights=[flight("AA 1", "06:00"), flight("AA 2", "08:00", points=15000), flight("AA 4", "12:00")])
+    delta = diff(prev, cur)
+    assert not delta.first_snapshot
+    assert [f.flight_number for f in delta.added] == ["AA 4"]
+    assert [f.flight_number for f in delta.removed] == ["AA 3"]
+    assert [(c.flight_number, c.changes) for c in delta.changed] == [("AA 2", {"points_required": [12500, 15000]})]
+    assert delta.unchanged == 1
+
+
+def test_diff_same_flight_number_at_another_time_is_a_new_flight():
+    cur = SearchResult(search_metadata=META, flights=[flight("AA 1", "18:00")], total_results=1)
+    delta = diff([flight("AA 1", "06:00")], cur)
+    assert len(delta.added) == 1 and len(delta.removed) == 1 and not delta.changed
+
+
+def test_update_skips_results_without_flights(tmp_path):
+    from src.snapshots import SnapshotStore
+    store = SnapshotStore(tmp_path / "snapshots.db")
+    full = SearchResult(search_metadata=META, flights=[flight("AA 1", "06:00")], total_results=1)
+    assert store.update(full).first_snapshot
+    delta = store.update(SearchResult(search_metadata=META))
+    assert delta.no_flights and delta.empty() and not delta.removed
+    again = store.update(full)
+    assert not again.first_snapshot and again.empty() and again.unchanged == 1
+    store.close()
+
+
+def test_cabins_get_separate_snapshots_under_the_watch_key(tmp_path):
+    from src.snapshots import SnapshotStore, snapshot_key
+    from src.watch import watch_key
+    store = SnapshotStore(tmp_path / "snapshots.db")
+    business = META.model_copy(update={"cabin_class": "business", "passengers": 2})
+    store.update(SearchResult(search_metadata=META, flights=[flight("AA 1", "06:00")], total_results=1))
+    delta = store.update(SearchResult(search_metadata=business, flights=[flight("AA 1", "06:00", points=57500)], total_results=1))
+    assert delta.first_snapshot and not delta.changed
+    assert snapshot_key(business) == watch_key({"origin": "LAX", "destination": "JFK", "date": "2025-12-15",
+                                                "cabin_class": "business", "passengers": 2}) == "LAX-JFK-2025-12-15-BUSINESS-2"
+    assert store.get("LAX-JFK-2025-12-15-ECONOMY-1") is not None
+    store.close()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from src import deadline
+from src.deadline import DeadlineExceeded
+from src.strategies import StrategyRegistry
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_failing_candidate_sinks_below_the_one_that_works():
+    reg = StrategyRegistry(state_path=None)
+    calls = []
+
+    async def fails():
+        calls.append("a")
+        raise TimeoutError("no such element")
+
+    async def works():
+        calls.append("b")
+
+    assert run(reg.run("step", [("a", fails), ("b", works)])) == "b"
+    assert run(reg.run("step", [("a", fails), ("b", works)])) == "b"
+    assert calls == ["a", "b", "b"]
+    assert reg.wasted()["step"]["timeouts"] == 1
+
+
+def test_expired_deadline_stops_the_loop_and_records_nothing():
+    reg = StrategyRegistry(state_path=None)
+
+    async def slow():
+        await asyncio.sleep(deadline.clamp_s(5))
+        raise TimeoutError("waited out the clamp")
+
+    async def never():
+        raise AssertionError("tried after the budget ran out")
+
+    async def main():
+        with deadline.scope(0.05):
+            await reg.run("step", [("slow", slow), ("next", never)])
+
+    with pytest.raises(DeadlineExceeded):
+        run(main())
+    assert all(s.attempts == 0 for s in reg.stats.values())
+
+
+def test_deadline_raised_by_a_candidate_is_not_swallowed():
+    reg = StrategyRegistry(state_path=None)
+
+    async def inner():
+        raise DeadlineExceeded("inner scope")
+
+    with pytest.raises(DeadlineExceeded):
+        run(reg.run("step", [("x", inner)]))
+
+
+def test_save_is_deferred_and_merges_with_other_processes(tmp_path):
+    path = tmp_path / "strategies.json"
+    a, b = StrategyRegistry(path), StrategyRegistry(path)
+    a.record("step", "x", ok=True, ms=100)
+    assert not path.exists()   # record() never touches the file itself
+    b.record("step", "x", ok=False, ms=300)
+    a.save(); b.save()
+    st = StrategyRegistry(path).snapshot()[0]
+    assert (st["successes"], st["failures"]) == (1, 1)
+    assert b.stats[("step", "x")].successes == 1   # b picked up a's outcome while merging
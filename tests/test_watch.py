@@ -0,0 +1,103 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from src import snapshots, watch
+from src.models import FlightItem, SearchResult
+from src.watch import Watch, WatchScheduler
+
+
+class Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def meta(days_out, origin="LAX"):
+    return {"origin": origin, "destination": "JFK", "date": str(date.today() + timedelta(days=days_out)),
+            "passengers": 1, "cabin_class": "economy"}
+
+
+def result(m, points=12500):
+    f = FlightItem(flight_number="AA 1", departure_time="06:00", arrival_time="14:20", points_required=points,
+                   cash_price_usd=289.0, taxes_fees_usd=5.6, cpp=2.27)
+    return SearchResult(search_metadata=m, flights=[f], total_results=1)
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "_default", snapshots.SnapshotStore(tmp_path / "snapshots.db"))
+
+
+def test_interval_shrinks_near_departure_and_with_volatility():
+    base = watch.BASE_INTERVAL_S
+    assert Watch("k", meta(14)).target_interval() == pytest.approx(base)          # the reference key
+    assert Watch("k", meta(1)).target_interval() == pytest.approx(base / 4)        # horizon floor x0.25
+    calm = Watch("k", meta(120), change_rate=0.0).target_interval()
+    assert calm == pytest.approx(min(base * 4 * 0.7 / 0.2, watch.MAX_INTERVAL_S))
+    assert Watch("k", meta(0), change_rate=1.0).target_interval() == watch.MIN_INTERVAL_S
+
+
+def test_stretch_scales_every_interval_to_fit_the_budget():
+    sched = WatchScheduler(None, budget_per_hour=2, state_path=None, clock=Clock())
+    for origin in ("LAX", "SFO", "SEA", "BOS"):
+        sched.add(meta(14, origin))                  # one search per hour each
+    assert sched.demand_per_hour() == pytest.approx(4)
+    assert sched.stretch() == pytest.approx(2)
+    sched.budget_per_hour = 10
+    assert sched.stretch() == 1.0
+
+
+def test_token_bucket_spaces_searches_by_the_budget():
+    clock = Clock()
+    sched = WatchScheduler(None, budget_per_hour=60, state_path=None, clock=clock)
+    assert sched._take_token() == 0
+    assert sched._take_token() == pytest.approx(60)
+    clock.t += 60
+    assert sched._take_token() == 0
+
+
+def test_poll_reschedules_by_stretched_interval_and_learns_change_rate():
+    clock = Clock()
+    points = iter([12500, 12500, 15000])
+
+    async def search(m):
+        return result(m, next(points))
+
+    sched = WatchScheduler(search, budget_per_hour=0.5, state_path=None, clock=clock)
+    w = sched.add(meta(14))
+    assert sched.next_due() is w
+    stretch = sched.stretch()
+    assert stretch == pytest.approx(2)
+
+    asyncio.run(sched.poll(w))                      # first snapshot: no change evidence yet
+    assert w.change_rate == watch.PRIOR_CHANGE_RATE
+    assert w.next_due == pytest.approx(clock.t + w.target_interval() * stretch)
+
+    clock.t += 7200
+    asyncio.run(sched.poll(w))                      # same fares
+    assert w.change_rate == pytest.approx(0.7 * 0.5)
+    clock.t += 7200
+    asyncio.run(sched.poll(w))                      # repriced
+    assert w.change_rate == pytest.approx(0.3 + 0.7 * 0.35) and w.changes == 1
+
+
+def test_failed_and_empty_polls_back_off_without_touching_change_rate():
+    clock = Clock()
+    outcomes = iter([RuntimeError("blocked"), "empty"])
+
+    async def search(m):
+        out = next(outcomes)
+        if isinstance(out, Exception):
+            raise out
+        return SearchResult(search_metadata=m, flights=[], total_results=0)
+
+    sched = WatchScheduler(search, state_path=None, clock=clock)
+    w = sched.add(meta(14))
+    asyncio.run(sched.poll(w))
+    assert w.failures == 1 and w.next_due == clock.t + watch.FAILURE_BACKOFF_S
+    asyncio.run(sched.poll(w))
+    assert w.change_rate == watch.PRIOR_CHANGE_RATE and w.next_due == clock.t + w.interval_s